@@ -14,6 +14,9 @@ Architecture
 
 """
 
+import importlib
+from typing import TYPE_CHECKING
+
 import importlib_metadata
 
 try:
@@ -22,7 +25,26 @@ except importlib_metadata.PackageNotFoundError:
     # package is not installed
     __version__ = "0.0.0"  # pragma: no cover
 
-from curategpt.extract import BasicExtractor, Extractor
-from curategpt.store import ChromaDBAdapter, DBAdapter
+if TYPE_CHECKING:
+    from curategpt.extract import BasicExtractor, Extractor
+    from curategpt.store import ChromaDBAdapter, DBAdapter
 
 __all__ = ["DBAdapter", "ChromaDBAdapter", "Extractor", "BasicExtractor"]
+
+# imported on first access, as they pull in heavy dependencies (chromadb, torch, llm, ...)
+_LAZY_IMPORTS = {
+    "DBAdapter": "curategpt.store",
+    "ChromaDBAdapter": "curategpt.store",
+    "Extractor": "curategpt.extract",
+    "BasicExtractor": "curategpt.extract",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        return getattr(importlib.import_module(_LAZY_IMPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
@@ -4,9 +4,31 @@ CurateGPT Agents.
 These chain together different search and generate components.
 """
 
-from .chat_agent import ChatAgent
-from .dragon_agent import DragonAgent
-from .evidence_agent import EvidenceAgent
-from .mapping_agent import MappingAgent
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .chat_agent import ChatAgent
+    from .dragon_agent import DragonAgent
+    from .evidence_agent import EvidenceAgent
+    from .mapping_agent import MappingAgent
 
 __all__ = ["MappingAgent", "ChatAgent", "DragonAgent", "EvidenceAgent"]
+
+# imported on first access, so that importing one agent does not load the others
+_LAZY_IMPORTS = {
+    "ChatAgent": ".chat_agent",
+    "DragonAgent": ".dragon_agent",
+    "EvidenceAgent": ".evidence_agent",
+    "MappingAgent": ".mapping_agent",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        return getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
@@ -7,7 +7,7 @@ import yaml
 from llm import Model
 
 from curategpt.store.db_adapter import SEARCH_RESULT
-from curategpt.utils.tokens import estimate_num_tokens, max_tokens_by_model
+from curategpt.utils.tokens import max_tokens_by_model, select_within_budget
 
 logger = logging.getLogger(__name__)
 
@@ -45,33 +45,22 @@ def select_from_options_prompt(
             "For additional facts you are sure of but a reference is not found, write [?].\n"
         )
         prompt_template += "---\nHere is the Question: {query}.\n"
-    while True:
-        i = 0
-        references = {}
-        objects = {}
-        texts = []
-        current_length = 0
-        for obj, _, _obj_meta in kb_results:
-            i += 1
-            obj_text = yaml.dump({k: v for k, v in obj.items() if v}, sort_keys=False)
-            references[str(i)] = obj_text
-            objects[str(i)] = obj
-            if id_field and id_field in obj:
-                ref = obj[id_field]
-            else:
-                ref = f"{obj_type} {i}"
-            texts.append(f"## {ref}\n{obj_text}")
-            current_length += len(obj_text)
-        prompt = prompt_template.format(body="".join(texts), query=query)
-        logger.info(f"Prompt: {prompt}")
-        estimated_length = estimate_num_tokens([prompt])
-        logger.debug(f"Max tokens {model.model_id}: {max_tokens_by_model(model.model_id)}")
-        # TODO: use a more precise estimate of the length
-        if estimated_length + 300 < max_tokens_by_model(model.model_id):
-            break
+    obj_texts = []
+    texts = []
+    for i, (obj, _, _obj_meta) in enumerate(kb_results, 1):
+        obj_text = yaml.dump({k: v for k, v in obj.items() if v}, sort_keys=False)
+        if id_field and id_field in obj:
+            ref = obj[id_field]
         else:
-            # remove least relevant
-            if not kb_results:
-                raise ValueError(f"Prompt too long: {prompt}.")
-            kb_results.pop()
+            ref = f"{obj_type} {i}"
+        obj_texts.append(obj_text)
+        texts.append(f"## {ref}\n{obj_text}")
+    # least relevant results are left out if the prompt is too long
+    selected = select_within_budget(
+        prompt_template.format(body="", query=query), texts, max_tokens_by_model(model.model_id)
+    )
+    references = {str(i + 1): obj_texts[i] for i in selected}
+    objects = {str(i + 1): kb_results[i][0] for i in selected}
+    prompt = prompt_template.format(body="".join(texts[i] for i in selected), query=query)
+    logger.info(f"Prompt: {prompt}")
     return prompt, references, objects
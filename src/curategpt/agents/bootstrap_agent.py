@@ -8,6 +8,7 @@ from pydantic import BaseModel, ConfigDict
 from curategpt.agents.base_agent import BaseAgent
 from curategpt.conf.prompts import PROMPTS_DIR
 from curategpt.extract import AnnotatedObject
+from curategpt.utils.llm_cache import cached_prompt
 
 
 class KnowledgeBaseSpecification(BaseModel):
@@ -33,7 +34,7 @@ class BootstrapAgent(BaseAgent):
         prompt = template.render(**specification.model_dump())
         extractor = self.extractor
         model = extractor.model
-        response = model.prompt(prompt)
+        response = cached_prompt(model, prompt)
         ao = extractor.deserialize(response.text(), format="yaml")
         return ao
 
@@ -68,7 +69,7 @@ class BootstrapAgent(BaseAgent):
             "Do not include the root container class"
         )
         prompt += f"{preamble}:\n{spec_str}"
-        response = model.prompt(prompt)
+        response = cached_prompt(model, prompt)
         txt = response.text()
         if "```" in txt:
             txt = txt.split("```")[1]
@@ -10,7 +10,9 @@ from llm import Conversation
 from pydantic import BaseModel, ConfigDict
 
 from curategpt.agents.base_agent import BaseAgent
-from curategpt.utils.tokens import estimate_num_tokens, max_tokens_by_model
+from curategpt.utils.instrumentation import span
+from curategpt.utils.llm_cache import cached_prompt
+from curategpt.utils.tokens import max_tokens_by_model, select_within_budget
 from curategpt.wrappers import BaseWrapper
 
 logger = logging.getLogger(__name__)
@@ -94,21 +96,17 @@ class ChatAgent(BaseAgent):
                 query, relevance_factor=self.relevance_factor, limit=limit, expand=expand, **kwargs
             )
         )
-        while True:
-            i = 0
-            references = {}
-            texts = []
-            current_length = 0
-            for obj, _, _obj_meta in kb_results:
-                i += 1
-                obj_text = yaml.dump({k: v for k, v in obj.items() if v}, sort_keys=False)
-                references[str(i)] = obj_text
-                texts.append(f"## Reference {i}\n{obj_text}")
-                current_length += len(obj_text)
-            model = self.extractor.model
+        model = self.extractor.model
+        obj_texts = [
+            yaml.dump({k: v for k, v in obj.items() if v}, sort_keys=False)
+            for obj, _, _obj_meta in kb_results
+        ]
+        texts = [f"## Reference {i}\n{obj_text}" for i, obj_text in enumerate(obj_texts, 1)]
+
+        def _prompt(background: str) -> str:
             prompt = "I will first give background facts, then ask a question. Use the background fact to answer\n"
             prompt += "---\nBackground facts:\n"
-            prompt += "\n".join(texts)
+            prompt += background
             prompt += "\n\n"
             prompt += "I will ask a question and you will answer as best as possible, citing the references above.\n"
             prompt += "Write references in square brackets, e.g. [1].\n"
@@ -116,32 +114,28 @@ class ChatAgent(BaseAgent):
                 "For additional facts you are sure of but a reference is not found, write [?].\n"
             )
             prompt += f"---\nHere is the Question: {query}.\n"
-            logger.debug(f"Candidate Prompt: {prompt}")
-            estimated_length = estimate_num_tokens([prompt])
-            logger.debug(
-                f"Max tokens {self.extractor.model.model_id}: {max_tokens_by_model(self.extractor.model.model_id)}"
-            )
-            # TODO: use a more precise estimate of the length
-            if estimated_length + 300 < max_tokens_by_model(self.extractor.model.model_id):
-                break
-            else:
-                # remove least relevant
-                logger.debug(f"Removing least relevant of {len(kb_results)}: {kb_results[-1]}")
-                if not kb_results:
-                    raise ValueError(f"Prompt too long: {prompt}.")
-                kb_results.pop()
+            return prompt
 
+        # least relevant results are left out if the prompt is too long
+        selected = select_within_budget(
+            _prompt(""), [f"{text}\n" for text in texts], max_tokens_by_model(model.model_id)
+        )
+        references = {str(i + 1): obj_texts[i] for i in selected}
+        prompt = _prompt("\n".join(texts[i] for i in selected))
         logger.info(f"Prompt: {prompt}")
 
+        system = "You are a scientist assistant."
         if conversation:
             conversation.model = model
-            agent = conversation
             conversation_id = conversation.id
             logger.info(f"Conversation ID: {conversation_id}")
+            # responses in a conversation depend on its history, so they are not cached
+            response = conversation.prompt(prompt, system=system)
+            with span("llm.prompt", model=model.model_id):
+                response.text()
         else:
-            agent = model
             conversation_id = None
-        response = agent.prompt(prompt, system="You are a scientist assistant.")
+            response = cached_prompt(model, prompt, system=system)
         response_text = response.text()
         pattern = r"\[(\d+|\?)\]"
         used_references = re.findall(pattern, response_text)
@@ -8,6 +8,7 @@ from typing import Dict, List, Optional, Tuple
 from pydantic import BaseModel, ConfigDict
 
 from curategpt.agents.base_agent import BaseAgent
+from curategpt.utils.llm_cache import cached_prompt
 
 logger = logging.getLogger(__name__)
 
@@ -257,7 +258,7 @@ class ConceptRecognitionAgent(BaseAgent):
             prompt_text += f"Concept to ground: {text}"
         else:
             prompt_text = f"Concept to ground: {text}"
-        response = model.prompt(prompt_text, system=system_prompt)
+        response = cached_prompt(model, prompt_text, system=system_prompt)
         logger.debug(f"Response: {response.text()}")
         lines = response.text().split("\n")
         spans = []
@@ -327,7 +328,7 @@ class ConceptRecognitionAgent(BaseAgent):
             system_prompt += "Using the syntax [ORIGINAL TEXT | CATEGORY]."
         logger.debug(f"Prompting with: {text}")
         model = self.extractor.model
-        response = model.prompt(text, system=system_prompt)
+        response = cached_prompt(model, text, system=system_prompt)
         marked_up_text = response.text()
         anns = parse_annotations(marked_up_text, "|")
         spans = []
@@ -371,7 +372,7 @@ class ConceptRecognitionAgent(BaseAgent):
         system_prompt += concepts_prompt
         model = self.extractor.model
         logger.debug(f"Prompting with: {text}")
-        response = model.prompt(text, system=system_prompt)
+        response = cached_prompt(model, text, system=system_prompt)
         anns = parse_annotations(response.text())
 
         logger.info(f"Anns: {anns}")
@@ -396,7 +397,7 @@ class ConceptRecognitionAgent(BaseAgent):
         system_prompt += concepts_prompt
         model = self.extractor.model
         logger.debug(f"Prompting with: {text}")
-        response = model.prompt(text, system=system_prompt)
+        response = cached_prompt(model, text, system=system_prompt)
         spans = parse_spans(response.text(), concept_dict)
         return AnnotatedText(
             input_text=text, summary=response.text(), spans=spans, prompt=system_prompt
@@ -10,6 +10,7 @@ from curategpt.agents.base_agent import BaseAgent
 from curategpt.agents.chat_agent import ChatResponse
 from curategpt.extract import AnnotatedObject
 from curategpt.store import DBAdapter
+from curategpt.utils.llm_cache import cached_prompt
 
 logger = logging.getLogger(__name__)
 
@@ -139,8 +140,8 @@ class DatabaseAugmentedStructuredExtraction(BaseAgent):
                 docs.append(obj_text)
         if generate_background:
             # prompt = f"Generate a comprehensive description about the {target_class} with {context_property} = {seed}"
-            response = extractor.model.prompt(
-                f"Describe the {target_class} in the following text: {text}"
+            response = cached_prompt(
+                extractor.model, f"Describe the {target_class} in the following text: {text}"
             )
             if docs is None:
                 docs = []
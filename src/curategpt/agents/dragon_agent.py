@@ -1,8 +1,9 @@
 """Retrieval Augmented Generation (RAG) Base Class."""
 
 import logging
+import threading
 from dataclasses import dataclass, field
-from typing import Any, ClassVar, Dict, Iterable, List, Optional, Tuple, Union
+from typing import Any, ClassVar, Dict, Iterable, List, Optional, Union
 
 import yaml
 from pydantic import BaseModel, ConfigDict
@@ -10,6 +11,8 @@ from pydantic import BaseModel, ConfigDict
 from curategpt.agents.base_agent import BaseAgent
 from curategpt.extract import AnnotatedObject
 from curategpt.store import DBAdapter
+from curategpt.utils.concurrency import RateLimiter, map_ordered
+from curategpt.utils.llm_cache import cached_prompt
 
 logger = logging.getLogger(__name__)
 
@@ -69,6 +72,9 @@ class DragonAgent(BaseAgent):
 
     default_masked_fields: List[str] = field(default_factory=lambda: ["original_id"])
 
+    _store_lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False)
+    """Serializes store access when completing concurrently; stores are not thread-safe."""
+
     def complete(
         self,
         seed: Union[str, Dict[str, Any]],
@@ -98,7 +104,8 @@ class DragonAgent(BaseAgent):
         """
         extractor = self.extractor
         if not target_class:
-            cm = self.knowledge_source.collection_metadata(collection)
+            with self._store_lock:
+                cm = self.knowledge_source.collection_metadata(collection)
             if not cm:
                 raise ValueError(f"Invalid collection: {collection}")
             target_class = cm.object_type
@@ -144,12 +151,16 @@ class DragonAgent(BaseAgent):
         annotated_examples = []
         seed_search_term = seed if isinstance(seed, str) else yaml.safe_dump(seed, sort_keys=True)
         logger.debug(f"Searching for seed: {seed_search_term}")
-        for obj, _, _obj_meta in self.knowledge_source.search(
-            seed_search_term,
-            relevance_factor=self.relevance_factor,
-            collection=collection,
-            **kwargs,
-        ):
+        with self._store_lock:
+            results = list(
+                self.knowledge_source.search(
+                    seed_search_term,
+                    relevance_factor=self.relevance_factor,
+                    collection=collection,
+                    **kwargs,
+                )
+            )
+        for obj, _, _obj_meta in results:
             # training example input
             input_text = generate_input_str(obj)
             # training example output
@@ -174,11 +185,15 @@ class DragonAgent(BaseAgent):
         docs = []
         if self.document_adapter:
             logger.debug("Adding background knowledge.")
-            for _obj, _, obj_meta in self.document_adapter.search(
-                seed_search_term,
-                limit=self.background_document_limit,
-                collection=self.document_adapter_collection,
-            ):
+            with self._store_lock:
+                background_results = list(
+                    self.document_adapter.search(
+                        seed_search_term,
+                        limit=self.background_document_limit,
+                        collection=self.document_adapter_collection,
+                    )
+                )
+            for _obj, _, obj_meta in background_results:
                 obj_text = obj_meta["document"]
                 # TODO: use tiktoken to estimate
                 obj_text = obj_text[0 : self.max_background_document_size]
@@ -189,7 +204,7 @@ class DragonAgent(BaseAgent):
             prompt = generate_input_str(
                 seed, prefix="Generate a comprehensive description about the"
             )
-            response = extractor.model.prompt(prompt)
+            response = cached_prompt(extractor.model, prompt)
             if docs is None:
                 docs = []
             docs.append(response.text())
@@ -223,17 +238,25 @@ class DragonAgent(BaseAgent):
         field_to_predict: str,
         missing_only=True,
         object_ids: Optional[Iterable[str]] = None,
+        workers: int = 1,
+        retries: int = 0,
+        rate_limiter: Optional[RateLimiter] = None,
         **kwargs,
-    ) -> Iterable[Tuple[str, str, Any, Any]]:
+    ) -> Iterable[PredictedFieldValue]:
         """
         Generate missing value for a field for all objects in a collection.
 
+        Objects for which completion fails are logged and skipped.
+
         :param collection:
         :param field_to_predict:
         :param missing_only:
         :param object_ids:
+        :param workers: number of objects completed concurrently
+        :param retries: number of retries for an object whose completion fails
+        :param rate_limiter: limits how often completions start
         :param kwargs:
-        :return:
+        :return: predictions, in the order of the objects in the collection
         """
         logger.info("Fetching all objects...")
         it = self.knowledge_source.find(
@@ -241,23 +264,39 @@ class DragonAgent(BaseAgent):
             collection=collection,
             limit=100000,
         )
-        for obj, _, __ in it:
-            obj_id = obj["id"]
-            original_id = obj.get("original_id", None)
-            logger.debug(f"Checking {obj_id} // {object_ids}")
-            if object_ids and obj_id not in object_ids and original_id not in object_ids:
-                continue
-            curr_val = obj.get(field_to_predict, None)
-            if missing_only and curr_val:
-                logger.debug(f"Skipping; {field_to_predict} already present: {curr_val}")
+
+        def _objects_to_complete():
+            for obj, _, __ in it:
+                obj_id = obj["id"]
+                original_id = obj.get("original_id", None)
+                logger.debug(f"Checking {obj_id} // {object_ids}")
+                if object_ids and obj_id not in object_ids and original_id not in object_ids:
+                    continue
+                curr_val = obj.get(field_to_predict, None)
+                if missing_only and curr_val:
+                    logger.debug(f"Skipping; {field_to_predict} already present: {curr_val}")
+                    continue
+                yield obj
+
+        # objects are read as workers become free, at most a window of them ahead
+        tasks = map_ordered(
+            lambda obj: self.complete(obj, collection=collection, **kwargs),
+            _objects_to_complete(),
+            workers=workers,
+            retries=retries,
+            rate_limiter=rate_limiter,
+        )
+        for task in tasks:
+            if not task.ok:
+                logger.error(f"Could not complete {task.item['id']}: {task.error}")
                 continue
-            ao = self.complete(obj, collection=collection, **kwargs)
+            obj = task.item
             yield PredictedFieldValue(
-                id=obj_id,
-                original_id=original_id,
+                id=obj["id"],
+                original_id=obj.get("original_id", None),
                 field_predicted=field_to_predict,
-                predicted_value=ao.object.get(field_to_predict, None),
-                current_value=curr_val,
+                predicted_value=task.result.object.get(field_to_predict, None),
+                current_value=obj.get(field_to_predict, None),
             )
 
     def generate_queries(self, context_property="name", n=5, **kwargs) -> List[str]:
@@ -283,7 +322,7 @@ class DragonAgent(BaseAgent):
         Suggested:
         """
         logger.info(f"PROMPT: {prompt}")
-        response = self.extractor.model.prompt(prompt, system=system)
+        response = cached_prompt(self.extractor.model, prompt, system=system)
         txt = response.text()
         if "." in txt:
             txt = txt[0 : txt.index(".")]
@@ -355,7 +394,7 @@ class DragonAgent(BaseAgent):
         prompt = "Example records:\n\n" + "\n\n".join(texts)
 
         prompt += f"\n\nInput record:\n\n{_obj_as_str(obj)}"
-        response = self.extractor.model.prompt(prompt, system=system)
+        response = cached_prompt(self.extractor.model, prompt, system=system)
         ao = self.extractor.deserialize(response.text(), format="yaml")
         if not isinstance(ao.object, dict):
             logger.warning(f"Expected dict, got {ao.object}")
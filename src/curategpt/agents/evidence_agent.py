@@ -9,7 +9,8 @@ from curategpt import BasicExtractor
 from curategpt.agents.base_agent import BaseAgent
 from curategpt.agents.chat_agent import ChatAgent, ChatResponse
 from curategpt.formatters.format_utils import object_as_yaml
-from curategpt.utils.tokens import estimate_num_tokens, max_tokens_by_model
+from curategpt.utils.llm_cache import cached_prompt
+from curategpt.utils.tokens import max_tokens_by_model, select_within_budget
 from curategpt.wrappers import BaseWrapper
 
 logger = logging.getLogger(__name__)
@@ -70,41 +71,28 @@ class EvidenceAgent(BaseAgent):
                 query, relevance_factor=chat_agent.relevance_factor, limit=limit, **kwargs
             )
         )
-        # TODO: DRY
-        while True:
-            i = 0
-            references = {}
-            texts = []
-            current_length = 0
-            for obj, _, _obj_meta in kb_results:
-                i += 1
-                obj_text = yaml.dump({k: v for k, v in obj.items() if v}, sort_keys=False)
-                references[str(i)] = obj_text
-                texts.append(f"## Reference\n{obj_text}")
-                current_length += len(obj_text)
-            model = extractor.model
-            logger.info(f"Using model: {model.model_id}")
+        texts = [
+            "## Reference\n" + yaml.dump({k: v for k, v in obj.items() if v}, sort_keys=False)
+            for obj, _, _obj_meta in kb_results
+        ]
+        model = extractor.model
+        logger.info(f"Using model: {model.model_id}")
+
+        def _prompt(background: str) -> str:
             prompt = "---\nBackground literature:\n"
-            prompt += "\n".join(texts)
+            prompt += background
             prompt += f"---\nHere is the Statement: {query}.\n"
-            logger.debug(f"Candidate Prompt: {prompt}")
-            estimated_length = estimate_num_tokens([prompt])
-            logger.debug(
-                f"Max tokens {extractor.model.model_id}: {max_tokens_by_model(extractor.model.model_id)}"
-            )
-            # TODO: use a more precise estimate of the length
-            if estimated_length + 300 < max_tokens_by_model(extractor.model.model_id):
-                break
-            else:
-                # remove least relevant
-                logger.debug(f"Removing least relevant of {len(kb_results)}: {kb_results[-1]}")
-                if not kb_results:
-                    raise ValueError(f"Prompt too long: {prompt}.")
-                kb_results.pop()
+            return prompt
 
+        # least relevant results are left out if the prompt is too long
+        selected = select_within_budget(
+            _prompt(""), [f"{text}\n" for text in texts], max_tokens_by_model(model.model_id)
+        )
+        prompt = _prompt("\n".join(texts[i] for i in selected))
         logger.debug(f"Prompt: {prompt}")
 
-        response = model.prompt(
+        response = cached_prompt(
+            model,
             prompt,
             system="""
         You are a scientist assistant. Given a statement in subject-predicate-object form, your job is
@@ -15,7 +15,8 @@ from pydantic import BaseModel, ConfigDict
 from curategpt.agents.base_agent import BaseAgent
 from curategpt.formatters.format_utils import remove_formatting
 from curategpt.store.db_adapter import SEARCH_RESULT
-from curategpt.utils.tokens import estimate_num_tokens, max_tokens_by_model
+from curategpt.utils.llm_cache import cached_prompt
+from curategpt.utils.tokens import max_tokens_by_model, select_within_budget
 
 logger = logging.getLogger(__name__)
 
@@ -111,35 +112,23 @@ class MappingAgent(BaseAgent):
             mappings = list(self.categorize_mappings(query, kb_results, **kwargs))
             return MappingSet(mappings=mappings)
         model = self.extractor.model
-        while True:
-            i = 0
-            references = {}
-            objects = {}
-            texts = []
-            current_length = 0
-            for obj, _, _obj_meta in kb_results:
-                i += 1
-                obj_text = yaml.dump(
-                    {k: v for k, v in obj.items() if v and (fields is None or k in fields)},
-                    sort_keys=False,
-                )
-                references[str(i)] = obj_text
-                objects[str(i)] = obj
-                texts.append(f"## REF {i}\n{obj_text}")
-                current_length += len(obj_text)
-            prompt = PROMPT_TEMPLATE.format(body="".join(texts), query=query)
-            logger.debug(f"Prompt: {prompt}")
-            estimated_length = estimate_num_tokens([prompt])
-            logger.debug(f"Max tokens {model.model_id}: {max_tokens_by_model(model.model_id)}")
-            # TODO: use a more precise estimate of the length
-            if estimated_length + 300 < max_tokens_by_model(model.model_id):
-                break
-            else:
-                # remove least relevant
-                if not kb_results:
-                    raise ValueError(f"Prompt too long: {prompt}.")
-                kb_results.pop()
-        response = model.prompt(prompt)
+        texts = []
+        for i, (obj, _, _obj_meta) in enumerate(kb_results, 1):
+            obj_text = yaml.dump(
+                {k: v for k, v in obj.items() if v and (fields is None or k in fields)},
+                sort_keys=False,
+            )
+            texts.append(f"## REF {i}\n{obj_text}")
+        # least relevant results are left out if the prompt is too long
+        selected = select_within_budget(
+            PROMPT_TEMPLATE.format(body="", query=query),
+            texts,
+            max_tokens_by_model(model.model_id),
+        )
+        objects = {str(i + 1): kb_results[i][0] for i in selected}
+        prompt = PROMPT_TEMPLATE.format(body="".join(texts[i] for i in selected), query=query)
+        logger.debug(f"Prompt: {prompt}")
+        response = cached_prompt(model, prompt)
 
         # Need to remove Markdown formatting here or it won't parse as JSON
         response_text = remove_formatting(text=response.text(), expect_format="json")
@@ -188,7 +177,7 @@ class MappingAgent(BaseAgent):
             prompt += "\n\n"
             prompt += "Relationship:\n"
             model = self.extractor.model
-            response = model.prompt(prompt)
+            response = cached_prompt(model, prompt)
             response_text = response.text()
             if response_text in MappingPredicate.__members__:
                 pred = MappingPredicate[response_text]
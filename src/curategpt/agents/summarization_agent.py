@@ -3,6 +3,7 @@ from dataclasses import dataclass
 from typing import List
 
 from curategpt.agents.base_agent import BaseAgent
+from curategpt.utils.llm_cache import cached_prompt
 from curategpt.wrappers import BaseWrapper
 
 logger = logging.getLogger(__name__)
@@ -82,5 +83,5 @@ class SummarizationAgent(BaseAgent):
         model = self.extractor.model
         if not system_prompt:
             system_prompt = "Summarize these entities"
-        response = model.prompt(text, system=system_prompt)
+        response = cached_prompt(model, text, system=system_prompt)
         return response.text()
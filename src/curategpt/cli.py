@@ -7,43 +7,28 @@ import logging
 import sys
 import tempfile
 import time
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 
 import click
-import jsonpatch
-import pandas as pd
-import requests
 import yaml
 from click_default_group import DefaultGroup
-from linkml_runtime.dumpers import json_dumper
-from linkml_runtime.utils.yamlutils import YAMLRoot
-from llm import UnknownModelError, get_model, get_plugins
-from llm.cli import load_conversation
-from oaklib import get_adapter
-from pydantic import BaseModel
-
-from curategpt import ChromaDBAdapter, __version__
-from curategpt.agents.bootstrap_agent import BootstrapAgent, KnowledgeBaseSpecification
-from curategpt.agents.chat_agent import ChatAgent, ChatResponse
-from curategpt.agents.concept_recognition_agent import AnnotationMethod, ConceptRecognitionAgent
-from curategpt.agents.dase_agent import DatabaseAugmentedStructuredExtraction
-from curategpt.agents.dragon_agent import DragonAgent
-from curategpt.agents.evidence_agent import EvidenceAgent
-from curategpt.agents.huggingface_agent import HuggingFaceAgent
-from curategpt.agents.summarization_agent import SummarizationAgent
-from curategpt.evaluation.dae_evaluator import DatabaseAugmentedCompletionEvaluator
-from curategpt.evaluation.evaluation_datamodel import StratifiedCollection, Task
-from curategpt.evaluation.runner import run_task
-from curategpt.evaluation.splitter import stratify_collection
-from curategpt.extract import AnnotatedObject
-from curategpt.extract.basic_extractor import BasicExtractor
-from curategpt.store import get_store
-from curategpt.store.schema_proxy import SchemaProxy
-from curategpt.utils.vectordb_operations import match_collections
-from curategpt.wrappers import BaseWrapper, get_wrapper
-from curategpt.wrappers.literature.pubmed_wrapper import PubmedWrapper
-from curategpt.wrappers.ontology import OntologyWrapper
+
+from curategpt import __version__
+from curategpt.store import STORES, get_store
+from curategpt.store.metadata import IndexCheckpoint
+from curategpt.utils.llm_cache import cached_prompt, disable_llm_cache, enable_llm_cache
+from curategpt.utils.profiling import PROFILE_MODES, Profiler
+from curategpt.wrappers import WRAPPERS, get_wrapper
+
+# heavy dependencies (agents, stores, llm, oaklib, pandas, ...) are imported in
+# the commands that use them, to keep startup fast
+if TYPE_CHECKING:
+    from curategpt.agents.chat_agent import ChatResponse
+    from curategpt.extract import AnnotatedObject
+    from curategpt.store import DBAdapter
+    from curategpt.wrappers import BaseWrapper
 
 __all__ = [
     "main",
@@ -51,7 +36,7 @@ __all__ = [
 
 
 def dump(
-    obj: Union[str, AnnotatedObject, Dict],
+    obj: Union[str, "AnnotatedObject", Dict],
     format="yaml",
     old_object: Optional[Dict] = None,
     primary_key: Optional[str] = None,
@@ -65,14 +50,21 @@ def dump(
     :param primary_key: (when format=="patch")
     :return:
     """
+    from pydantic import BaseModel
+
     if isinstance(obj, str):
         print(obj)
         return
-    if isinstance(obj, AnnotatedObject):
+    # objects of these types can only exist if their (heavy) modules are loaded already
+    extractor = sys.modules.get("curategpt.extract.extractor")
+    if extractor and isinstance(obj, extractor.AnnotatedObject):
         obj = obj.object
     if isinstance(obj, BaseModel):
         obj = obj.dict()
-    if isinstance(obj, YAMLRoot):
+    yamlutils = sys.modules.get("linkml_runtime.utils.yamlutils")
+    if yamlutils and isinstance(obj, yamlutils.YAMLRoot):
+        from linkml_runtime.dumpers import json_dumper
+
         obj = json_dumper.to_dict(obj)
     if format is None or format == "yaml":
         set = yaml.dump(obj, sort_keys=False)
@@ -81,6 +73,8 @@ def dump(
     elif format == "blob":
         set = list(obj.values())[0]
     elif format == "patch":
+        import jsonpatch
+
         patch = jsonpatch.make_patch(old_object, obj)
         patch = jsonpatch.make_patch(old_object, obj)
         patch = json.loads(patch.to_string())
@@ -175,9 +169,175 @@ init_with_option = click.option(
 batch_size_option = click.option(
     "--batch-size", default=None, show_default=True, type=click.INT, help="Batch size for indexing."
 )
+resume_option = click.option(
+    "--resume/--no-resume",
+    default=False,
+    show_default=True,
+    help=(
+        "Resume an interrupted indexing run from the checkpoint stored in the collection."
+        " Implies --append. Committed objects are not re-embedded or re-inserted, but the"
+        " source is still read up to the checkpoint, so wrappers that fetch per object"
+        " should use a response cache."
+    ),
+)
+
+
+def _enable_llm_cache(ctx: click.Context, param: click.Parameter, value: bool):
+    if not value:
+        return
+    cache = enable_llm_cache()
+
+    def _report():
+        stats = cache.stats()
+        click.echo(
+            f"LLM cache {cache.path}: {stats['hits']} hits, {stats['misses']} misses,"
+            f" {stats['size']} entries",
+            err=True,
+        )
+        disable_llm_cache()
+
+    ctx.call_on_close(_report)
+
+
+llm_cache_option = click.option(
+    "--llm-cache/--no-llm-cache",
+    default=False,
+    show_default=True,
+    expose_value=False,
+    callback=_enable_llm_cache,
+    help=(
+        "Reuse LLM completions for identical prompts, stored in $CURATEGPT_LLM_CACHE"
+        " (default ~/.cache/curategpt/llm_cache.sqlite)."
+        " Expiry and size are set with $CURATEGPT_LLM_CACHE_TTL (seconds)"
+        " and $CURATEGPT_LLM_CACHE_SIZE (entries)."
+    ),
+)
+
+
+def _enable_search_cache(ctx: click.Context, param: click.Parameter, value: Optional[str]):
+    if not value:
+        return
+    from curategpt.store.search_cache import disable_search_cache, enable_search_cache
+
+    cache = enable_search_cache(value)
+
+    def _report():
+        stats = cache.stats()
+        click.echo(
+            f"Search cache: {stats['hits']} hits, {stats['misses']} misses", err=True
+        )
+        disable_search_cache()
+
+    ctx.call_on_close(_report)
+
+
+search_cache_option = click.option(
+    "--search-cache",
+    expose_value=False,
+    callback=_enable_search_cache,
+    help=(
+        "Reuse the results of identical searches, kept in 'memory' or in a SQLite file"
+        " (shared across runs; only writes made with the same file invalidate it)."
+    ),
+)
+
+
+workers_option = click.option(
+    "--workers",
+    "-j",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of objects to complete concurrently. Results are output in input order.",
+)
+retries_option = click.option(
+    "--retries",
+    default=0,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help="Number of retries for an object whose completion fails; failed objects are skipped.",
+)
+requests_per_minute_option = click.option(
+    "--requests-per-minute",
+    type=click.FLOAT,
+    help="Maximum number of completions to start per minute, across all workers.",
+)
+
+
+def _concurrency(workers: int, retries: int, requests_per_minute: Optional[float]) -> dict:
+    """Arguments for running completions concurrently (see :func:`map_ordered`)."""
+    from curategpt.utils.concurrency import RateLimiter
+
+    return {
+        "workers": workers,
+        "retries": retries,
+        "rate_limiter": RateLimiter(requests_per_minute) if requests_per_minute else None,
+    }
+
+
+def _resume_checkpoint(
+    db: "DBAdapter", collection: str, model: Optional[str]
+) -> Optional[IndexCheckpoint]:
+    """
+    Get the checkpoint to resume indexing from.
+
+    The model of the checkpoint is always the model the collection was indexed with.
+
+    :param db:
+    :param collection:
+    :param model: model requested on the command line, must match the collection if set
+    :return: checkpoint, or None if the collection does not exist
+    """
+    if collection not in db.list_collection_names():
+        logging.warning(f"Collection {collection} does not exist; indexing from the start")
+        return None
+    cm = db.collection_metadata(collection)
+    checkpoint = cm.checkpoint if cm else None
+    indexed_model = cm.model if cm and cm.model else None
+    if indexed_model is None and checkpoint:
+        indexed_model = checkpoint.model
+    if model and indexed_model and model != indexed_model:
+        raise click.UsageError(
+            f"Cannot resume {collection} with model {model}; it was indexed with {indexed_model}"
+        )
+    if checkpoint is None:
+        logging.warning(
+            f"No checkpoint found for {collection}; keeping existing objects and indexing all sources"
+        )
+        checkpoint = IndexCheckpoint()
+    checkpoint.model = indexed_model
+    logging.info(f"Resuming {collection} from {checkpoint}")
+    return checkpoint
+
+
+def _start_checkpoint(
+    previous: Optional[IndexCheckpoint], source: str, model: str, completed_sources: List[str]
+) -> IndexCheckpoint:
+    """Create the checkpoint for indexing a source, continuing from a previous one if it matches."""
+    if previous and previous.source == source and source not in previous.completed_sources:
+        offset, last_id = previous.offset, previous.last_id
+    else:
+        offset, last_id = 0, None
+    return IndexCheckpoint(
+        source=str(source),
+        offset=offset,
+        last_id=last_id,
+        model=model,
+        completed_sources=list(completed_sources),
+    )
+
+
+def _complete_checkpoint(
+    db: "DBAdapter", collection: str, checkpoint: IndexCheckpoint
+) -> List[str]:
+    """Mark the source of a checkpoint as fully indexed; returns all completed sources."""
+    checkpoint.completed_sources.append(checkpoint.source)
+    if collection in db.list_collection_names():
+        db.record_index_checkpoint(collection, checkpoint)
+    return checkpoint.completed_sources
 
 
-def show_chat_response(response: ChatResponse, show_references: bool = True):
+def show_chat_response(response: "ChatResponse", show_references: bool = True):
     """Show a chat response."""
     print("# Response:\n")
     click.echo(response.formatted_body)
@@ -198,20 +358,51 @@ def show_chat_response(response: ChatResponse, show_references: bool = True):
             print("```")
 
 
+class MainGroup(DefaultGroup):
+    def parse_args(self, ctx, args):
+        # --profile takes an optional value; a bare --profile must not consume the command name
+        args = [
+            (
+                f"--profile={PROFILE_MODES[0]}"
+                if arg == "--profile" and (i + 1 == len(args) or args[i + 1] not in PROFILE_MODES)
+                else arg
+            )
+            for i, arg in enumerate(args)
+        ]
+        return super().parse_args(ctx, args)
+
+
 @click.group(
-    cls=DefaultGroup,
+    cls=MainGroup,
     default="search",
     default_if_no_args=True,
 )
 @click.option("-v", "--verbose", count=True)
 @click.option("-q", "--quiet")
+@click.option(
+    "--profile",
+    type=click.Choice(PROFILE_MODES),
+    help=(
+        "Profile the command and print a per-stage breakdown on exit. "
+        "A bare --profile means --profile=stages; cprofile also runs cProfile."
+    ),
+)
+@click.option(
+    "--profile-output",
+    help=(
+        "File to write the profile to: stage timings as JSON, or with --profile=cprofile "
+        "a pstats file, or a speedscope file if the name ends in .json."
+    ),
+)
 @click.version_option(__version__)
-def main(verbose: int, quiet: bool):
+def main(verbose: int, quiet: bool, profile: str, profile_output: str):
     """
     CLI for curategpt.
 
     :param verbose: Verbosity while running.
     :param quiet: Boolean to be quiet or verbose.
+    :param profile: Profiling mode, stages or cprofile.
+    :param profile_output: File to write the profile to.
     """
     # logger = logging.getLogger()
     logging.basicConfig()
@@ -225,6 +416,19 @@ def main(verbose: int, quiet: bool):
     if quiet:
         logger.setLevel(level=logging.ERROR)
     logger.info(f"Logger {logger.name} set to level {logger.level}")
+    if profile_output and not profile:
+        profile = PROFILE_MODES[0]
+    if profile:
+        profiler = Profiler(profile)
+
+        def _report():
+            profiler.stop()
+            click.echo(profiler.report(), err=True)
+            if profile_output:
+                profiler.write(profile_output)
+
+        click.get_current_context().call_on_close(_report)
+        profiler.start()
 
 
 @main.command()
@@ -255,11 +459,13 @@ def main(verbose: int, quiet: bool):
 @click.option("--remove-field", multiple=True, help="Field to remove recursively from each object.")
 @batch_size_option
 @encoding_option
+@resume_option
 @click.argument("files", nargs=-1)
 def index(
     files,
     path,
     append: bool,
+    resume: bool,
     text_field,
     collection,
     model,
@@ -304,7 +510,18 @@ def index(
 
     This will index the DataElementQueryResults from each file.
 
+    Progress is checkpointed in the collection metadata after each batch. If a run
+    is interrupted, re-running the same command with --resume skips objects that
+    were already committed:
+
+        curategpt index --resume -c doc files/*json
+
+    Note that the objects before the checkpoint are still read from the source
+    (only embedding and insertion are skipped).
+
     """
+    from pydantic import BaseModel
+
     db = get_store(database_type, path)
     db.text_lookup = text_field
     if glob:
@@ -323,14 +540,23 @@ def index(
         wrapper = None
     if collect:
         raise NotImplementedError
-    if not append:
+    previous_checkpoint = None
+    if resume:
+        previous_checkpoint = _resume_checkpoint(db, collection, model)
+        if previous_checkpoint and previous_checkpoint.model:
+            model = previous_checkpoint.model
+    elif not append:
         if collection in db.list_collection_names():
             db.remove_collection(collection)
     if model is None:
         model = "openai:"
     if not files and wrapper:
         files = ["API"]
+    completed_sources = previous_checkpoint.completed_sources if previous_checkpoint else []
     for file in files:
+        if file in completed_sources:
+            logging.info(f"Skipping {file}, already indexed")
+            continue
         if encoding == "detect":
             import chardet
 
@@ -384,7 +610,14 @@ def index(
             raise NotImplementedError(
                 "Use yq instead, e.g. yq eval 'del(.. | .evidence?)' input.yaml"
             )
-        db.insert(objs, model=model, collection=collection, batch_size=batch_size)
+        checkpoint = _start_checkpoint(previous_checkpoint, file, model, completed_sources)
+        if checkpoint.offset:
+            logging.info(f"Resuming {file} after {checkpoint.offset} committed objects")
+            objs = islice(objs, checkpoint.offset, None)
+        db.insert(
+            objs, model=model, collection=collection, batch_size=batch_size, checkpoint=checkpoint
+        )
+        completed_sources = _complete_checkpoint(db, collection, checkpoint)
     db.update_collection_metadata(
         collection, model=model, object_type=object_type, description=description
     )
@@ -402,6 +635,7 @@ def index(
     show_default=True,
     help="Whether to show documents/text (e.g. for chromadb).",
 )
+@search_cache_option
 @click.argument("query")
 def search(query, path, collection, show_documents, database_type, **kwargs):
     """Search a collection using embedding search.
@@ -479,6 +713,8 @@ def all_by_all(
     curategpt all-by-all -p stagedb -P stagedb -c objects_a -X objects_b -D chromadb --ids-only
 
     """
+    from curategpt.utils.vectordb_operations import match_collections
+
     db = get_store(database_type, path)
     other_db = get_store(database_type, path)
     if other_path is None:
@@ -572,13 +808,13 @@ def matches(id, path, collection, database_type):
     show_default=True,
     help="Whether to split sentences.",
 )
-# choose from options in AnnotationMethod
+# values of AnnotationMethod, which is not imported here as it loads the agents
 @click.option(
     "--method",
     "-M",
-    default=AnnotationMethod.INLINE.value,
+    default="inline",
     show_default=True,
-    type=click.Choice([m for m in AnnotationMethod]),
+    type=click.Choice(["inline", "concept_list", "two_pass"]),
     help="Annotation method.",
 )
 @click.option(
@@ -592,6 +828,8 @@ def matches(id, path, collection, database_type):
     help="Category/ies for candidate IDs.",
 )
 @click.argument("texts", nargs=-1)
+@llm_cache_option
+@search_cache_option
 def annotate(
     texts,
     path,
@@ -607,6 +845,9 @@ def annotate(
     **kwargs,
 ):
     """Concept recognition."""
+    from curategpt.agents.concept_recognition_agent import ConceptRecognitionAgent
+    from curategpt.extract.basic_extractor import BasicExtractor
+
     db = get_store(database_type, path)
     extractor = BasicExtractor()
     if input_file:
@@ -672,6 +913,8 @@ def annotate(
 )
 @output_format_option
 @click.argument("text", nargs=-1)
+@llm_cache_option
+@search_cache_option
 def extract(
     text,
     input,
@@ -698,6 +941,11 @@ def extract(
             a buttered roll filled with deep fried potato wedges"
 
     """
+    from curategpt.agents.dase_agent import DatabaseAugmentedStructuredExtraction
+    from curategpt.extract.basic_extractor import BasicExtractor
+    from curategpt.store import ChromaDBAdapter
+    from curategpt.store.schema_proxy import SchemaProxy
+
     db = get_store(database_type, path)
     if schema:
         schema_manager = SchemaProxy(schema)
@@ -764,6 +1012,7 @@ def extract(
     "--pubmed-id-file",
 )
 @click.argument("ids", nargs=-1)
+@llm_cache_option
 def extract_from_pubmed(
     ids,
     pubmed_id_file,
@@ -788,6 +1037,12 @@ def extract_from_pubmed(
 
     See the `extract` command
     """
+    from curategpt.agents.dase_agent import DatabaseAugmentedStructuredExtraction
+    from curategpt.extract.basic_extractor import BasicExtractor
+    from curategpt.store import ChromaDBAdapter
+    from curategpt.store.schema_proxy import SchemaProxy
+    from curategpt.wrappers.literature.pubmed_wrapper import PubmedWrapper
+
     db = get_store(database_type, path)
     if schema:
         schema_manager = SchemaProxy(schema)
@@ -865,8 +1120,12 @@ def bootstrap():
     required=True,
     help="path to yaml config",
 )
+@llm_cache_option
 def bootstrap_schema(config, model):
     """Bootstrap a knowledge base with LinkML schema."""
+    from curategpt.agents.bootstrap_agent import BootstrapAgent, KnowledgeBaseSpecification
+    from curategpt.extract.basic_extractor import BasicExtractor
+
     extractor = BasicExtractor()
     if model:
         extractor.model_name = model
@@ -889,8 +1148,12 @@ def bootstrap_schema(config, model):
     "-s",
     help="path to yaml linkml schema",
 )
+@llm_cache_option
 def bootstrap_data(config, schema, model):
     """Bootstrap a knowledge base with initial data."""
+    from curategpt.agents.bootstrap_agent import BootstrapAgent, KnowledgeBaseSpecification
+    from curategpt.extract.basic_extractor import BasicExtractor
+
     extractor = BasicExtractor()
     if model:
         extractor.model_name = model
@@ -945,6 +1208,8 @@ def bootstrap_data(config, schema, model):
 @schema_option
 @output_format_option
 @click.argument("query")
+@llm_cache_option
+@search_cache_option
 def complete(
     query,
     path,
@@ -979,6 +1244,10 @@ def complete(
     Pass ``--extract-format`` to make the extractor use a different internal representation
     when communicating to the LLM
     """
+    from curategpt.agents.dragon_agent import DragonAgent
+    from curategpt.extract.basic_extractor import BasicExtractor
+    from curategpt.store.schema_proxy import SchemaProxy
+
     db = get_store(database_type, path)
     if schema:
         schema_manager = SchemaProxy(schema)
@@ -1044,6 +1313,8 @@ def complete(
 @output_format_option
 @click.option("--primary-key", help="Primary key for patch output.")
 @click.argument("where", nargs=-1)
+@llm_cache_option
+@search_cache_option
 def update(
     where,
     path,
@@ -1070,6 +1341,10 @@ def update(
         curategpt update -X yaml --model gpt-4o -p duckdb/objects.duckdb -c objects -D duckdb -Z definition id: Continuant --primary-key id -t patch > patch.yaml
 
     """
+    from curategpt.agents.dragon_agent import DragonAgent
+    from curategpt.extract.basic_extractor import BasicExtractor
+    from curategpt.store.schema_proxy import SchemaProxy
+
     db = get_store(database_type, path)
     where_str = " ".join(where)
     where_q = yaml.safe_load(where_str)
@@ -1144,6 +1419,8 @@ def update(
 @output_format_option
 @click.option("--primary-key", help="Primary key for patch output.")
 @click.argument("where", nargs=-1)
+@llm_cache_option
+@search_cache_option
 def review(
     where,
     path,
@@ -1173,6 +1450,10 @@ def review(
              At the same time, conform to genus-differentia style and OBO best practice."
 
     """
+    from curategpt.agents.dragon_agent import DragonAgent
+    from curategpt.extract.basic_extractor import BasicExtractor
+    from curategpt.store.schema_proxy import SchemaProxy
+
     where_str = " ".join(where)
     where_q = yaml.safe_load(where_str)
     db = get_store(database_type, path)
@@ -1247,6 +1528,11 @@ def review(
 @extract_format_option
 @output_format_option
 @click.argument("input_file")
+@workers_option
+@retries_option
+@requests_per_minute_option
+@llm_cache_option
+@search_cache_option
 def complete_multiple(
     input_file,
     path,
@@ -1261,6 +1547,9 @@ def complete_multiple(
     extract_format,
     database_type,
     docstore_database_type,
+    workers,
+    retries,
+    requests_per_minute,
     **kwargs,
 ):
     """
@@ -1270,6 +1559,10 @@ def complete_multiple(
     -------
         curategpt complete-multiple -c obo_go -P label terms.txt
     """
+    from curategpt.agents.dragon_agent import DragonAgent
+    from curategpt.extract.basic_extractor import BasicExtractor
+    from curategpt.store.schema_proxy import SchemaProxy
+
     # TODO: NOT TESTED
     db = get_store(database_type, path)
     if schema:
@@ -1289,15 +1582,23 @@ def complete_multiple(
     if docstore_path or docstore_collection:
         dac.document_adapter = get_store(docstore_database_type, docstore_path)
         dac.document_adapter_collection = docstore_collection
+    from curategpt.utils.concurrency import map_ordered
+
+    def _complete(query: str):
+        query = query.split("\t")[0]
+        if ":" in query:
+            query = yaml.safe_load(query)
+        return dac.complete(query, context_property=query_property, rules=rule, **filtered_kwargs)
+
     with open(input_file) as f:
         queries = [l.strip() for l in f.readlines()]
-        for query in queries:
-            query = query.split("\t")[0]
-            if ":" in query:
-                query = yaml.safe_load(query)
-            ao = dac.complete(query, context_property=query_property, rules=rule, **filtered_kwargs)
-            print("---")
-            dump(ao.object, format=output_format)
+    tasks = map_ordered(_complete, queries, **_concurrency(workers, retries, requests_per_minute))
+    for task in tasks:
+        if not task.ok:
+            logging.error(f"Could not complete {task.item}: {task.error}")
+            continue
+        print("---", flush=True)
+        dump(task.result.object, format=output_format)
 
 
 @main.command()
@@ -1336,6 +1637,8 @@ def complete_multiple(
 @schema_option
 @extract_format_option
 @output_format_option
+@llm_cache_option
+@search_cache_option
 def complete_auto(
     path,
     collection,
@@ -1357,6 +1660,11 @@ def complete_auto(
     -------
         curategpt complete-auto -c obo_go -N 5
     """
+    from curategpt.agents.dragon_agent import DragonAgent
+    from curategpt.extract.basic_extractor import BasicExtractor
+    from curategpt.store import ChromaDBAdapter
+    from curategpt.store.schema_proxy import SchemaProxy
+
     db = ChromaDBAdapter(path)
     if schema:
         schema_manager = SchemaProxy(schema)
@@ -1440,6 +1748,11 @@ def complete_auto(
     help="Only generate missing values.",
 )
 @schema_option
+@workers_option
+@retries_option
+@requests_per_minute_option
+@llm_cache_option
+@search_cache_option
 def complete_all(
     path,
     collection,
@@ -1453,6 +1766,9 @@ def complete_all(
     id_file,
     database_type,
     docstore_database_type,
+    workers,
+    retries,
+    requests_per_minute,
     **kwargs,
 ):
     """
@@ -1462,6 +1778,10 @@ def complete_all(
     -------
         curategpt generate  -c obo_go
     """
+    from curategpt.agents.dragon_agent import DragonAgent
+    from curategpt.extract.basic_extractor import BasicExtractor
+    from curategpt.store.schema_proxy import SchemaProxy
+
     # TODO: NOT TESTED
     db = get_store(database_type, path)
     if schema:
@@ -1489,10 +1809,11 @@ def complete_all(
         field_to_predict=field_to_predict,
         rules=rule,
         object_ids=object_ids,
+        **_concurrency(workers, retries, requests_per_minute),
         **filtered_kwargs,
     )
     for pred in it:
-        print(yaml.dump(pred.dict(), sort_keys=False))
+        print(yaml.dump(pred.dict(), sort_keys=False), flush=True)
 
 
 @main.command()
@@ -1544,6 +1865,11 @@ def complete_all(
     help="Number (max) of tests to run.",
 )
 @schema_option
+@workers_option
+@retries_option
+@requests_per_minute_option
+@llm_cache_option
+@search_cache_option
 def generate_evaluate(
     path,
     docstore_path,
@@ -1557,6 +1883,9 @@ def generate_evaluate(
     rule: List[str],
     database_type,
     docstore_database_type,
+    workers,
+    retries,
+    requests_per_minute,
     **kwargs,
 ):
     """
@@ -1566,6 +1895,11 @@ def generate_evaluate(
     -------
         curategpt -v generate-evaluate -c cdr_training -T cdr_test -F statements -m gpt-4
     """
+    from curategpt.agents.dragon_agent import DragonAgent
+    from curategpt.evaluation.dae_evaluator import DatabaseAugmentedCompletionEvaluator
+    from curategpt.extract.basic_extractor import BasicExtractor
+    from curategpt.store.schema_proxy import SchemaProxy
+
     db = get_store(database_type, path)
     if schema:
         schema_manager = SchemaProxy(schema)
@@ -1588,7 +1922,12 @@ def generate_evaluate(
     evaluator = DatabaseAugmentedCompletionEvaluator(
         agent=rage, fields_to_predict=hold_back_fields, fields_to_mask=mask_fields
     )
-    results = evaluator.evaluate(test_collection, num_tests=num_tests, **kwargs)
+    results = evaluator.evaluate(
+        test_collection,
+        num_tests=num_tests,
+        **_concurrency(workers, retries, requests_per_minute),
+        **kwargs,
+    )
     print(yaml.dump(results.dict(), sort_keys=False))
 
 
@@ -1643,6 +1982,8 @@ def generate_evaluate(
 )
 @generate_background_option
 @click.argument("tasks", nargs=-1)
+@llm_cache_option
+@search_cache_option
 def evaluate(
     tasks,
     working_directory,
@@ -1663,6 +2004,9 @@ def evaluate(
     -------
         curategpt evaluate src/curategpt/conf/tasks/bio-ont.tasks.yaml
     """
+    from curategpt.evaluation.evaluation_datamodel import Task
+    from curategpt.evaluation.runner import run_task
+
     normalized_tasks = []
     for task in tasks:
         if ":" in task:
@@ -1708,6 +2052,8 @@ def evaluate(
 @click.option("--num-testing", default=50, show_default=True)
 @click.option("--background", default="false", show_default=True)
 def evaluation_config(collections, models, fields_to_mask, fields_to_predict, background, **kwargs):
+    from curategpt.evaluation.evaluation_datamodel import StratifiedCollection, Task
+
     tasks = []
     # TODO: is there anything to do?
     # db = get_store(kwargs["database_type"], kwargs["path"])
@@ -1743,6 +2089,8 @@ def evaluation_config(collections, models, fields_to_mask, fields_to_predict, ba
 @click.argument("files", nargs=-1)
 def evaluation_compare(files, include_expected=False):
     """Compare evaluation results."""
+    import pandas as pd
+
     dfs = []
     predicted_cols = []
     other_cols = []
@@ -1787,13 +2135,16 @@ def evaluation_compare(files, include_expected=False):
 )
 @model_option
 @click.argument("file")
+@llm_cache_option
 def multiprompt(file, model, system, prompt):
+    from llm import get_model
+
     if model is None:
         model = "gpt-3.5-turbo"
     model_obj = get_model(model)
     with open(file) as f:
         for row in csv.DictReader(f, delimiter="\t"):
-            resp = model_obj.prompt(system=system, prompt=prompt.format(**row)).text()
+            resp = cached_prompt(model_obj, prompt.format(**row), system=system).text()
             resp = resp.replace("\n", " ")
             print("\t".join(list(row.values()) + [resp]))
 
@@ -1824,6 +2175,8 @@ def multiprompt(file, model, system, prompt):
     help="Continue the conversation with the given ID.",
 )
 @click.argument("query")
+@llm_cache_option
+@search_cache_option
 def ask(query, path, collection, model, show_references, _continue, conversation_id, database_type):
     """Chat with data in a collection.
 
@@ -1832,6 +2185,12 @@ def ask(query, path, collection, model, show_references, _continue, conversation
         curategpt ask -c obo_go "What are the parts of the nucleus?"
 
     """
+    from llm import UnknownModelError
+    from llm.cli import load_conversation
+
+    from curategpt.agents.chat_agent import ChatAgent
+    from curategpt.extract.basic_extractor import BasicExtractor
+
     db = get_store(database_type, path)
     extractor = BasicExtractor()
     if model:
@@ -1860,6 +2219,8 @@ def apply_patch(input_file, patch, primary_key):
 
     This can be executed after `update`
     """
+    import jsonpatch
+
     objs = list(yaml.safe_load_all(open(input_file)))
     logging.info(f"Applying patch to {len(objs)} objects")
     patch = yaml.safe_load(open(patch))
@@ -1909,6 +2270,8 @@ def apply_patch(input_file, patch, primary_key):
     help="jsonpath expression to select objects from the input file.",
 )
 @click.argument("query")
+@llm_cache_option
+@search_cache_option
 def citeseek(
     query,
     path,
@@ -1956,6 +2319,11 @@ def citeseek(
 
 
     """
+    from curategpt.agents.chat_agent import ChatAgent
+    from curategpt.agents.evidence_agent import EvidenceAgent
+    from curategpt.extract.basic_extractor import BasicExtractor
+    from curategpt.wrappers.literature.pubmed_wrapper import PubmedWrapper
+
     db = get_store(database_type, path)
     extractor = BasicExtractor()
     if model:
@@ -2012,6 +2380,7 @@ def citeseek(
 @click.option("--description-field", help="Field for descriptions.")
 @click.option("--system-prompt", help="System gpt prompt to use.")
 @click.argument("ids", nargs=-1)
+@llm_cache_option
 def summarize(ids, path, collection, model, view, database_type, **kwargs):
     """
     Summarize a list of objects.
@@ -2029,6 +2398,9 @@ def summarize(ids, path, collection, model, view, database_type, **kwargs):
         HGNC:1160  HGNC:26270 HGNC:24682 HGNC:7225 HGNC:13797 \
         HGNC:9118  HGNC:6396  HGNC:9179 HGNC:25358
     """
+    from curategpt.agents.summarization_agent import SummarizationAgent
+    from curategpt.extract.basic_extractor import BasicExtractor
+
     # TODO: with llama-2-7b-chat it's not working (ChunkedEncodingError)
     db = get_store(database_type, path)
     extractor = BasicExtractor()
@@ -2042,9 +2414,88 @@ def summarize(ids, path, collection, model, view, database_type, **kwargs):
     click.echo(response)
 
 
+@main.command()
+@click.option(
+    "-D",
+    "--database-type",
+    "database_types",
+    multiple=True,
+    default=["chromadb", "duckdb"],
+    show_default=True,
+    help="Adapter to benchmark; can be repeated.",
+)
+@click.option(
+    "--size",
+    "sizes",
+    multiple=True,
+    type=click.INT,
+    default=[1000],
+    show_default=True,
+    help="Number of synthetic objects; can be repeated, e.g. --size 1000 --size 100000.",
+)
+@click.option(
+    "--scenario",
+    "scenarios",
+    multiple=True,
+    help="Scenario to run; can be repeated (default all).",
+)
+@click.option(
+    "--queries", default=50, show_default=True, help="Number of queries for latency percentiles."
+)
+@click.option(
+    "--all-by-all-size",
+    default=1000,
+    show_default=True,
+    help="Number of objects used for the all-by-all scenario.",
+)
+@click.option("-o", "--output", type=click.File("w"), default="-", help="JSON file for results.")
+@click.option(
+    "--compare",
+    type=click.File("r"),
+    help="JSON results of an earlier run to compare against.",
+)
+@batch_size_option
+def bench(database_types, sizes, scenarios, queries, all_by_all_size, output, compare, batch_size):
+    """
+    Benchmark store adapters on synthetic collections.
+
+    Objects are embedded with the deterministic hashing embedder, so no network
+    access is needed. Results are written as JSON that can be compared across commits.
+
+    Example:
+
+        curategpt bench --size 1000 --size 100000 -o bench.json
+
+        curategpt bench -D duckdb --compare bench.json
+    """
+    import pandas as pd
+
+    from curategpt.utils.benchmark import compare_benchmarks, run_benchmarks
+
+    results = run_benchmarks(
+        list(database_types),
+        list(sizes),
+        scenarios=list(scenarios) if scenarios else None,
+        num_queries=queries,
+        batch_size=batch_size,
+        all_by_all_size=all_by_all_size,
+    )
+    output.write(json.dumps(results, indent=2))
+    output.write("\n")
+    if compare:
+        rows = compare_benchmarks(json.load(compare), results)
+        if rows:
+            click.echo(pd.DataFrame(rows).to_string(index=False), err=True)
+    for r in results["results"]:
+        if r["error"]:
+            click.echo(f"{r['adapter']} {r['scenario']} at {r['size']}: {r['error']}", err=True)
+
+
 @main.command()
 def plugins():
     "List installed plugins"
+    from llm import get_plugins
+
     print(yaml.dump(get_plugins()))
 
 
@@ -2185,6 +2636,39 @@ def copy_collection(path, collection, target_path, database_type, **kwargs):
     db.dump_then_load(collection, target=target)
 
 
+@collections.command(name="snapshot")
+@collection_option
+@click.option("-o", "--output", required=True, help="Directory of the snapshot store to write to.")
+@click.option(
+    "--dtype",
+    type=click.Choice(["float32", "float16"]),
+    default="float32",
+    show_default=True,
+    help="Precision of the stored vectors; float16 halves the size.",
+)
+@batch_size_option
+@path_option
+@database_type_option
+def snapshot_collection(path, collection, output, dtype, batch_size, database_type):
+    """
+    Write a read-only, memory-mapped snapshot of a collection.
+
+    The snapshot can be searched without loading the original database,
+    which makes startup fast for read-mostly serving.
+
+    Example:
+
+        curategpt collections snapshot -p duckdb/db.duckdb -D duckdb -c ont_cl -o snapshots
+
+        curategpt search -D snapshot -p snapshots -c ont_cl "neuron"
+    """
+    from curategpt.store.snapshot_adapter import write_snapshot
+
+    db = get_store(database_type, path)
+    cm = write_snapshot(db, collection, output, dtype=dtype, batch_size=batch_size or 1000)
+    click.echo(f"Wrote snapshot of {cm.object_count} objects to {output}")
+
+
 @collections.command(name="split")
 @collection_option
 @database_type_option
@@ -2257,6 +2741,8 @@ def split_collection(
 
     This can be run as a pre-processing step for generate-evaluate.
     """
+    from curategpt.evaluation.splitter import stratify_collection
+
     # TODO: not tested
     db = get_store(database_type, path)
     if test_id_file:
@@ -2309,9 +2795,29 @@ def ontology():
     "--index-fields",
     help="Fields to index; comma separated",
 )
+@resume_option
+@click.option(
+    "--incremental/--no-incremental",
+    default=False,
+    show_default=True,
+    help=(
+        "Update an existing collection to match the ontology, embedding only new and changed"
+        " terms and deleting obsolete ones. Implies --append."
+    ),
+)
 @click.argument("ont")
 def index_ontology_command(
-    ont, path, collection, append, model, index_fields, branches, database_type, **kwargs
+    ont,
+    path,
+    collection,
+    append,
+    model,
+    index_fields,
+    branches,
+    database_type,
+    resume,
+    incremental,
+    **kwargs,
 ):
     """
     Index an ontology.
@@ -2321,7 +2827,17 @@ def index_ontology_command(
         curategpt ontology index -c obo_hp $db/hp.db -D duckdb
         curategpt ontology index -p stagedb/duck.db -c ont-hp sqlite:obo:hp -D duckdb
 
+    An interrupted run can be continued with --resume.
+
+    After a new release of the ontology, the collection can be updated with --incremental,
+    rather than indexed again from scratch:
+
+        curategpt ontology index -c obo_hp $db/hp.db -D duckdb --incremental
+
     """
+    from oaklib import get_adapter
+
+    from curategpt.wrappers.ontology import OntologyWrapper
 
     s = time.time()
     oak_adapter = get_adapter(ont)
@@ -2340,10 +2856,41 @@ def index_ontology_command(
             return " ".join(vals)
 
         db.text_lookup = _text_lookup
-    if not append:
+    if incremental and resume:
+        raise click.UsageError("--incremental cannot be combined with --resume")
+    if incremental:
+        if collection in db.list_collection_names():
+            cm = db.collection_metadata(collection)
+            indexed_model = cm.model if cm else None
+            if model and indexed_model and model != indexed_model:
+                raise click.UsageError(
+                    f"Cannot update {collection} with model {model}; "
+                    f"it was indexed with {indexed_model}"
+                )
+            counts = view.update_collection(db, collection, model=model or indexed_model)
+            click.echo(
+                f"Updated {collection} in {time.time() - s} seconds: "
+                + ", ".join(f"{n} {k}" for k, n in counts.items())
+            )
+            return
+        logging.warning(f"Collection {collection} does not exist; indexing all terms")
+    previous_checkpoint = None
+    if resume:
+        previous_checkpoint = _resume_checkpoint(db, collection, model)
+        if previous_checkpoint and previous_checkpoint.model:
+            model = previous_checkpoint.model
+    elif not append:
         db.remove_collection(collection, exists_ok=True)
+    if model is None:
+        model = getattr(db, "default_model", None)
     click.echo(f"Indexing {len(list(view.objects()))} objects")
-    db.insert(view.objects(), collection=collection, model=model)
+    checkpoint = _start_checkpoint(previous_checkpoint, ont, model, [])
+    if ont in (previous_checkpoint.completed_sources if previous_checkpoint else []):
+        click.echo(f"{ont} is already indexed in {collection}")
+    else:
+        objs = islice(view.objects(), checkpoint.offset, None)
+        db.insert(objs, collection=collection, model=model, checkpoint=checkpoint)
+        _complete_checkpoint(db, collection, checkpoint)
     db.update_collection_metadata(collection, object_type="OntologyClass")
     e = time.time()
     click.echo(f"Indexed {len(list(view.objects()))} in {e - s} seconds")
@@ -2359,6 +2906,8 @@ def download_file(url):
     """
     Helper function to download a file from a URL to a temporary file.
     """
+    import requests
+
     local_filename = tempfile.mktemp()
     with requests.get(url, stream=True) as r:
         r.raise_for_status()
@@ -2372,6 +2921,8 @@ def load_embeddings_from_file(file_path, embedding_format=None):
     """
     Helper function to load embeddings from a file. Supports Parquet and CSV formats.
     """
+    import pandas as pd
+
     if (
         file_path.endswith(".parquet")
         or file_path.endswith(".parquet.gz")
@@ -2447,6 +2998,8 @@ def upload_embeddings(path, collection, repo_id, private, adapter, database_type
     Example:
         curategpt embeddings upload --repo-id biomedical-translator/my_repo --collection my_collection
     """
+    from curategpt.agents.huggingface_agent import HuggingFaceAgent
+
     db = get_store(database_type, path)
 
     try:
@@ -2473,6 +3026,19 @@ def view():
     "Virtual store/wrapper"
 
 
+@view.command(name="list")
+def list_views():
+    """
+    List the names of available wrappers and store adapters.
+
+    Wrappers and adapters provided by other packages through entry points are included.
+    """
+    for registry in (WRAPPERS, STORES):
+        print(f"## {registry.group}")
+        for name, reference in sorted(registry.references().items()):
+            print(f" - {name}: {reference}")
+
+
 @view.command(name="objects")
 @click.option("--view", "-V", required=True, help="Name of the wrapper to use.")
 @click.option("--source-locator")
@@ -2540,8 +3106,11 @@ def unwrap_objects(input_file, view, path, collection, output_format, database_t
 @limit_option
 @init_with_option
 @click.argument("query")
+@llm_cache_option
 def view_search(query, view, model, init_with, limit, **kwargs):
     """Search in a virtual store."""
+    from curategpt.extract.basic_extractor import BasicExtractor
+
     if init_with:
         for k, v in yaml.safe_load(init_with).items():
             kwargs[k] = v
@@ -2561,13 +3130,36 @@ def view_search(query, view, model, init_with, limit, **kwargs):
 @init_with_option
 @append_option
 @database_type_option
+@click.option(
+    "--incremental/--no-incremental",
+    default=False,
+    show_default=True,
+    help=(
+        "Only fetch objects updated since the collection was last synced, and upsert them."
+        " Implies --append. Supported by views with a 'since' setting, e.g. github."
+    ),
+)
 def view_index(
-    view, path, append, collection, model, init_with, batch_size, database_type, **kwargs
+    view,
+    path,
+    append,
+    collection,
+    model,
+    init_with,
+    batch_size,
+    database_type,
+    incremental,
+    **kwargs,
 ):
     """Populate an index from a view.
     curategpt -v index -p stagedb --batch-size 10 -V hpoa  -c hpoa -m openai:  (that uses chroma by default)
     curategpt -v index -p stagedb/hpoa.duckdb --batch-size 10 -V hpoa  -c hpoa -m openai: -D duckdb
 
+    The time of the latest update fetched by views that support it (e.g. github) is
+    stored in the collection metadata, so a later run can fetch only what changed since:
+
+    curategpt view index -c gh_uberon -V github --init-with "{repo: obophenotype/uberon}" --incremental
+
     """
     if init_with:
         for k, v in yaml.safe_load(init_with).items():
@@ -2575,11 +3167,31 @@ def view_index(
     wrapper: BaseWrapper = get_wrapper(view, **kwargs)
     store = get_store(database_type, path)
 
-    if not append:
+    if incremental:
+        from curategpt.utils.iterators import DEFAULT_CHUNK, chunk
+
+        if not hasattr(wrapper, "since"):
+            raise click.UsageError(f"View {view} does not support --incremental")
+        cm = None
         if collection in store.list_collection_names():
-            store.remove_collection(collection)
-    objs = wrapper.objects()
-    store.insert(objs, model=model, collection=collection, batch_size=batch_size)
+            cm = store.collection_metadata(collection)
+        if cm and cm.synced_until:
+            wrapper.since = cm.synced_until
+        else:
+            logging.warning(f"No sync time found for {collection}; fetching all objects")
+        # upsert may read the objects more than once, so each batch is held in memory
+        for objs in chunk(wrapper.objects(), batch_size or DEFAULT_CHUNK):
+            objs = list(objs)
+            store.upsert(objs, model=model, collection=collection, batch_size=batch_size)
+    else:
+        if not append:
+            if collection in store.list_collection_names():
+                store.remove_collection(collection)
+        objs = wrapper.objects()
+        store.insert(objs, model=model, collection=collection, batch_size=batch_size)
+    synced_until = getattr(wrapper, "synced_until", None)
+    if synced_until:
+        store.update_collection_metadata(collection, synced_until=synced_until)
 
 
 @view.command(name="ask")
@@ -2594,8 +3206,12 @@ def view_index(
     help="Whether to expand the search term using an LLM.",
 )
 @click.argument("query")
+@llm_cache_option
 def view_ask(query, view, model, limit, expand, **kwargs):
     """Ask a knowledge source wrapper."""
+    from curategpt.agents.chat_agent import ChatAgent
+    from curategpt.extract.basic_extractor import BasicExtractor
+
     vstore: BaseWrapper = get_wrapper(view)
     vstore.extractor = BasicExtractor(model_name=model)
     chatbot = ChatAgent(knowledge_source=vstore)
@@ -2620,7 +3236,11 @@ def pubmed():
     help="Whether to expand the search term using an LLM.",
 )
 @click.argument("query")
+@llm_cache_option
 def pubmed_search(query, path, model, database_type, **kwargs):
+    from curategpt.extract.basic_extractor import BasicExtractor
+    from curategpt.wrappers.literature.pubmed_wrapper import PubmedWrapper
+
     pubmed = PubmedWrapper()
     db = get_store(database_type, path)
     extractor = BasicExtractor()
@@ -2655,7 +3275,11 @@ def pubmed_search(query, path, model, database_type, **kwargs):
     help="Whether to expand the search term using an LLM.",
 )
 @click.argument("query")
+@llm_cache_option
 def pubmed_ask(query, path, model, show_references, database_type, **kwargs):
+    from curategpt.extract.basic_extractor import BasicExtractor
+    from curategpt.wrappers.literature.pubmed_wrapper import PubmedWrapper
+
     pubmed = PubmedWrapper()
     db = get_store(database_type, path)
     extractor = BasicExtractor()
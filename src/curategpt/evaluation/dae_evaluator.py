@@ -1,7 +1,7 @@
 import csv
 import logging
 from dataclasses import dataclass, field
-from typing import List, TextIO
+from typing import List, Optional, TextIO
 
 import yaml
 
@@ -13,6 +13,7 @@ from curategpt.evaluation.calc_statistics import (
     evaluate_predictions,
 )
 from curategpt.evaluation.evaluation_datamodel import ClassificationMetrics, ClassificationOutcome
+from curategpt.utils.concurrency import RateLimiter, map_ordered
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +35,9 @@ class DatabaseAugmentedCompletionEvaluator(BaseEvaluator):
         report_file: TextIO = None,
         report_tsv_file: TextIO = None,
         working_directory: str = None,
+        workers: int = 1,
+        retries: int = 0,
+        rate_limiter: Optional[RateLimiter] = None,
         **kwargs,
     ) -> ClassificationMetrics:
         """
@@ -41,9 +45,14 @@ class DatabaseAugmentedCompletionEvaluator(BaseEvaluator):
 
         Note: the main collection used for few-shot learning is passed in kwargs (this may change)
 
+        Test objects whose completion fails are logged and left out of the metrics.
+
         :param test_collection:
         :param num_tests:
         :param report_file:
+        :param workers: number of test objects completed concurrently
+        :param retries: number of retries for a test object whose completion fails
+        :param rate_limiter: limits how often completions start
         :param kwargs:
         :return:
         """
@@ -68,19 +77,34 @@ class DatabaseAugmentedCompletionEvaluator(BaseEvaluator):
         field_names = []
         for test_obj in test_objs:
             field_names.extend([k for k in test_obj.keys() if k not in field_names])
-        for test_obj in test_objs:
-            test_obj_query = {
+
+        def _query(test_obj):
+            return {
                 k: v
                 for k, v in test_obj.items()
                 if k not in self.fields_to_predict and k not in self.fields_to_mask
             }
+
+        def _complete(test_obj):
+            test_obj_query = _query(test_obj)
             logger.debug(f"## Query: {test_obj_query}")
-            ao = agent.complete(
+            return agent.complete(
                 test_obj_query,
                 fields_to_predict=self.fields_to_predict,
                 fields_to_mask=self.fields_to_mask,
                 **kwargs,
             )
+
+        tasks = map_ordered(
+            _complete, test_objs, workers=workers, retries=retries, rate_limiter=rate_limiter
+        )
+        for task in tasks:
+            test_obj = task.item
+            if not task.ok:
+                logger.error(f"Could not complete {test_obj.get('id', test_obj)}: {task.error}")
+                continue
+            test_obj_query = _query(test_obj)
+            ao = task.result
             logger.debug(f"--- Expected: {test_obj}")
             logger.debug(f"--- Prediction: {ao.object}")
             outcomes = []
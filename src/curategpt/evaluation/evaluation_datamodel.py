@@ -64,6 +64,7 @@ class Task(BaseModel):
     method: Optional[str] = None
     source_db_path: Optional[str] = None
     target_db_path: Optional[str] = None
+    search_cache: Optional[str] = None
     source_collection: Optional[str] = None
     additional_collections: Optional[List[str]] = None
     num_training: int = None
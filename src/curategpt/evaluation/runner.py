@@ -12,6 +12,7 @@ from curategpt.agents.dragon_agent import DragonAgent
 from curategpt.evaluation.dae_evaluator import DatabaseAugmentedCompletionEvaluator
 from curategpt.evaluation.evaluation_datamodel import Task
 from curategpt.evaluation.splitter import stratify_collection_to_store
+from curategpt.store import get_store
 
 logger = logging.getLogger(__name__)
 
@@ -74,7 +75,7 @@ def run_task(
             embedding_model=task.embedding_model_name,
             force=fresh,
         )
-    tdb = ChromaDBAdapter(target_path)
+    tdb = get_store("chromadb", target_path, search_cache=task.search_cache)
     # set start time to current time (ISO format)
     task.task_started = str(datetime.now())
     # get current operating system
@@ -7,10 +7,14 @@ and can also extract structured objects from text.
 * Base class: :class:`Extractor`
 """
 
-from .basic_extractor import BasicExtractor
-from .extractor import AnnotatedObject, Extractor
-from .openai_extractor import OpenAIExtractor
-from .recursive_extractor import RecursiveExtractor
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .basic_extractor import BasicExtractor
+    from .extractor import AnnotatedObject, Extractor
+    from .openai_extractor import OpenAIExtractor
+    from .recursive_extractor import RecursiveExtractor
 
 __all__ = [
     "BasicExtractor",
@@ -19,3 +23,22 @@ __all__ = [
     "RecursiveExtractor",
     "OpenAIExtractor",
 ]
+
+# imported on first access, as extractors load llm and linkml
+_LAZY_IMPORTS = {
+    "BasicExtractor": ".basic_extractor",
+    "AnnotatedObject": ".extractor",
+    "Extractor": ".extractor",
+    "RecursiveExtractor": ".recursive_extractor",
+    "OpenAIExtractor": ".openai_extractor",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        return getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
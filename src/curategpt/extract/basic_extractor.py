@@ -3,7 +3,6 @@
 import json
 import logging
 import re
-from copy import copy
 from dataclasses import dataclass
 from typing import List
 
@@ -11,8 +10,9 @@ import yaml
 from pydantic import ConfigDict
 
 from curategpt.formatters.format_utils import remove_formatting
+from curategpt.utils.llm_cache import cached_prompt
 
-from ..utils.tokens import estimate_num_tokens, max_tokens_by_model
+from ..utils.tokens import max_tokens_by_model, select_within_budget
 from .extractor import AnnotatedObject, Extractor
 
 logger = logging.getLogger(__name__)
@@ -40,39 +40,43 @@ class BasicExtractor(Extractor):
         **kwargs,
     ) -> AnnotatedObject:
         logger.debug(f"Basic extractor: {text}, {len(examples)} examples")
-        examples = copy(examples)
-        while True:
-            prompt = ""
-            if background_text:
-                prompt += f"{background_text}\n\n"
-            prompt += f"Extract a {target_class} object from text in {self.serialization_format} format.\n\n"
-            if rules:
-                prompt += "Rules:\n\n"
-                for rule in rules:
-                    prompt += f"- {rule}\n"
-                prompt += "\n"
-                prompt += "---\n"
-            prompt += "Examples:\n\n"
-            for example in examples:
-                if example.text:
-                    prompt += f"##\nText: {example.text}\n"
-                prompt += f"Response: {self.serialize(example)}\n"
-            prompt += f"\n##\nText: {text}\n\n"
-            prompt += "Response: "
-            estimated_length = estimate_num_tokens([prompt])
-            if estimated_length + 300 < max_tokens_by_model(self.model.model_id):
-                break
-            else:
-                # remove least relevant
-                logger.debug(f"Removing least relevant of {len(examples)}: {examples[-1]}")
-                examples.pop()
-                if len(examples) < min_examples:
-                    raise ValueError(
-                        f"Prompt too long, need at least {min_examples} examples: {prompt}."
-                    )
+        examples = examples or []
+        header = ""
+        if background_text:
+            header += f"{background_text}\n\n"
+        header += (
+            f"Extract a {target_class} object from text in {self.serialization_format} format.\n\n"
+        )
+        if rules:
+            header += "Rules:\n\n"
+            for rule in rules:
+                header += f"- {rule}\n"
+            header += "\n"
+            header += "---\n"
+        header += "Examples:\n\n"
+        example_texts = []
+        for example in examples:
+            example_text = ""
+            if example.text:
+                example_text += f"##\nText: {example.text}\n"
+            example_text += f"Response: {self.serialize(example)}\n"
+            example_texts.append(example_text)
+        footer = f"\n##\nText: {text}\n\n"
+        footer += "Response: "
+        # least relevant examples are left out if the prompt is too long
+        selected = select_within_budget(
+            header + footer, example_texts, max_tokens_by_model(self.model.model_id)
+        )
+        if len(selected) < len(examples):
+            logger.debug(f"Using {len(selected)} of {len(examples)} examples")
+            if len(selected) < min_examples:
+                raise ValueError(
+                    f"Prompt too long, need at least {min_examples} examples: {header}{footer}."
+                )
+        prompt = header + "".join(example_texts[i] for i in selected) + footer
         model = self.model
         logger.info(f"Prompt: {prompt}")
-        response = model.prompt(prompt)
+        response = cached_prompt(model, prompt)
         ao = self.deserialize(response.text())
         ao.annotations["prompt"] = prompt
         return ao
@@ -7,6 +7,7 @@ from dataclasses import dataclass
 from typing import Any, Dict, List
 
 from curategpt.extract.extractor import AnnotatedObject, Extractor
+from curategpt.utils.llm_cache import cached_prompt
 
 logger = logging.getLogger(__name__)
 
@@ -64,7 +65,7 @@ class RecursiveExtractor(Extractor):
         prompt += "Response: "
         model = self.model
         print(f"Prompt: {prompt}")
-        response = model.prompt(prompt)
+        response = cached_prompt(model, prompt)
         partial_object = self.deserialize(response.text())
         print(f"PO: {partial_object}")
         for slot in sv.class_induced_slots(target_class):
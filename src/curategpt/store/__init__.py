@@ -16,11 +16,17 @@ Note: this package may become an independent project called linkml-store
 in the future.
 """
 
-from .chromadb_adapter import ChromaDBAdapter
-from .db_adapter import DBAdapter
-from .duckdb_adapter import DuckDBAdapter
-from .metadata import CollectionMetadata
-from .schema_proxy import SchemaProxy
+import importlib
+from typing import TYPE_CHECKING
+
+from curategpt.utils.registry import Registry
+
+if TYPE_CHECKING:
+    from .chromadb_adapter import ChromaDBAdapter
+    from .db_adapter import DBAdapter
+    from .duckdb_adapter import DuckDBAdapter
+    from .metadata import CollectionMetadata
+    from .schema_proxy import SchemaProxy
 
 __all__ = [
     "DBAdapter",
@@ -28,10 +34,44 @@ __all__ = [
     "DuckDBAdapter",
     "SchemaProxy",
     "CollectionMetadata",
+    "STORES",
     "get_store",
 ]
 
 
+# imported on first access, so that e.g. using duckdb does not load chromadb
+_LAZY_IMPORTS = {
+    "ChromaDBAdapter": ".chromadb_adapter",
+    "DBAdapter": ".db_adapter",
+    "DuckDBAdapter": ".duckdb_adapter",
+    "CollectionMetadata": ".metadata",
+    "SchemaProxy": ".schema_proxy",
+}
+
+# built-in adapters, by adapter name; other packages can register adapters
+# in the "curategpt.stores" entry point group
+STORES = Registry(
+    "curategpt.stores",
+    {
+        "chromadb": "curategpt.store.chromadb_adapter:ChromaDBAdapter",
+        "duckdb": "curategpt.store.duckdb_adapter:DuckDBAdapter",
+        "in_memory": "curategpt.store.in_memory_adapter:InMemoryAdapter",
+        "sharded": "curategpt.store.sharded_adapter:ShardedAdapter",
+        "snapshot": "curategpt.store.snapshot_adapter:SnapshotAdapter",
+    },
+)
+
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        return getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
+
+
 def get_all_subclasses(cls):
     """Recursively get all subclasses of a given class."""
     direct_subclasses = cls.__subclasses__()
@@ -40,12 +80,27 @@ def get_all_subclasses(cls):
     ]
 
 
-def get_store(name: str, *args, **kwargs) -> DBAdapter:  # duckdb_vss or chromadb
-    from .in_memory_adapter import InMemoryAdapter  # noqa F401
+def get_store(name: str, *args, search_cache=None, **kwargs) -> "DBAdapter":
+    """
+    Make a store.
 
-    # noqa I005
+    :param name: adapter name, e.g. chromadb or duckdb
+    :param args: passed to the adapter, e.g. the path
+    :param search_cache: ``memory``, a SQLite file, or a search cache; defaults to the
+        cache enabled with :func:`curategpt.store.search_cache.enable_search_cache`
+    :param kwargs: passed to the adapter
+    :return:
+    """
+    from .db_adapter import DBAdapter
+    from .search_cache import get_search_cache, make_search_cache
 
-    for c in get_all_subclasses(DBAdapter):
-        if c.name == name:
-            return c(*args, **kwargs)
-    raise ValueError(f"Unknown view {name}, not found in {get_all_subclasses(DBAdapter)}")
+    # only the requested adapter is imported
+    cls = STORES.load(name)
+    if cls is None:
+        # adapters that are not registered are found if they have been imported
+        cls = next((c for c in get_all_subclasses(DBAdapter) if c.name == name), None)
+    if cls is None:
+        raise ValueError(f"Unknown view {name}, choose from {STORES.names()}")
+    store = cls(*args, **kwargs)
+    store.search_cache = make_search_cache(search_cache) or get_search_cache()
+    return store
@@ -16,12 +16,15 @@ from chromadb.types import Collection
 from chromadb.utils import embedding_functions
 from linkml_runtime.dumpers import json_dumper
 from linkml_runtime.utils.yamlutils import YAMLRoot
-from oaklib.utilities.iterator_utils import chunk
 from pydantic import BaseModel
 
 from curategpt.store.db_adapter import DBAdapter
-from curategpt.store.metadata import CollectionMetadata
+from curategpt.store.embedding_cache import QueryEmbeddingCache, query_embedding_cache
+from curategpt.store.hashing_embedder import get_hashing_embedder, is_hashing_model
+from curategpt.store.metadata import CollectionMetadata, IndexCheckpoint
 from curategpt.store.vocab import OBJECT, PROJECTION, QUERY, SEARCH_RESULT
+from curategpt.utils.instrumentation import TimedEmbeddingFunction, metrics_enabled, timed
+from curategpt.utils.iterators import chunk
 from curategpt.utils.vector_algorithms import mmr_diversified_search
 
 logger = logging.getLogger(__name__)
@@ -39,6 +42,9 @@ class ChromaDBAdapter(DBAdapter):
     id_field: str = field(default="id")
     text_lookup: Optional[Union[str, Callable]] = field(default="text")
     id_to_object: Mapping[str, OBJECT] = field(default_factory=dict)
+    query_embedding_cache: QueryEmbeddingCache = field(
+        default_factory=lambda: query_embedding_cache
+    )
 
     default_max_document_length: ClassVar[int] = 6000  # TODO: use tiktoken
 
@@ -126,19 +132,45 @@ class ChromaDBAdapter(DBAdapter):
         """
         if model is None:
             raise ValueError("Model must be specified")
-        if model.startswith("openai:"):
-            return embedding_functions.OpenAIEmbeddingFunction(
+        if is_hashing_model(model):
+            ef = get_hashing_embedder(model)
+        elif model.startswith("openai:"):
+            ef = embedding_functions.OpenAIEmbeddingFunction(
                 api_key=os.environ.get("OPENAI_API_KEY"),
                 model_name="text-embedding-ada-002",
             )
-        return embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model)
+        else:
+            ef = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model)
+        if metrics_enabled():
+            ef = TimedEmbeddingFunction(ef, "embed.chromadb")
+        return ef
+
+    def _query_embedding(self, text: str, model: str, ef: EmbeddingFunction = None) -> List[float]:
+        """
+        Get the embedding for a search query, using the query embedding cache.
 
+        :param text:
+        :param model:
+        :param ef: embedding function for the model, created on a cache miss if not provided
+        :return:
+        """
+
+        def _embed(t: str) -> List[float]:
+            f = ef if ef is not None else self._embedding_function(model)
+            return [float(x) for x in f([t])[0]]
+
+        return self.query_embedding_cache.get(model, text, _embed)
+
+    @timed("insert.chromadb")
     def insert(
         self,
         objs: Union[OBJECT, Iterable[OBJECT]],
         **kwargs,
     ):
-        self._insert_or_update(objs, method_name="add", **kwargs)
+        try:
+            self._insert_or_update(objs, method_name="add", **kwargs)
+        finally:
+            self._collection_changed(kwargs.get("collection"))
 
     def _insert_or_update(
         self,
@@ -149,6 +181,7 @@ class ChromaDBAdapter(DBAdapter):
         object_type: str = None,
         model: str = None,
         text_field: Union[str, Callable] = None,
+        checkpoint: IndexCheckpoint = None,
         **kwargs,
     ):
         """
@@ -156,6 +189,7 @@ class ChromaDBAdapter(DBAdapter):
 
         :param objs:
         :param collection:
+        :param checkpoint: if set, progress is recorded in the collection metadata after each batch
         :param kwargs:
         :return:
         """
@@ -170,7 +204,7 @@ class ChromaDBAdapter(DBAdapter):
         cm = self.update_collection_metadata(collection, model=model, object_type=object_type)
         ef = self._embedding_function(cm.model)
         # cm = CollectionMetadata(name=collection, model=self.model, object_type=object_type)
-        cm_dict = cm.dict(exclude_none=True)
+        cm_dict = self._chroma_metadata(cm)
         collection_obj = client.get_or_create_collection(
             name=collection,
             embedding_function=ef,
@@ -187,6 +221,9 @@ class ChromaDBAdapter(DBAdapter):
         # see https://github.com/chroma-core/chroma/issues/709
         num_objs = len(objs) if isinstance(objs, list) else "?"
         cumulative_len = 0
+        # unlike duckdb, the checkpoint is written after each batch rather than atomically
+        # with it, so the first batch after resuming may already be stored
+        upsert_next_batch = checkpoint is not None and checkpoint.offset > 0
         for next_objs in chunk(objs, batch_size):
             next_objs = list(next_objs)
             logger.info("Preparing batch from position ...")
@@ -205,12 +242,20 @@ class ChromaDBAdapter(DBAdapter):
             logger.info("Preparing ids...")
             ids = [self._id(o, id_field) for o in next_objs]
             logger.info(f"Inserting {len(next_objs)} / {num_objs} objects into {collection}")
-            method = getattr(collection_obj, method_name)
+            if upsert_next_batch and method_name == "add":
+                method = collection_obj.upsert
+            else:
+                method = getattr(collection_obj, method_name)
+            upsert_next_batch = False
             method(
                 documents=docs,
                 metadatas=metadatas,
                 ids=ids,
             )
+            if checkpoint is not None and ids:
+                checkpoint.offset += len(ids)
+                checkpoint.last_id = ids[-1]
+                self.record_index_checkpoint(collection, checkpoint)
 
     def update(self, objs: Union[OBJECT, List[OBJECT]], **kwargs):
         """
@@ -220,7 +265,10 @@ class ChromaDBAdapter(DBAdapter):
         :param collection:
         :return:
         """
-        self._insert_or_update(objs, method_name="update", **kwargs)
+        try:
+            self._insert_or_update(objs, method_name="update", **kwargs)
+        finally:
+            self._collection_changed(kwargs.get("collection"))
 
     def upsert(self, objs: Union[OBJECT, List[OBJECT]], **kwargs):
         """
@@ -230,7 +278,22 @@ class ChromaDBAdapter(DBAdapter):
         :param collection:
         :return:
         """
-        self._insert_or_update(objs, method_name="upsert", **kwargs)
+        try:
+            self._insert_or_update(objs, method_name="upsert", **kwargs)
+        finally:
+            self._collection_changed(kwargs.get("collection"))
+
+    def delete(self, id: str, collection: str = None, **kwargs):
+        """
+        Delete an object by its ID.
+
+        :param id:
+        :param collection:
+        :return:
+        """
+        collection_obj = self._get_collection_object(collection)
+        collection_obj.delete(ids=[id])
+        self._collection_changed(collection)
 
     def remove_collection(self, collection: str = None, exists_ok=False, **kwargs):
         """
@@ -245,7 +308,9 @@ class ChromaDBAdapter(DBAdapter):
                 raise ValueError(f"Collection {collection} does not exist")
             return
         self.client.delete_collection(name=collection)
+        self._collection_changed(collection)
 
+    @timed("json.decode.chromadb")
     def _unjson(self, obj: Mapping):
         if not obj:
             raise ValueError(f"Cannot convert {obj} to dict")
@@ -326,12 +391,29 @@ class ChromaDBAdapter(DBAdapter):
             metadata.name = collection_name
         metadata.hnsw_space = "cosine"
         self.client.get_or_create_collection(
-            name=collection_name, metadata=metadata.dict(exclude_none=True)
+            name=collection_name, metadata=self._chroma_metadata(metadata)
         )
         return metadata
 
+    @staticmethod
+    def _chroma_metadata(metadata: CollectionMetadata) -> dict:
+        """
+        Transform collection metadata into a form suitable for storage in chromadb.
+
+        chromadb only allows primitive metadata values, so the checkpoint is stored
+        as a json string.
+
+        :param metadata:
+        :return:
+        """
+        md_dict = metadata.dict(exclude_none=True)
+        if "checkpoint" in md_dict:
+            md_dict["checkpoint"] = json.dumps(md_dict["checkpoint"])
+        return md_dict
+
+    @timed("search.chromadb")
     def search(self, text: str, **kwargs) -> Iterator[SEARCH_RESULT]:
-        yield from self._search(text=text, **kwargs)
+        yield from self._cached_search(self._search, text=text, **kwargs)
 
     def _search(
         self,
@@ -365,15 +447,15 @@ class ChromaDBAdapter(DBAdapter):
         # want to accidentally set it
         collection = client.get_collection(name=self._get_collection(collection))
         metadata = collection.metadata
-        collection = client.get_collection(
-            name=collection.name, embedding_function=self._embedding_function(metadata["model"])
-        )
+        ef = self._embedding_function(metadata["model"])
+        collection = client.get_collection(name=collection.name, embedding_function=ef)
         logger.debug(f"Collection metadata: {metadata}")
         if text:
             query_texts = [text]
         else:
             # TODO: use get()
             query_texts = ["any"]
+        query_embeddings = [self._query_embedding(query_texts[0], metadata["model"], ef)]
         if limit is not None:
             kwargs["n_results"] = limit
         logger.debug(
@@ -383,7 +465,7 @@ class ChromaDBAdapter(DBAdapter):
             results = collection.get(where=where, include=include, **kwargs)
         else:
             results = collection.query(
-                query_texts=query_texts, where=where, include=include, **kwargs
+                query_embeddings=query_embeddings, where=where, include=include, **kwargs
             )
         metadatas = results["metadatas"][0]
         distances = results["distances"][0]
@@ -468,7 +550,7 @@ class ChromaDBAdapter(DBAdapter):
             )
             text = text[: self.default_max_document_length]
 
-        query_embedding = ef([text])
+        query_embedding = self._query_embedding(text, metadata["model"], ef)
         kwargs["include"] = ["metadatas", "documents", "distances", "embeddings"]
         logger.debug(
             f"Diversified search for '{text}' in {collection}, limit={limit}, kwargs={kwargs}"
@@ -479,7 +561,7 @@ class ChromaDBAdapter(DBAdapter):
         import numpy as np
 
         rows = [np.array(r[2]["embeddings"]) for r in ranked_results]
-        query = np.array(query_embedding[0])
+        query = np.array(query_embedding)
         reranked_indices = mmr_diversified_search(
             query, rows, relevance_factor=relevance_factor, top_n=limit
         )
@@ -512,6 +594,31 @@ class ChromaDBAdapter(DBAdapter):
         results = collection.get([id], include=["metadatas"])
         return self._unjson(results["metadatas"][0])
 
+    def lookup_multiple(
+        self,
+        ids: List[str],
+        collection: str = None,
+        projection: PROJECTION = None,
+        missing: Optional[List[str]] = None,
+        **kwargs,
+    ) -> Iterator[OBJECT]:
+        """
+        Lookup multiple objects by their IDs, using a single get.
+
+        :param ids:
+        :param collection:
+        :param projection: fields of each object to return (default all)
+        :param missing: if provided, ids that are not in the collection are appended to this list
+        :return:
+        """
+        collection_obj = self._get_collection_object(collection)
+        results = collection_obj.get(ids=list(dict.fromkeys(ids)), include=["metadatas"])
+        found = {
+            id: self._unjson(metadata)
+            for id, metadata in zip(results["ids"], results["metadatas"])  # noqa: B905
+        }
+        yield from self._objects_in_order(ids, found, projection, missing)
+
     def collections(self) -> Iterator[str]:
         """
         Return the names of all collections in the database.
@@ -595,7 +702,7 @@ class ChromaDBAdapter(DBAdapter):
         target_collection_obj = target.client.get_or_create_collection(
             name=collection,
             embedding_function=ef,
-            metadata=cm.dict(exclude_none=True),
+            metadata=self._chroma_metadata(cm),
         )
         result = collection_obj.get(include=["metadatas", "documents", "embeddings"])
         if not result["ids"]:
@@ -2,18 +2,19 @@
 
 import json
 import logging
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from pathlib import Path
-from typing import ClassVar, Dict, Iterable, Iterator, List, Optional, TextIO, Union
+from typing import Callable, ClassVar, Dict, Iterable, Iterator, List, Optional, TextIO, Union
 
-import pandas as pd
 import yaml
 from click.utils import LazyFile
 from jsonlines import jsonlines
 
-from curategpt.store.metadata import CollectionMetadata
+from curategpt.store.metadata import CollectionMetadata, IndexCheckpoint
 from curategpt.store.schema_proxy import SchemaProxy
+from curategpt.store.search_cache import SearchResultCache
 from curategpt.store.vocab import (
     DEFAULT_COLLECTION,
     DOCUMENTS,
@@ -25,6 +26,7 @@ from curategpt.store.vocab import (
     QUERY,
     SEARCH_RESULT,
 )
+from curategpt.utils.instrumentation import timed
 
 logger = logging.getLogger(__name__)
 
@@ -91,6 +93,9 @@ class DBAdapter(ABC):
     # _field_names_by_collection: Dict[str, Optional[List[str]]] = field(default_factory=dict)
     _field_names_by_collection: Dict[str, Optional[List[str]]] = None
 
+    search_cache: Optional[SearchResultCache] = None
+    """Cache of search results; if None, searches are not cached"""
+
     # CUD operations
 
     @abstractmethod
@@ -241,6 +246,107 @@ class DBAdapter(ABC):
         """
         raise NotImplementedError
 
+    def index_checkpoint(self, collection: str = None) -> Optional[IndexCheckpoint]:
+        """
+        Get the checkpoint recorded by the last indexing run into a collection.
+
+        :param collection:
+        :return: checkpoint, or None if the collection does not exist or has no checkpoint
+        """
+        collection = self._get_collection(collection)
+        if collection not in self.list_collection_names():
+            return None
+        cm = self.collection_metadata(collection)
+        return cm.checkpoint if cm else None
+
+    def record_index_checkpoint(self, collection: str, checkpoint: IndexCheckpoint):
+        """
+        Durably record indexing progress in the collection metadata.
+
+        Adapters call this after each committed batch when a checkpoint is passed to
+        ``insert``; callers may also use it to mark a source as completed.
+
+        :param collection:
+        :param checkpoint:
+        :return:
+        """
+        self.update_collection_metadata(self._get_collection(collection), checkpoint=checkpoint)
+
+    def collection_version(self, collection: str = None) -> Optional[int]:
+        """
+        Get the version of a collection.
+
+        The version increases with every write to the collection, so it can be used
+        to invalidate anything derived from its contents.
+
+        :param collection:
+        :return: version, or None if the collection does not exist or has never been versioned
+        """
+        cm = self.collection_metadata(self._get_collection(collection))
+        return cm.version if cm else None
+
+    def _collection_changed(self, collection: str = None):
+        """
+        Bump the version of a collection and drop its cached search results.
+
+        Adapters call this after inserting, updating or deleting objects, and after
+        removing the collection. Without a search cache this does nothing, so writes
+        cost no extra metadata update; a cache file shared across runs is therefore
+        only kept current by writes made with the same cache.
+
+        :param collection:
+        :return:
+        """
+        if self.search_cache is None:
+            return
+        collection = self._get_collection(collection)
+        self.search_cache.invalidate(collection)
+        if collection not in self.list_collection_names():
+            return
+        cm = self.collection_metadata(collection)
+        if cm is None:
+            return
+        # based on the clock, so that versions keep increasing when a collection
+        # is removed and re-created
+        version = max(time.time_ns(), (cm.version or 0) + 1)
+        self.update_collection_metadata(collection, version=version)
+
+    def _cached_search(
+        self,
+        search_function: Callable[..., Iterator[SEARCH_RESULT]],
+        text: str,
+        collection: str = None,
+        **kwargs,
+    ) -> Iterator[SEARCH_RESULT]:
+        """
+        Run a search through the search cache, if there is one.
+
+        :param search_function: function that performs the search
+        :param text:
+        :param collection:
+        :param kwargs: other search parameters (where, limit, relevance_factor, ...)
+        :return:
+        """
+        if self.search_cache is None:
+            yield from search_function(text=text, collection=collection, **kwargs)
+            return
+        collection = self._get_collection(collection)
+        key = self.search_cache.make_key(
+            path=str(self.path),
+            collection=collection,
+            version=self.collection_version(collection),
+            text=text,
+            **kwargs,
+        )
+        if key is None:
+            yield from search_function(text=text, collection=collection, **kwargs)
+            return
+        results = self.search_cache.get(key)
+        if results is None:
+            results = list(search_function(text=text, collection=collection, **kwargs))
+            self.search_cache.put(key, results, collection=collection)
+        yield from results
+
     @abstractmethod
     def search(
         self, text: str, where: QUERY = None, collection: str = None, **kwargs
@@ -308,15 +414,64 @@ class DBAdapter(ABC):
         :return:
         """
 
-    def lookup_multiple(self, ids: List[str], **kwargs) -> Iterator[OBJECT]:
+    def lookup_multiple(
+        self,
+        ids: List[str],
+        collection: str = None,
+        projection: PROJECTION = None,
+        missing: Optional[List[str]] = None,
+        **kwargs,
+    ) -> Iterator[OBJECT]:
         """
-        Lookup an object by its ID.
+        Lookup multiple objects by their IDs.
 
-        :param id:
+        Objects are yielded in the order of the input ids; ids that are not found are
+        skipped, not yielded as None. Adapters should override this with a single
+        set-based query; this default looks up one id at a time.
+
+        :param ids:
         :param collection:
+        :param projection: fields of each object to return (default all)
+        :param missing: if provided, ids that are not in the collection are appended to this list
+        :return:
+        """
+        found = {}
+        for id in dict.fromkeys(ids):
+            obj = self.lookup(id, collection=collection, **kwargs)
+            if obj is not None:
+                found[id] = obj
+        yield from self._objects_in_order(ids, found, projection, missing)
+
+    def _objects_in_order(
+        self,
+        ids: List[str],
+        found: Dict[str, OBJECT],
+        projection: PROJECTION = None,
+        missing: Optional[List[str]] = None,
+    ) -> Iterator[OBJECT]:
+        """
+        Yield looked up objects in the order of the requested ids.
+
+        :param ids: requested ids
+        :param found: objects that were found, keyed by id
+        :param projection: fields of each object to return (default all)
+        :param missing: if provided, ids that were not found are appended to this list
         :return:
         """
-        yield from [self.lookup(id, **kwargs) for id in ids]
+        if isinstance(projection, str):
+            projection = [projection]
+        not_found = [id for id in dict.fromkeys(ids) if id not in found]
+        if not_found:
+            logger.warning(f"Could not find {len(not_found)} ids, e.g. {not_found[:5]}")
+            if missing is not None:
+                missing.extend(not_found)
+        for id in ids:
+            obj = found.get(id)
+            if obj is None:
+                continue
+            if projection:
+                obj = {k: obj[k] for k in projection if k in obj}
+            yield obj
 
     @abstractmethod
     def peek(self, collection: str = None, limit=5, **kwargs) -> Iterator[OBJECT]:
@@ -389,6 +544,7 @@ class DBAdapter(ABC):
         return self._field_names_by_collection[collection]
 
     # Loading and dumping
+    @timed("serialize.dump")
     def dump(
         self,
         collection: str = None,
@@ -418,6 +574,7 @@ class DBAdapter(ABC):
             include = list(include)
         objects = list(self.find(collection=collection, include=include, **kwargs))
         if format.startswith("venomx"):
+            import pandas as pd
             import venomx as vx
             from venomx.tools.file_io import save_index
 
@@ -18,14 +18,14 @@ import psutil
 import yaml
 from linkml_runtime.dumpers import json_dumper
 from linkml_runtime.utils.yamlutils import YAMLRoot
-from oaklib.utilities.iterator_utils import chunk
 from openai import OpenAI
 from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer
 
 from curategpt.store.db_adapter import DBAdapter
 from curategpt.store.duckdb_result import DuckDBSearchResult
-from curategpt.store.metadata import CollectionMetadata
+from curategpt.store.embedding_cache import QueryEmbeddingCache, query_embedding_cache
+from curategpt.store.hashing_embedder import get_hashing_embedder, is_hashing_model
+from curategpt.store.metadata import CollectionMetadata, IndexCheckpoint
 from curategpt.store.vocab import (
     DEFAULT_MODEL,
     DEFAULT_OPENAI_MODEL,
@@ -40,11 +40,18 @@ from curategpt.store.vocab import (
     QUERY,
     SEARCH_RESULT,
 )
+from curategpt.utils.instrumentation import count, span, timed
+from curategpt.utils.iterators import chunk
 from curategpt.utils.vector_algorithms import mmr_diversified_search
 
 logger = logging.getLogger(__name__)
 
 
+@timed("json.decode.duckdb")
+def _decode(metadata: str) -> Dict:
+    return json.loads(metadata)
+
+
 @dataclass
 class DuckDBAdapter(DBAdapter):
     name: ClassVar[str] = "duckdb"
@@ -60,6 +67,9 @@ class DuckDBAdapter(DBAdapter):
     id_to_object: Mapping[str, dict] = field(default_factory=dict)
     default_max_document_length: ClassVar[int] = 6000
     openai_client: OpenAI = field(default=None)
+    query_embedding_cache: QueryEmbeddingCache = field(
+        default_factory=lambda: query_embedding_cache
+    )
 
     def __post_init__(self):
         if not self.path:
@@ -180,6 +190,7 @@ class DuckDBAdapter(DBAdapter):
         """
         self.conn.execute(create_index_sql)
 
+    @timed("embed.duckdb")
     def _embedding_function(
         self, texts: Union[str, List[str], List[List[str]]], model: str = None
     ) -> list:
@@ -196,6 +207,11 @@ class DuckDBAdapter(DBAdapter):
 
         if model is None:
             model = self.model
+        count("embed.duckdb.texts", len(texts))
+
+        if is_hashing_model(model):
+            embeddings = get_hashing_embedder(model).embed(texts)
+            return embeddings[0] if single_text else embeddings
 
         if model.startswith("openai:"):
             self._initialize_openai_client()
@@ -215,10 +231,26 @@ class DuckDBAdapter(DBAdapter):
             ]
             return responses[0] if single_text else responses
 
+        from sentence_transformers import SentenceTransformer
+
         model = SentenceTransformer(model)
         embeddings = model.encode(texts, convert_to_tensor=False).tolist()
         return embeddings[0] if single_text else embeddings
 
+    def _query_embedding(self, text: str, model: str = None) -> List[float]:
+        """
+        Get the embedding for a search query, using the query embedding cache
+        :param text: Query text
+        :param model: Model to use for embedding
+        :return: The embedding
+        """
+        if model is None:
+            model = self.default_model
+        return self.query_embedding_cache.get(
+            model, text, lambda t: self._embedding_function(t, model)
+        )
+
+    @timed("insert.duckdb")
     def insert(self, objs: Union[OBJECT, Iterable[OBJECT]], **kwargs):
         """
         Insert objects into the collection
@@ -227,7 +259,10 @@ class DuckDBAdapter(DBAdapter):
         :return:
         """
         logger.info(f"\n\nIn insert duckdb, {kwargs.get('model')}\n\n")
-        self._process_objects(objs, method="insert", **kwargs)
+        try:
+            self._process_objects(objs, method="insert", **kwargs)
+        finally:
+            self._collection_changed(kwargs.get("collection"))
 
     # DELETE first to ensure primary key  constraint https://duckdb.org/docs/sql/indexes
     def update(self, objs: Union[OBJECT, Iterable[OBJECT]], **kwargs):
@@ -242,7 +277,8 @@ class DuckDBAdapter(DBAdapter):
         safe_collection_name = f'"{collection}"'
         delete_sql = f"DELETE FROM {safe_collection_name} WHERE id = ?"
         logger.info("DELETED collection: {collection}")
-        self.conn.executemany(delete_sql, [(id_,) for id_ in ids])
+        with span("sql.duckdb"):
+            self.conn.executemany(delete_sql, [(id_,) for id_ in ids])
         logger.info(f"INSERTING collection: {collection}")
         self.insert(objs, **kwargs)
 
@@ -265,9 +301,10 @@ class DuckDBAdapter(DBAdapter):
         existing_ids = set()
         for id_ in ids:
             safe_collection_name = f'"{collection}"'
-            result = self.conn.execute(
-                f"SELECT id FROM {safe_collection_name} WHERE id = ?", [id_]
-            ).fetchall()
+            with span("sql.duckdb"):
+                result = self.conn.execute(
+                    f"SELECT id FROM {safe_collection_name} WHERE id = ?", [id_]
+                ).fetchall()
             if result:
                 existing_ids.add(id_)
         objs_to_update = [o for o in objs if self._id(o, self.id_field) in existing_ids]
@@ -280,6 +317,20 @@ class DuckDBAdapter(DBAdapter):
             logger.info(f"in Upsert and inserting now in collection: {collection}")
             self.insert(objs_to_insert, **kwargs)
 
+    def delete(self, id: str, collection: str = None, **kwargs):
+        """
+        Delete an object by its ID.
+
+        :param id:
+        :param collection:
+        :return:
+        """
+        collection = self._get_collection(collection)
+        safe_collection_name = f'"{collection}"'
+        with span("sql.duckdb"):
+            self.conn.execute(f"DELETE FROM {safe_collection_name} WHERE id = ?", [id])
+        self._collection_changed(collection)
+
     def _process_objects(
         self,
         objs: Union[OBJECT, Iterable[OBJECT]],
@@ -290,6 +341,7 @@ class DuckDBAdapter(DBAdapter):
         distance: str = None,
         text_field: Union[str, Callable] = None,
         method: str = "insert",
+        checkpoint: IndexCheckpoint = None,
         **kwargs,
     ):
         """
@@ -301,6 +353,8 @@ class DuckDBAdapter(DBAdapter):
         :param model:
         :param text_field:
         :param method:
+        :param checkpoint: if set, progress is recorded in the collection metadata
+            in the same transaction as each batch
         :param kwargs:
         :return:
         """
@@ -336,13 +390,16 @@ class DuckDBAdapter(DBAdapter):
                 embeddings = self._embedding_function(docs, cm.model)
                 try:
                     self.conn.execute("BEGIN TRANSACTION;")
-                    self.conn.executemany(
-                        sql_command, list(zip(ids, metadatas, embeddings, docs))  # noqa: B905
-                    )
+                    with span("sql.duckdb"):
+                        self.conn.executemany(
+                            sql_command, list(zip(ids, metadatas, embeddings, docs))  # noqa: B905
+                        )
                     # reason to block B905: codequality check
                     # blocking 3.11 because only code quality issue and 3.9 gives value error with keyword strict
                     # TODO: delete after PR#76 is merged
+                    next_checkpoint = self._write_checkpoint(collection, checkpoint, ids)
                     self.conn.execute("COMMIT;")
+                    self._advance_checkpoint(checkpoint, next_checkpoint)
                 except Exception as e:
                     self.conn.execute("ROLLBACK;")
                     logger.error(
@@ -422,10 +479,14 @@ class DuckDBAdapter(DBAdapter):
                 )
                 try:
                     self.conn.execute("BEGIN TRANSACTION;")
-                    self.conn.executemany(
-                        sql_command, list(zip(ids, metadatas, batch_embeddings, docs, strict=False))
-                    )
+                    with span("sql.duckdb"):
+                        self.conn.executemany(
+                            sql_command,
+                            list(zip(ids, metadatas, batch_embeddings, docs, strict=False)),
+                        )
+                    next_checkpoint = self._write_checkpoint(collection, checkpoint, ids)
                     self.conn.execute("COMMIT;")
+                    self._advance_checkpoint(checkpoint, next_checkpoint)
                 except Exception as e:
                     self.conn.execute("ROLLBACK;")
                     logger.error(
@@ -435,6 +496,35 @@ class DuckDBAdapter(DBAdapter):
                 finally:
                     self.create_index(collection)
 
+    def _write_checkpoint(
+        self, collection: str, checkpoint: Optional[IndexCheckpoint], ids: List[str]
+    ) -> Optional[IndexCheckpoint]:
+        """
+        Write the checkpoint that will hold once the current batch is committed.
+
+        Must be called inside the batch transaction, so that the checkpoint and the
+        batch are committed (or rolled back) together.
+        :param collection:
+        :param checkpoint: checkpoint before the batch, or None if not checkpointing
+        :param ids: ids in the batch
+        :return: the new checkpoint
+        """
+        if checkpoint is None or not ids:
+            return None
+        next_checkpoint = checkpoint.model_copy(
+            update={"offset": checkpoint.offset + len(ids), "last_id": ids[-1]}
+        )
+        self.update_collection_metadata(collection, checkpoint=next_checkpoint)
+        return next_checkpoint
+
+    @staticmethod
+    def _advance_checkpoint(
+        checkpoint: Optional[IndexCheckpoint], next_checkpoint: Optional[IndexCheckpoint]
+    ):
+        if checkpoint is not None and next_checkpoint is not None:
+            checkpoint.offset = next_checkpoint.offset
+            checkpoint.last_id = next_checkpoint.last_id
+
     def remove_collection(self, collection: str = None, exists_ok=False, **kwargs):
         """
         Remove the collection from the database
@@ -450,7 +540,9 @@ class DuckDBAdapter(DBAdapter):
         # duckdb, requires that identifiers containing special characters ("-") must be enclosed in double quotes.
         safe_collection_name = f'"{collection}"'
         self.conn.execute(f"DROP TABLE IF EXISTS {safe_collection_name}")
+        self._collection_changed(collection)
 
+    @timed("search.duckdb")
     def search(
         self,
         text: str,
@@ -472,7 +564,8 @@ class DuckDBAdapter(DBAdapter):
         :param kwargs:
         :return:
         """
-        yield from self._search(
+        yield from self._cached_search(
+            self._search,
             text=text,
             where=where,
             collection=collection,
@@ -519,7 +612,10 @@ class DuckDBAdapter(DBAdapter):
         logger.info(f"Model={model}")
         where_conditions = []
         if where:
-            where_conditions.append(where)
+            # same query syntax as find; raw SQL strings are passed through
+            where_conditions.append(
+                self._parse_where_clause(where) if isinstance(where, dict) else where
+            )
         where_clause = " AND ".join(where_conditions)
         if where_clause:
             where_clause = f"WHERE {where_clause}"
@@ -528,7 +624,7 @@ class DuckDBAdapter(DBAdapter):
                 text, where, collection, limit, relevance_factor, include, **kwargs
             )
             return
-        query_embedding = self._embedding_function(text, model)
+        query_embedding = self._query_embedding(text, model)
         safe_collection_name = f'"{collection}"'
 
         vec_dimension = self._get_embedding_dimension(model)
@@ -539,17 +635,18 @@ class DuckDBAdapter(DBAdapter):
         # chromaDB: by default l2, other options are ip and cosine
         # duckDB: by default none, array_distance() or 1-array_cosine_similarity(), both bring different distances
         # than chromaDBs distance metric
-        results = self.conn.execute(
-            f"""
-            SELECT *, array_distance(embeddings::FLOAT[{vec_dimension}],
-            {query_embedding}::FLOAT[{vec_dimension}]) as distance
-            FROM {safe_collection_name}
-            {where_clause}
-            ORDER BY distance
-            LIMIT ?
-        """,
-            [limit],
-        ).fetchall()
+        with span("sql.duckdb"):
+            results = self.conn.execute(
+                f"""
+                SELECT *, array_distance(embeddings::FLOAT[{vec_dimension}],
+                {query_embedding}::FLOAT[{vec_dimension}]) as distance
+                FROM {safe_collection_name}
+                {where_clause}
+                ORDER BY distance
+                LIMIT ?
+            """,
+                [limit],
+            ).fetchall()
         yield from self.parse_duckdb_result(results, include)
 
     def _diversified_search(
@@ -575,20 +672,21 @@ class DuckDBAdapter(DBAdapter):
         where_clause = " AND ".join(where_conditions)
         if where_clause:
             where_clause = f"WHERE {where_clause}"
-        query_embedding = self._embedding_function(text, model=cm.model)
+        query_embedding = self._query_embedding(text, model=cm.model)
         safe_collection_name = f'"{collection}"'
         vec_dimension = self._get_embedding_dimension(cm.model)
-        results = self.conn.execute(
-            f"""
-                    SELECT *, array_distance(embeddings::FLOAT[{vec_dimension}],
-                    {query_embedding}::FLOAT[{vec_dimension}]) as distance
-                    FROM {safe_collection_name}
-                    {where_clause}
-                    ORDER BY distance
-                    LIMIT ?
-                """,
-            [limit * 10],
-        ).fetchall()
+        with span("sql.duckdb"):
+            results = self.conn.execute(
+                f"""
+                        SELECT *, array_distance(embeddings::FLOAT[{vec_dimension}],
+                        {query_embedding}::FLOAT[{vec_dimension}]) as distance
+                        FROM {safe_collection_name}
+                        {where_clause}
+                        ORDER BY distance
+                        LIMIT ?
+                    """,
+                [limit * 10],
+            ).fetchall()
         results = list(self.parse_duckdb_result(results, include))
         if not results:
             return
@@ -621,11 +719,12 @@ class DuckDBAdapter(DBAdapter):
         collection_name = self._get_collection(collection_name)
         safe_collection_name = f'"{collection_name}"'
         try:
-            result = self.conn.execute(
-                f"SELECT metadata FROM {safe_collection_name} WHERE id = '__metadata__'"
-            ).fetchone()
+            with span("sql.duckdb"):
+                result = self.conn.execute(
+                    f"SELECT metadata FROM {safe_collection_name} WHERE id = '__metadata__'"
+                ).fetchone()
             if result:
-                metadata = json.loads(result[0])
+                metadata = _decode(result[0])
                 metadata_instance = CollectionMetadata(**metadata)
                 if include_derived:
                     # not implemented yet
@@ -725,7 +824,8 @@ class DuckDBAdapter(DBAdapter):
                     {where_clause}
                     LIMIT {limit}
                 """
-        results = self.conn.execute(query).fetchall()
+        with span("sql.duckdb"):
+            results = self.conn.execute(query).fetchall()
         yield from self.parse_duckdb_result(results, include)
 
     def matches(self, obj: OBJECT, include=None, **kwargs) -> Iterator[SEARCH_RESULT]:
@@ -761,24 +861,56 @@ class DuckDBAdapter(DBAdapter):
         else:
             include = set(include)
         safe_collection_name = f'"{collection}"'
-        result = self.conn.execute(
-            f"""
-                SELECT *
-                FROM {safe_collection_name}
-                WHERE id = ?
-            """,
-            [id],
-        ).fetchone()
+        with span("sql.duckdb"):
+            result = self.conn.execute(
+                f"""
+                    SELECT *
+                    FROM {safe_collection_name}
+                    WHERE id = ?
+                """,
+                [id],
+            ).fetchone()
         if isinstance(result, tuple) and len(result) > 1:
             search_result = DuckDBSearchResult(
                 ids=result[0],
-                metadatas=json.loads(result[1]),
+                metadatas=_decode(result[1]),
                 embeddings=result[2],
                 documents=result[3],
                 include=include,
             )
             return search_result.to_dict().get(METADATAS)
 
+    def lookup_multiple(
+        self,
+        ids: List[str],
+        collection: str = None,
+        projection: PROJECTION = None,
+        missing: Optional[List[str]] = None,
+        **kwargs,
+    ) -> Iterator[OBJECT]:
+        """
+        Lookup multiple objects by their ids, using a single IN query
+        :param ids: IDs of the objects to lookup
+        :param collection: Name of the collection to search
+        :param projection: fields of each object to return (default all)
+        :param missing: if provided, ids that are not in the collection are appended to this list
+        :param kwargs:
+        :return:
+        """
+        safe_collection_name = f'"{self._get_collection(collection)}"'
+        # only the metadata is needed, so embeddings are never fetched
+        with span("sql.duckdb"):
+            results = self.conn.execute(
+                f"""
+                    SELECT id, metadata
+                    FROM {safe_collection_name}
+                    WHERE id IN (SELECT UNNEST(?::VARCHAR[]))
+                """,
+                [list(dict.fromkeys(ids))],
+            ).fetchall()
+        found = {id: _decode(metadata) for id, metadata in results}
+        yield from self._objects_in_order(ids, found, projection, missing)
+
     def peek(
         self, collection: str = None, limit=5, include=None, offset: int = 0, **kwargs
     ) -> Iterator[SEARCH_RESULT]:
@@ -796,14 +928,15 @@ class DuckDBAdapter(DBAdapter):
         else:
             include = set(include)
         safe_collection_name = f'"{collection}"'
-        results = self.conn.execute(
-            f"""
-                SELECT id, metadata, embeddings, documents, NULL as distance
-                FROM {safe_collection_name}
-                LIMIT ?
-            """,
-            [limit],
-        ).fetchall()
+        with span("sql.duckdb"):
+            results = self.conn.execute(
+                f"""
+                    SELECT id, metadata, embeddings, documents, NULL as distance
+                    FROM {safe_collection_name}
+                    LIMIT ?
+                """,
+                [limit],
+            ).fetchall()
 
         yield from self.parse_duckdb_result(results, include)
 
@@ -824,7 +957,8 @@ class DuckDBAdapter(DBAdapter):
                                 FROM {safe_collection_name}
                                 LIMIT ? OFFSET ?
                             """
-            results = self.conn.execute(query, [batch_size, offset]).fetchall()
+            with span("sql.duckdb"):
+                results = self.conn.execute(query, [batch_size, offset]).fetchall()
             if results:
                 yield from self.parse_duckdb_result(results, include)
                 offset += batch_size
@@ -838,14 +972,15 @@ class DuckDBAdapter(DBAdapter):
         :return:
         """
         safe_collection_name = f'"{collection}"'
-        results = self.conn.execute(
-            f"""
-                SELECT metadata
-                FROM {safe_collection_name}
-            """
-        ).fetchall()
+        with span("sql.duckdb"):
+            results = self.conn.execute(
+                f"""
+                    SELECT metadata
+                    FROM {safe_collection_name}
+                """
+            ).fetchall()
         for result in results:
-            yield json.loads(result[0])
+            yield _decode(result[0])
 
     def dump_then_load(
         self,
@@ -924,7 +1059,7 @@ class DuckDBAdapter(DBAdapter):
         query = f"SELECT metadata FROM {safe_collection_name} WHERE id = '__metadata__'"
         result = self.conn.execute(query).fetchone()
         if result:
-            metadata = json.loads(result[0])
+            metadata = _decode(result[0])
             if "model" in metadata and metadata["model"].startswith("openai:"):
                 return True
         return False
@@ -994,7 +1129,7 @@ class DuckDBAdapter(DBAdapter):
             if res[0] != "__metadata__":
                 D = DuckDBSearchResult(
                     ids=res[0],
-                    metadatas=json.loads(res[1]),
+                    metadatas=_decode(res[1]),
                     embeddings=res[2],
                     documents=res[3],
                     distances=res[4],
@@ -1060,6 +1195,8 @@ class DuckDBAdapter(DBAdapter):
     def _get_embedding_dimension(self, model_name: str) -> int:
         if model_name is None or model_name.startswith(self.default_model):
             return DEFAULT_MODEL[self.default_model]
+        if is_hashing_model(model_name):
+            return get_hashing_embedder(model_name).dimension
         if isinstance(model_name, str):
             if model_name.startswith("openai:"):
                 model_key = model_name.split("openai:", 1)[1]
@@ -0,0 +1,96 @@
+"""In-process LRU cache for query embeddings."""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get("CURATEGPT_QUERY_EMBEDDING_CACHE_SIZE", 1024))
+
+
+@dataclass
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings, keyed by (model, text).
+
+    Interactive use (app re-renders, pagination, changing the relevance factor,
+    conversation follow-ups) repeatedly searches with the same query text; this
+    avoids re-embedding it each time.
+
+    >>> cache = QueryEmbeddingCache(max_size=2)
+    >>> cache.get("m", "hello", lambda text: [float(len(text))])
+    [5.0]
+    >>> cache.get("m", "hello", lambda text: [0.0])
+    [5.0]
+    >>> cache.hit_rate
+    0.5
+    """
+
+    max_size: int = DEFAULT_QUERY_EMBEDDING_CACHE_SIZE
+    """Maximum number of embeddings kept; 0 disables caching"""
+
+    hits: int = 0
+    misses: int = 0
+
+    _entries: "OrderedDict[Tuple[str, str], List[float]]" = field(
+        default_factory=OrderedDict, repr=False
+    )
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def get(self, model: str, text: str, embed: Callable[[str], List[float]]) -> List[float]:
+        """
+        Get the embedding of a query, computing it with ``embed`` on a miss.
+
+        :param model: name of the embedding model
+        :param text: query text
+        :param embed: function that embeds a single text
+        :return: embedding
+        """
+        key = (model, text)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        embedding = list(embed(text))
+        if self.max_size > 0:
+            with self._lock:
+                self._entries[key] = embedding
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return embedding
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Cache statistics, e.g. for logging or display in the app.
+
+        :return: dictionary with size, hits, misses and hit_rate
+        """
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+query_embedding_cache = QueryEmbeddingCache()
+"""Cache shared by all adapters in the process (adapters are often re-created, e.g. per app rerun)"""
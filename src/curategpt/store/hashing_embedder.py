@@ -0,0 +1,159 @@
+"""
+Deterministic embeddings by feature hashing.
+
+Texts are embedded without a model: word tokens and character n-grams are hashed
+into a fixed number of buckets, optionally followed by a seeded random projection.
+The embeddings need no network access or model download and are identical across
+runs and machines, which makes them suitable for tests, benchmarks and cheap
+pre-passes such as near-duplicate detection. They capture lexical, not semantic,
+similarity.
+
+Models are named ``hashing:<dimension>`` or ``hashing:<buckets>:<dimension>``, e.g.
+``hashing:512``, or ``hashing:4096:256`` to hash into 4096 buckets and project to 256.
+
+>>> embedder = get_hashing_embedder("hashing:64")
+>>> embedder.dimension
+64
+>>> v1, v2, v3 = embedder(["nuclear membrane", "nuclear envelope", "ribosome"])
+>>> float(np.dot(v1, v2)) > float(np.dot(v1, v3))
+True
+"""
+
+import re
+import zlib
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Optional, Union
+
+import numpy as np
+
+from curategpt.store.vocab import DEFAULT_HASHING_DIMENSION, HASHING_MODEL_PREFIX
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def is_hashing_model(model: Optional[str]) -> bool:
+    """
+    Check if a model name refers to the hashing embedder.
+
+    >>> is_hashing_model("hashing:512")
+    True
+    >>> is_hashing_model("all-MiniLM-L6-v2")
+    False
+
+    :param model:
+    :return:
+    """
+    return isinstance(model, str) and model.startswith(HASHING_MODEL_PREFIX)
+
+
+@dataclass
+class HashingEmbedder:
+    """
+    Embeds texts by hashing tokens and character n-grams.
+
+    Instances are callable on a list of texts, so they can be used directly
+    as a ChromaDB embedding function.
+    """
+
+    dimension: int = DEFAULT_HASHING_DIMENSION
+    """Dimension of the returned embeddings."""
+
+    buckets: Optional[int] = None
+    """Number of hash buckets; if larger than dimension, buckets are randomly projected."""
+
+    ngram_size: int = 3
+    """Size of the character n-grams hashed in addition to each token (0 for tokens only)."""
+
+    seed: int = 0
+    """Seed of the hash functions and the projection."""
+
+    _projection: Optional[np.ndarray] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.buckets is None:
+            self.buckets = self.dimension
+        if self.dimension < 1 or self.buckets < self.dimension:
+            raise ValueError(
+                f"Invalid hashing embedder: {self.buckets} buckets, dimension {self.dimension}"
+            )
+        if self.buckets > self.dimension:
+            rng = np.random.default_rng(self.seed)
+            self._projection = rng.standard_normal((self.buckets, self.dimension)).astype(
+                np.float32
+            ) / np.sqrt(self.dimension)
+
+    @classmethod
+    def from_model_name(cls, model: str) -> "HashingEmbedder":
+        """
+        Create an embedder from a model name such as ``hashing:512``.
+
+        :param model:
+        :return:
+        """
+        if not is_hashing_model(model):
+            raise ValueError(f"Not a hashing model: {model}")
+        parts = [p for p in model[len(HASHING_MODEL_PREFIX) :].split(":") if p]
+        try:
+            sizes = [int(p) for p in parts]
+        except ValueError:
+            raise ValueError(
+                f"Invalid hashing model {model}; expected hashing:<dimension> "
+                "or hashing:<buckets>:<dimension>"
+            ) from None
+        if not sizes:
+            return cls()
+        if len(sizes) == 1:
+            return cls(dimension=sizes[0])
+        if len(sizes) == 2:
+            return cls(buckets=sizes[0], dimension=sizes[1])
+        raise ValueError(f"Invalid hashing model {model}")
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        n = self.ngram_size
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            features.append(token)
+            if n:
+                padded = f"<{token}>"
+                features.extend(f"#{padded[i : i + n]}" for i in range(len(padded) - n + 1))
+        return features
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        hashes = np.fromiter(
+            (zlib.crc32(f.encode("utf-8"), self.seed) for f in self._features(text)),
+            dtype=np.uint32,
+        )
+        # the top bit gives each feature a sign, so collisions cancel out on average
+        signs = np.where(hashes >> np.uint32(31), -1.0, 1.0)
+        vector = np.bincount(hashes % self.buckets, weights=signs, minlength=self.buckets)
+        vector = vector.astype(np.float32)
+        if self._projection is not None:
+            vector = vector @ self._projection
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, texts: Union[str, List[str]]) -> Union[List[float], List[List[float]]]:
+        """
+        Embed one text, or a list of texts.
+
+        :param texts:
+        :return: an embedding, or a list of embeddings
+        """
+        if isinstance(texts, str):
+            return self._embed_one(texts).tolist()
+        return [self._embed_one(t).tolist() for t in texts]
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return self.embed(list(input))
+
+
+@lru_cache(maxsize=None)
+def get_hashing_embedder(model: str) -> HashingEmbedder:
+    """
+    Get the (shared) embedder for a hashing model name.
+
+    :param model: e.g. ``hashing:512``
+    :return:
+    """
+    return HashingEmbedder.from_model_name(model)
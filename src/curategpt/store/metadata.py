@@ -1,6 +1,34 @@
-from typing import Dict, Optional
+import json
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, field_validator
+
+
+class IndexCheckpoint(BaseModel):
+    """
+    Progress marker for an indexing run.
+
+    This is written to the collection metadata after each committed batch,
+    so that an interrupted run can be resumed without re-embedding objects
+    that were already stored.
+    """
+
+    model_config = ConfigDict(protected_namespaces=())
+
+    source: Optional[str] = None
+    """Locator (file, URL, ontology handle) of the source currently being indexed"""
+
+    offset: int = 0
+    """Number of objects from the current source that have been committed"""
+
+    last_id: Optional[str] = None
+    """Identifier of the last committed object"""
+
+    model: Optional[str] = None
+    """Embedding model used for the run"""
+
+    completed_sources: List[str] = []
+    """Sources that have been indexed in full"""
 
 
 class CollectionMetadata(BaseModel):
@@ -36,3 +64,20 @@ class CollectionMetadata(BaseModel):
 
     hnsw_space: Optional[str] = None
     """Space used for hnsw index (e.g. 'cosine')"""
+
+    checkpoint: Optional[IndexCheckpoint] = None
+    """Progress of the last indexing run, used for resuming"""
+
+    version: Optional[int] = None
+    """Increases with every write to the collection; used to invalidate cached searches"""
+
+    synced_until: Optional[str] = None
+    """Time up to which the collection has been synced with its source, for incremental indexing"""
+
+    @field_validator("checkpoint", mode="before")
+    @classmethod
+    def _parse_checkpoint(cls, v):
+        # stores with flat metadata (e.g. chromadb) keep the checkpoint as a JSON string
+        if isinstance(v, str):
+            return json.loads(v)
+        return v
@@ -0,0 +1,223 @@
+"""Bounded cache of search results, invalidated by collection versions."""
+
+import copy
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from curategpt.store.vocab import SEARCH_RESULT
+
+logger = logging.getLogger(__name__)
+
+MEMORY = "memory"
+"""Search cache spec for a cache kept in memory"""
+
+
+def _json_default(obj: Any):
+    # numpy arrays (embeddings) and sets (include) are not JSON serializable
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    raise TypeError(f"Cannot serialize {type(obj)}")
+
+
+@dataclass
+class SearchResultCache:
+    """
+    LRU cache of search results.
+
+    Keys include the version of the collection, which adapters bump on every write,
+    so results from before a write are never served. Entries are kept in memory, or
+    in a SQLite file if ``path`` is set (so they can be shared across runs).
+
+    >>> cache = SearchResultCache(max_size=10)
+    >>> key = cache.make_key(collection="c", version=1, text="foo")
+    >>> cache.get(key) is None
+    True
+    >>> cache.put(key, [({"id": "X:1"}, 0.5, {})], collection="c")
+    >>> cache.get(key)
+    [({'id': 'X:1'}, 0.5, {})]
+    """
+
+    max_size: int = 256
+    """Maximum number of cached searches"""
+
+    path: Optional[str] = None
+    """SQLite file to store results in; if None, results are kept in memory"""
+
+    hits: int = 0
+    misses: int = 0
+
+    _entries: "OrderedDict[str, Tuple[str, List[SEARCH_RESULT]]]" = field(
+        default_factory=OrderedDict, repr=False
+    )
+    _conn: Optional[sqlite3.Connection] = field(default=None, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self):
+        if self.path:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_results "
+                "(key TEXT PRIMARY KEY, collection TEXT, results TEXT, last_used INTEGER)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(**parts) -> Optional[str]:
+        """
+        Make a cache key from the search parameters.
+
+        :param parts: collection, version, text, where, limit, etc
+        :return: key, or None if the parameters cannot be serialized (the search is not cached)
+        """
+        try:
+            serialized = json.dumps(parts, sort_keys=True, default=_json_default)
+        except TypeError:
+            return None
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[SEARCH_RESULT]]:
+        """
+        Get cached results.
+
+        :param key:
+        :return: results, or None on a miss
+        """
+        with self._lock:
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT results FROM search_results WHERE key = ?", [key]
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE search_results SET last_used = ? WHERE key = ?",
+                        [time.time_ns(), key],
+                    )
+                    self._conn.commit()
+                    results = [tuple(r) for r in json.loads(row[0])]
+                else:
+                    results = None
+            elif key in self._entries:
+                self._entries.move_to_end(key)
+                # callers may modify the returned objects
+                results = copy.deepcopy(self._entries[key][1])
+            else:
+                results = None
+            if results is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return results
+
+    def put(self, key: str, results: List[SEARCH_RESULT], collection: str = None):
+        """
+        Store results, evicting the least recently used entries if the cache is full.
+
+        :param key:
+        :param results:
+        :param collection: collection the results are from, used for invalidation
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO search_results VALUES (?, ?, ?, ?)",
+                    [key, collection, json.dumps(results, default=_json_default), time.time_ns()],
+                )
+                self._conn.execute(
+                    "DELETE FROM search_results WHERE key NOT IN "
+                    "(SELECT key FROM search_results ORDER BY last_used DESC LIMIT ?)",
+                    [self.max_size],
+                )
+                self._conn.commit()
+            else:
+                self._entries[key] = (collection, copy.deepcopy(results))
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+    def invalidate(self, collection: str):
+        """
+        Drop all cached results for a collection.
+
+        :param collection:
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM search_results WHERE collection = ?", [collection])
+                self._conn.commit()
+            else:
+                for key in [k for k, (c, _) in self._entries.items() if c == collection]:
+                    del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Cache statistics.
+
+        :return: dictionary with hits, misses and hit_rate
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def make_search_cache(spec: Union[str, SearchResultCache, None]) -> Optional[SearchResultCache]:
+    """
+    Make a search cache from a spec.
+
+    >>> make_search_cache("memory").path is None
+    True
+
+    :param spec: ``memory``, a SQLite file, or a cache (returned as is)
+    :return: cache, or None if spec is None
+    """
+    if spec is None or isinstance(spec, SearchResultCache):
+        return spec
+    return SearchResultCache(path=None if spec == MEMORY else spec)
+
+
+_search_cache: Optional[SearchResultCache] = None
+
+
+def get_search_cache() -> Optional[SearchResultCache]:
+    """
+    Get the search cache given to stores made by ``get_store``, if enabled.
+
+    :return:
+    """
+    return _search_cache
+
+
+def enable_search_cache(spec: Union[str, SearchResultCache] = MEMORY) -> SearchResultCache:
+    """
+    Cache searches of stores made by ``get_store`` from now on.
+
+    :param spec: ``memory``, a SQLite file, or a cache
+    :return: the cache
+    """
+    global _search_cache
+    disable_search_cache()
+    _search_cache = make_search_cache(spec)
+    return _search_cache
+
+
+def disable_search_cache():
+    global _search_cache
+    if _search_cache is not None:
+        _search_cache.close()
+    _search_cache = None
@@ -0,0 +1,433 @@
+"""Adapter that hash-partitions collections across several stores."""
+
+import heapq
+import logging
+import os
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import chain, islice
+from typing import Callable, ClassVar, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import yaml
+
+from curategpt.store.db_adapter import DBAdapter
+from curategpt.store.metadata import CollectionMetadata, IndexCheckpoint
+from curategpt.store.vocab import (
+    DISTANCES,
+    DOCUMENTS,
+    EMBEDDINGS,
+    METADATAS,
+    OBJECT,
+    PROJECTION,
+    QUERY,
+    SEARCH_RESULT,
+)
+from curategpt.utils.iterators import chunk
+from curategpt.utils.vector_algorithms import mmr_diversified_search
+
+logger = logging.getLogger(__name__)
+
+SHARDING_FILE = "sharding.yaml"
+
+
+@dataclass
+class ShardedAdapter(DBAdapter):
+    """
+    An adapter that partitions each collection across a fixed number of shards.
+
+    Each shard is a complete store of its own (by default a DuckDB file in the
+    directory given by ``path``). Objects are routed to a shard by a hash of their id;
+    searches are run on all shards in parallel and the top results merged.
+
+    The number of shards and the shard store type are recorded in ``sharding.yaml``
+    in the directory when it is created, and read from there when it is reopened.
+    """
+
+    name: ClassVar[str] = "sharded"
+
+    num_shards: int = 4
+    """Number of shards; only used when creating a new sharded store"""
+
+    shard_store: str = "duckdb"
+    """Type of store used for each shard"""
+
+    max_workers: Optional[int] = None
+    """Number of threads used to query shards (default: one per shard)"""
+
+    id_field: str = "id"
+
+    text_lookup: Optional[Union[str, Callable]] = field(default="text")
+    """Field or function used to get the text to embed; passed on to the shards"""
+
+    shards: List[DBAdapter] = field(default_factory=list, init=False)
+
+    _executor: ThreadPoolExecutor = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        from curategpt.store import get_store
+
+        if not self.path:
+            self.path = "./db/sharded"
+        os.makedirs(self.path, exist_ok=True)
+        sharding_path = os.path.join(self.path, SHARDING_FILE)
+        if os.path.exists(sharding_path):
+            with open(sharding_path) as f:
+                sharding = yaml.safe_load(f)
+            self.num_shards = sharding["num_shards"]
+            self.shard_store = sharding["shard_store"]
+        else:
+            with open(sharding_path, "w") as f:
+                yaml.safe_dump(
+                    {"num_shards": self.num_shards, "shard_store": self.shard_store}, f
+                )
+        suffix = ".duckdb" if self.shard_store == "duckdb" else ""
+        self.shards = [
+            get_store(self.shard_store, os.path.join(self.path, f"shard_{i}{suffix}"))
+            for i in range(self.num_shards)
+        ]
+        for shard in self.shards:
+            # searches are cached once, for all shards
+            shard.search_cache = None
+        logger.info(f"Using {self.num_shards} {self.shard_store} shards in {self.path}")
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers or self.num_shards)
+
+    def _shard_index(self, id: str) -> int:
+        # crc32 rather than hash(), which is salted per process
+        return zlib.crc32(str(id).encode("utf-8")) % self.num_shards
+
+    def _id_field(self, collection: str = None) -> str:
+        # an identifier slot in the schema takes precedence, as in the chromadb adapter
+        if self.schema_proxy and self.schema_proxy.schemaview:
+            return self.identifier_field(collection)
+        return self.id_field
+
+    def _id(self, obj: OBJECT, collection: str = None) -> str:
+        id_field = self._id_field(collection)
+        if isinstance(obj, dict):
+            id = obj.get(id_field, None)
+        else:
+            id = getattr(obj, id_field, None)
+        if not id:
+            id = str(obj)
+        return id
+
+    def _partition(self, objs: List[OBJECT], collection: str = None) -> Dict[int, List[OBJECT]]:
+        partitions = defaultdict(list)
+        for obj in objs:
+            partitions[self._shard_index(self._id(obj, collection))].append(obj)
+        return partitions
+
+    def _map(self, function: Callable, items: Iterable = None) -> List:
+        """
+        Apply a function to items (default: all shards) in parallel.
+
+        :param function:
+        :param items:
+        :return: results, in the order of the items
+        """
+        if items is None:
+            items = self.shards
+        return list(self._executor.map(function, items))
+
+    def _write(
+        self,
+        method_name: str,
+        objs: Union[OBJECT, Iterable[OBJECT]],
+        collection: str = None,
+        batch_size: int = None,
+        checkpoint: IndexCheckpoint = None,
+        **kwargs,
+    ):
+        """
+        Write objects in batches, each batch written to all its shards in parallel.
+
+        If a checkpoint is passed, it is recorded after each batch has been written to
+        all shards.
+
+        :param method_name: insert, update or upsert
+        :param objs:
+        :param collection:
+        :param batch_size:
+        :param checkpoint:
+        :param kwargs: passed to the shards
+        :return:
+        """
+        collection = self._get_collection(collection)
+        if isinstance(objs, dict):
+            objs = [objs]
+        if batch_size is None:
+            batch_size = 100000
+        for shard in self.shards:
+            shard.text_lookup = self.text_lookup
+            shard.schema_proxy = self.schema_proxy
+            if hasattr(shard, "id_field"):
+                shard.id_field = self._id_field(collection)
+        # as with chromadb, the checkpoint is not written atomically with the batch,
+        # so the first batch after resuming may already be stored in some shards
+        upsert_next_batch = checkpoint is not None and checkpoint.offset > 0
+        try:
+            for next_objs in chunk(objs, batch_size):
+                next_objs = list(next_objs)
+                if upsert_next_batch and method_name == "insert":
+                    shard_method_name = "upsert"
+                else:
+                    shard_method_name = method_name
+                upsert_next_batch = False
+                partitions = self._partition(next_objs, collection)
+                self._map(
+                    partial(
+                        self._write_shard,
+                        shard_method_name,
+                        partitions,
+                        collection=collection,
+                        batch_size=batch_size,
+                        **kwargs,
+                    ),
+                    sorted(partitions),
+                )
+                if checkpoint is not None and next_objs:
+                    checkpoint.offset += len(next_objs)
+                    checkpoint.last_id = self._id(next_objs[-1], collection)
+                    self.record_index_checkpoint(collection, checkpoint)
+        finally:
+            if self.search_cache is not None:
+                self.search_cache.invalidate(collection)
+
+    def _write_shard(
+        self, method_name: str, partitions: Dict[int, List[OBJECT]], shard_index: int, **kwargs
+    ):
+        getattr(self.shards[shard_index], method_name)(partitions[shard_index], **kwargs)
+
+    def insert(self, objs: Union[OBJECT, Iterable[OBJECT]], **kwargs):
+        """
+        Insert objects, routing each to its shard.
+
+        :param objs:
+        :param kwargs: passed to the insert method of each shard
+        :return:
+        """
+        self._write("insert", objs, **kwargs)
+
+    def update(self, objs: Union[OBJECT, List[OBJECT]], **kwargs):
+        self._write("update", objs, **kwargs)
+
+    def upsert(self, objs: Union[OBJECT, List[OBJECT]], **kwargs):
+        self._write("upsert", objs, **kwargs)
+
+    def delete(self, id: str, collection: str = None, **kwargs):
+        self.shards[self._shard_index(id)].delete(id, collection=collection, **kwargs)
+
+    def remove_collection(self, collection: str = None, exists_ok=False, **kwargs):
+        collection = self._get_collection(collection)
+        if not exists_ok and collection not in self.list_collection_names():
+            raise ValueError(f"Collection {collection} does not exist")
+        for shard in self.shards:
+            shard.remove_collection(collection, exists_ok=True, **kwargs)
+        if self.search_cache is not None:
+            self.search_cache.invalidate(collection)
+
+    def list_collection_names(self) -> List[str]:
+        names = set()
+        for shard in self.shards:
+            names.update(shard.list_collection_names())
+        return sorted(names)
+
+    def collection_metadata(
+        self, collection_name: Optional[str] = None, include_derived=False, **kwargs
+    ) -> Optional[CollectionMetadata]:
+        """
+        Get the metadata for a collection.
+
+        Metadata is the same on all shards; derived counts are summed over shards.
+
+        :param collection_name:
+        :param include_derived:
+        :return:
+        """
+        collection_name = self._get_collection(collection_name)
+        all_cms = self._map(
+            lambda shard: (
+                shard.collection_metadata(collection_name, include_derived=include_derived)
+                if collection_name in shard.list_collection_names()
+                else None
+            )
+        )
+        cms = [cm for cm in all_cms if cm is not None]
+        if not cms:
+            return None
+        cm = cms[0].model_copy()
+        versions = [c.version for c in cms if c.version is not None]
+        cm.version = max(versions) if versions else None
+        if include_derived:
+            counts = [c.object_count for c in cms if c.object_count is not None]
+            cm.object_count = sum(counts) if counts else None
+        return cm
+
+    def update_collection_metadata(self, collection_name: str, **kwargs) -> CollectionMetadata:
+        collection_name = self._get_collection(collection_name)
+        for shard in self.shards:
+            if collection_name in shard.list_collection_names():
+                shard.update_collection_metadata(collection_name, **kwargs)
+        return self.collection_metadata(collection_name)
+
+    def set_collection_metadata(
+        self, collection_name: Optional[str], metadata: CollectionMetadata, **kwargs
+    ):
+        for shard in self.shards:
+            shard.set_collection_metadata(collection_name, metadata, **kwargs)
+
+    def search(
+        self,
+        text: str,
+        where: QUERY = None,
+        collection: str = None,
+        limit: int = 10,
+        relevance_factor: float = None,
+        **kwargs,
+    ) -> Iterator[SEARCH_RESULT]:
+        yield from self._cached_search(
+            self._search,
+            text=text,
+            where=where,
+            collection=collection,
+            limit=limit,
+            relevance_factor=relevance_factor,
+            **kwargs,
+        )
+
+    def _search(
+        self,
+        text: str,
+        where: QUERY = None,
+        collection: str = None,
+        limit: int = 10,
+        relevance_factor: float = None,
+        include=None,
+        **kwargs,
+    ) -> Iterator[SEARCH_RESULT]:
+        """
+        Search all shards in parallel and merge the closest results.
+
+        For diversified search, candidates from all shards are merged before reranking,
+        so the result is the same as for an unsharded collection.
+        """
+        if limit is None:
+            limit = 10
+        collection = self._get_collection(collection)
+        shards = [s for s in self.shards if collection in s.list_collection_names()]
+        if not shards:
+            return
+        diversify = relevance_factor is not None and relevance_factor < 1.0
+        shard_limit = limit * 10 if diversify else limit
+        if diversify:
+            include = [METADATAS, DOCUMENTS, DISTANCES, EMBEDDINGS]
+        self._embed_query(text, collection, shards[0])
+        results_by_shard = self._map(
+            lambda shard: list(
+                shard.search(
+                    text,
+                    where=where,
+                    collection=collection,
+                    limit=shard_limit,
+                    include=include,
+                    **kwargs,
+                )
+            ),
+            shards,
+        )
+        merged = heapq.nsmallest(
+            shard_limit, chain(*results_by_shard), key=lambda r: r[1] if r[1] is not None else 0
+        )
+        if not diversify:
+            yield from merged
+            return
+        if not merged:
+            return
+        rows = [np.array(_embeddings(r)) for r in merged]
+        query = np.array(self._embed_query(text, collection, shards[0]))
+        reranked_indices = mmr_diversified_search(
+            query, rows, relevance_factor=relevance_factor, top_n=limit
+        )
+        for i in reranked_indices:
+            yield merged[i]
+
+    def _embed_query(self, text: str, collection: str, shard: DBAdapter) -> Optional[List[float]]:
+        # embedding once up front means every shard gets the query embedding from the
+        # shared query embedding cache, rather than all shards embedding it concurrently
+        if not hasattr(shard, "_query_embedding"):
+            return None
+        cm = shard.collection_metadata(collection)
+        return shard._query_embedding(text, cm.model if cm else None)
+
+    def find(
+        self,
+        where: QUERY = None,
+        projection: PROJECTION = None,
+        collection: str = None,
+        limit: int = 10,
+        **kwargs,
+    ) -> Iterator[SEARCH_RESULT]:
+        collection = self._get_collection(collection)
+        shards = [s for s in self.shards if collection in s.list_collection_names()]
+        results_by_shard = self._map(
+            lambda shard: list(
+                shard.find(
+                    where=where, projection=projection, collection=collection, limit=limit, **kwargs
+                )
+            ),
+            shards,
+        )
+        yield from islice(chain(*results_by_shard), limit)
+
+    def matches(self, obj: OBJECT, **kwargs) -> Iterator[SEARCH_RESULT]:
+        text = self.shards[0]._text(obj, self.text_lookup)
+        yield from self.search(text, **kwargs)
+
+    def lookup(self, id: str, collection: str = None, **kwargs) -> OBJECT:
+        return self.shards[self._shard_index(id)].lookup(id, collection=collection, **kwargs)
+
+    def lookup_multiple(
+        self,
+        ids: List[str],
+        collection: str = None,
+        projection: PROJECTION = None,
+        missing: Optional[List[str]] = None,
+        **kwargs,
+    ) -> Iterator[OBJECT]:
+        ids_by_shard = defaultdict(list)
+        for id in dict.fromkeys(ids):
+            ids_by_shard[self._shard_index(id)].append(id)
+        found = {}
+        for i, shard_ids in ids_by_shard.items():
+            for obj in self.shards[i].lookup_multiple(shard_ids, collection=collection, **kwargs):
+                found[self._id(obj, collection)] = obj
+        yield from self._objects_in_order(ids, found, projection, missing)
+
+    def peek(self, collection: str = None, limit=5, **kwargs) -> Iterator[OBJECT]:
+        collection = self._get_collection(collection)
+        shards = [s for s in self.shards if collection in s.list_collection_names()]
+        yield from islice(
+            chain.from_iterable(s.peek(collection=collection, limit=limit, **kwargs) for s in shards),
+            limit,
+        )
+
+    def fetch_all_objects_memory_safe(
+        self, collection: str = None, batch_size: int = 100, **kwargs
+    ) -> Iterator[OBJECT]:
+        collection = self._get_collection(collection)
+        for shard in self.shards:
+            if collection in shard.list_collection_names():
+                yield from shard.fetch_all_objects_memory_safe(
+                    collection=collection, batch_size=batch_size, **kwargs
+                )
+
+
+def _embeddings(result: SEARCH_RESULT) -> List[float]:
+    # duckdb returns embeddings as _embeddings, chromadb as embeddings
+    meta = result[2] or {}
+    embeddings = meta.get("_embeddings")
+    return embeddings if embeddings is not None else meta.get("embeddings")
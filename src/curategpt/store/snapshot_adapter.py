@@ -0,0 +1,372 @@
+"""
+Read-only adapter over memory-mapped vector snapshots.
+
+A snapshot of a collection is a directory with:
+
+- ``vectors.bin``: the embeddings, as a raw row-major float32 or float16 matrix
+- ``ids.txt``: one object id per line, in the same order as the vectors
+- ``objects.jsonl`` and ``offsets.npy``: the objects, and the byte offset of each line
+- ``metadata.yaml``: the collection metadata, plus the dtype and shape of the vectors
+
+Opening a snapshot only maps these files, so it takes milliseconds, and the pages are
+shared between processes through the OS page cache.
+"""
+
+import json
+import logging
+import os
+import shutil
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import ClassVar, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import yaml
+
+from curategpt.store.db_adapter import DBAdapter
+from curategpt.store.embedding_cache import QueryEmbeddingCache, query_embedding_cache
+from curategpt.store.hashing_embedder import get_hashing_embedder, is_hashing_model
+from curategpt.store.metadata import CollectionMetadata
+from curategpt.store.vocab import (
+    DEFAULT_OPENAI_MODEL,
+    EMBEDDINGS,
+    MODEL_MAP,
+    OBJECT,
+    PROJECTION,
+    QUERY,
+    SEARCH_RESULT,
+)
+from curategpt.utils.vector_algorithms import mmr_diversified_search
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.bin"
+IDS_FILE = "ids.txt"
+OBJECTS_FILE = "objects.jsonl"
+OFFSETS_FILE = "offsets.npy"
+METADATA_FILE = "metadata.yaml"
+
+# number of rows scored at a time; bounds memory when upcasting float16 vectors
+SCORE_BLOCK_SIZE = 65536
+
+
+def write_snapshot(
+    db: DBAdapter,
+    collection: str,
+    path: str,
+    dtype: str = "float32",
+    batch_size: int = 1000,
+) -> CollectionMetadata:
+    """
+    Write a snapshot of a collection.
+
+    The snapshot is written to a temporary directory and then moved into place,
+    so readers never see a partial snapshot.
+
+    :param db: store to read the collection from
+    :param collection: name of the collection
+    :param path: directory of the snapshot store; the snapshot is written to a subdirectory
+    :param dtype: float32 or float16
+    :param batch_size: number of objects fetched from the store at a time
+    :return: metadata of the snapshot collection
+    """
+    if dtype not in ("float32", "float16"):
+        raise ValueError(f"Unsupported dtype {dtype}; use float32 or float16")
+    cm = db.collection_metadata(collection)
+    if cm is None:
+        raise ValueError(f"Collection {collection} does not exist")
+    id_field = db.identifier_field(collection) or "id"
+    cosine = (cm.hnsw_space or "cosine") == "cosine"
+    target = os.path.join(path, collection)
+    tmp = f"{target}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    offsets = [0]
+    dimension = None
+    with ExitStack() as stack:
+        vectors_file = stack.enter_context(open(os.path.join(tmp, VECTORS_FILE), "wb"))
+        ids_file = stack.enter_context(open(os.path.join(tmp, IDS_FILE), "w"))
+        objects_file = stack.enter_context(open(os.path.join(tmp, OBJECTS_FILE), "wb"))
+        for obj, _, meta in db.fetch_all_objects_memory_safe(
+            collection=collection, batch_size=batch_size
+        ):
+            vector = np.asarray(meta["_embeddings"], dtype=np.float32)
+            if dimension is None:
+                dimension = len(vector)
+            if cosine:
+                # normalized at write time, so cosine similarity is a dot product
+                norm = np.linalg.norm(vector)
+                if norm:
+                    vector = vector / norm
+            vectors_file.write(vector.astype(dtype).tobytes())
+            ids_file.write(f"{obj.get(id_field)}\n")
+            line = (json.dumps(obj) + "\n").encode("utf-8")
+            objects_file.write(line)
+            offsets.append(offsets[-1] + len(line))
+    np.save(os.path.join(tmp, OFFSETS_FILE), np.array(offsets, dtype=np.int64))
+    cm.object_count = len(offsets) - 1
+    with open(os.path.join(tmp, METADATA_FILE), "w") as f:
+        yaml.safe_dump(
+            {
+                "collection_metadata": json.loads(cm.model_dump_json(exclude_none=True)),
+                "dtype": dtype,
+                "dimension": dimension or 0,
+                "count": cm.object_count,
+                "id_field": id_field,
+            },
+            f,
+            sort_keys=False,
+        )
+    shutil.rmtree(target, ignore_errors=True)
+    os.rename(tmp, target)
+    logger.info(f"Wrote snapshot of {cm.object_count} objects from {collection} to {target}")
+    return cm
+
+
+@dataclass
+class _Snapshot:
+    """A loaded (memory-mapped) collection snapshot."""
+
+    metadata: CollectionMetadata
+    vectors: np.ndarray
+    offsets: np.ndarray
+    objects: np.ndarray
+    ids_path: str
+    id_field: str
+    _rows_by_id: Optional[Dict[str, int]] = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def object(self, row: int) -> OBJECT:
+        return json.loads(self.objects[self.offsets[row] : self.offsets[row + 1]].tobytes())
+
+    def row(self, id: str) -> Optional[int]:
+        if self._rows_by_id is None:
+            with open(self.ids_path) as f:
+                self._rows_by_id = {line.rstrip("\n"): i for i, line in enumerate(f)}
+        return self._rows_by_id.get(id)
+
+
+@dataclass
+class SnapshotAdapter(DBAdapter):
+    """
+    A read-only adapter that answers searches from memory-mapped snapshots.
+
+    Snapshots are created with :func:`write_snapshot`
+    (or ``curategpt collections snapshot``).
+    """
+
+    name: ClassVar[str] = "snapshot"
+
+    text_lookup: Optional[str] = "text"
+
+    query_embedding_cache: QueryEmbeddingCache = field(
+        default_factory=lambda: query_embedding_cache
+    )
+
+    _snapshots: Dict[str, _Snapshot] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        if not self.path:
+            self.path = "./snapshots"
+
+    def _snapshot(self, collection: str = None) -> _Snapshot:
+        collection = self._get_collection(collection)
+        if collection not in self._snapshots:
+            directory = os.path.join(self.path, collection)
+            metadata_path = os.path.join(directory, METADATA_FILE)
+            if not os.path.exists(metadata_path):
+                raise ValueError(f"No snapshot of {collection} in {self.path}")
+            with open(metadata_path) as f:
+                header = yaml.safe_load(f)
+            count, dimension = header["count"], header["dimension"]
+            if count:
+                vectors = np.memmap(
+                    os.path.join(directory, VECTORS_FILE),
+                    dtype=header["dtype"],
+                    mode="r",
+                    shape=(count, dimension),
+                )
+                objects = np.memmap(os.path.join(directory, OBJECTS_FILE), dtype=np.uint8, mode="r")
+            else:
+                vectors = np.zeros((0, dimension), dtype=header["dtype"])
+                objects = np.zeros(0, dtype=np.uint8)
+            self._snapshots[collection] = _Snapshot(
+                metadata=CollectionMetadata(**header["collection_metadata"]),
+                vectors=vectors,
+                offsets=np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode="r"),
+                objects=objects,
+                ids_path=os.path.join(directory, IDS_FILE),
+                id_field=header.get("id_field", "id"),
+            )
+        return self._snapshots[collection]
+
+    def insert(self, objs: Union[OBJECT, Iterable[OBJECT]], **kwargs):
+        raise NotImplementedError("Snapshots are read-only; re-create them with write_snapshot")
+
+    def list_collection_names(self) -> List[str]:
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(
+            name
+            for name in os.listdir(self.path)
+            if os.path.exists(os.path.join(self.path, name, METADATA_FILE))
+        )
+
+    def collection_metadata(
+        self, collection_name: Optional[str] = None, include_derived=False, **kwargs
+    ) -> Optional[CollectionMetadata]:
+        collection_name = self._get_collection(collection_name)
+        if collection_name not in self.list_collection_names():
+            return None
+        snapshot = self._snapshot(collection_name)
+        cm = snapshot.metadata.model_copy()
+        if include_derived:
+            cm.object_count = len(snapshot)
+        return cm
+
+    def _embed(self, text: str, model: str) -> List[float]:
+        """
+        Embed a query with the model the collection was indexed with.
+
+        :param text:
+        :param model:
+        :return:
+        """
+        if is_hashing_model(model):
+            return get_hashing_embedder(model).embed(text)
+        if model.startswith("openai:"):
+            import openai
+
+            openai_model = model.split(":", 1)[1]
+            if openai_model == "" or openai_model not in MODEL_MAP.keys():
+                openai_model = DEFAULT_OPENAI_MODEL
+            client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+            return client.embeddings.create(input=text, model=openai_model).data[0].embedding
+        return _sentence_transformer(model).encode([text], convert_to_tensor=False)[0].tolist()
+
+    def _distances(self, snapshot: _Snapshot, query: np.ndarray) -> np.ndarray:
+        cosine = (snapshot.metadata.hnsw_space or "cosine") == "cosine"
+        if cosine:
+            norm = np.linalg.norm(query)
+            if norm:
+                query = query / norm
+        distances = np.empty(len(snapshot), dtype=np.float32)
+        for start in range(0, len(snapshot), SCORE_BLOCK_SIZE):
+            block = np.asarray(snapshot.vectors[start : start + SCORE_BLOCK_SIZE], dtype=np.float32)
+            if cosine:
+                distances[start : start + len(block)] = 1.0 - block @ query
+            else:
+                distances[start : start + len(block)] = np.linalg.norm(block - query, axis=1)
+        return distances
+
+    def search(self, text: str, **kwargs) -> Iterator[SEARCH_RESULT]:
+        yield from self._cached_search(self._search, text=text, **kwargs)
+
+    def _search(
+        self,
+        text: str,
+        where: QUERY = None,
+        collection: str = None,
+        limit: int = 10,
+        relevance_factor: float = None,
+        include=None,
+        **kwargs,
+    ) -> Iterator[SEARCH_RESULT]:
+        """
+        Search a snapshot with a vectorized scan of all vectors.
+
+        ``where`` is applied to the objects in order of distance, and only supports
+        equality on top-level fields.
+        """
+        if limit is None:
+            limit = 10
+        snapshot = self._snapshot(collection)
+        if not len(snapshot):
+            return
+        model = snapshot.metadata.model
+        query = np.asarray(
+            self.query_embedding_cache.get(model, text, lambda t: self._embed(t, model)),
+            dtype=np.float32,
+        )
+        distances = self._distances(snapshot, query)
+        diversify = relevance_factor is not None and relevance_factor < 1.0
+        num_candidates = limit * 10 if diversify else limit
+        if where:
+            rows = np.argsort(distances, kind="stable")
+        else:
+            k = min(num_candidates, len(distances))
+            rows = np.argpartition(distances, k - 1)[:k]
+            rows = rows[np.argsort(distances[rows], kind="stable")]
+        results = []
+        for row in rows:
+            obj = snapshot.object(row)
+            if where and not all(obj.get(k) == v for k, v in where.items()):
+                continue
+            results.append((row, obj))
+            if len(results) >= num_candidates:
+                break
+        if diversify and results:
+            vectors = [np.asarray(snapshot.vectors[row], dtype=np.float32) for row, _ in results]
+            reranked_indices = mmr_diversified_search(
+                query, vectors, relevance_factor=relevance_factor, top_n=limit
+            )
+            results = [results[i] for i in reranked_indices]
+        include_embeddings = diversify or (include is not None and EMBEDDINGS in include)
+        for row, obj in results:
+            embeddings = snapshot.vectors[row].tolist() if include_embeddings else None
+            yield obj, float(distances[row]), {"_embeddings": embeddings, "documents": None}
+
+    def find(
+        self,
+        where: QUERY = None,
+        projection: PROJECTION = None,
+        collection: str = None,
+        limit: int = 10,
+        **kwargs,
+    ) -> Iterator[SEARCH_RESULT]:
+        snapshot = self._snapshot(collection)
+        n = 0
+        for row in range(len(snapshot)):
+            if limit is not None and n >= limit:
+                break
+            obj = snapshot.object(row)
+            if where and not all(obj.get(k) == v for k, v in where.items()):
+                continue
+            n += 1
+            yield obj, 0.0, {"documents": None}
+
+    def matches(self, obj: OBJECT, **kwargs) -> Iterator[SEARCH_RESULT]:
+        text_field = self.text_lookup
+        text = obj[text_field] if text_field in obj else yaml.safe_dump(obj, sort_keys=False)
+        yield from self.search(text, **kwargs)
+
+    def lookup(self, id: str, collection: str = None, **kwargs) -> OBJECT:
+        snapshot = self._snapshot(collection)
+        row = snapshot.row(id)
+        return snapshot.object(row) if row is not None else None
+
+    def peek(self, collection: str = None, limit=5, **kwargs) -> Iterator[OBJECT]:
+        snapshot = self._snapshot(collection)
+        for row in range(min(limit, len(snapshot))):
+            yield snapshot.object(row)
+
+    def fetch_all_objects_memory_safe(
+        self, collection: str = None, batch_size: int = 100, **kwargs
+    ) -> Iterator[OBJECT]:
+        snapshot = self._snapshot(collection)
+        for row in range(len(snapshot)):
+            yield snapshot.object(row), 0.0, {"_embeddings": snapshot.vectors[row].tolist()}
+
+
+_SENTENCE_TRANSFORMERS = {}
+
+
+def _sentence_transformer(model: str):
+    # loaded on first use, so that opening a snapshot does not import torch
+    if model not in _SENTENCE_TRANSFORMERS:
+        from sentence_transformers import SentenceTransformer
+
+        _SENTENCE_TRANSFORMERS[model] = SentenceTransformer(model)
+    return _SENTENCE_TRANSFORMERS[model]
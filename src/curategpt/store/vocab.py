@@ -29,4 +29,8 @@ MODEL_MAP = {
 }
 
 DEFAULT_OPENAI_MODEL = "text-embedding-ada-002"
+
+# offline feature-hashing embeddings; see hashing_embedder
+HASHING_MODEL_PREFIX = "hashing:"
+DEFAULT_HASHING_DIMENSION = 512
 DEFAULT_MODEL = {"all-MiniLM-L6-v2": 384}
@@ -0,0 +1,329 @@
+"""
+Benchmarks for store adapters, search and retrieval.
+
+Collections are synthetic and embedded with the hashing embedder, so results do
+not depend on the network or on model downloads, and runs on different commits
+can be compared.
+
+>>> results = run_benchmarks(["chromadb"], sizes=[20], num_queries=2, scenarios=["search"])
+>>> [r["scenario"] for r in results["results"]]
+['insert', 'search']
+"""
+
+import json
+import logging
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from curategpt.store import get_store
+from curategpt.store.vocab import HASHING_MODEL_PREFIX
+from curategpt.utils.vector_algorithms import mmr_diversified_search
+from curategpt.utils.vectordb_operations import match_collections
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_COLLECTION = "bench_objects"
+BENCHMARK_SAMPLE_COLLECTION = "bench_sample"
+
+SCENARIOS = [
+    "insert",
+    "search",
+    "filtered_search",
+    "diversified_search",
+    "all_by_all",
+    "mmr",
+    "dump",
+    "copy",
+]
+
+SYLLABLES = ["ka", "lo", "mi", "nu", "pe", "ra", "si", "to", "vu", "ze", "an", "or", "el", "ix"]
+
+
+@dataclass
+class BenchmarkResult:
+    """Result of one scenario for one adapter and collection size."""
+
+    adapter: str
+    size: int
+    scenario: str
+    metrics: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+def synthetic_objects(n: int, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """
+    Generate deterministic synthetic objects.
+
+    >>> objs = list(synthetic_objects(2))
+    >>> objs[0]["id"]
+    'BENCH:0'
+
+    :param n: number of objects
+    :param seed:
+    :return:
+    """
+    rng = np.random.RandomState(seed)
+    words = [
+        "".join(rng.choice(SYLLABLES, size=rng.randint(2, 4))) + str(i % 7) for i in range(2000)
+    ]
+    for i in range(n):
+        text = " ".join(rng.choice(words, size=8))
+        yield {
+            "id": f"BENCH:{i}",
+            "label": text.split()[0],
+            "text": text,
+            "category": f"c{i % 10}",
+        }
+
+
+def _latencies(function: Callable[[str], Any], queries: List[str]) -> Dict[str, float]:
+    times = []
+    for q in queries:
+        start = time.perf_counter()
+        function(q)
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "n": len(times),
+        "mean_ms": float(np.mean(times)),
+        "p50_ms": float(np.percentile(times, 50)),
+        "p99_ms": float(np.percentile(times, 99)),
+    }
+
+
+def _run_scenarios(
+    adapter: str,
+    size: int,
+    scenarios: List[str],
+    workdir: str,
+    num_queries: int,
+    dimension: int,
+    batch_size: Optional[int],
+    all_by_all_size: int,
+) -> Iterator[BenchmarkResult]:
+    suffix = ".duckdb" if adapter == "duckdb" else ""
+    model = f"{HASHING_MODEL_PREFIX}{dimension}"
+    objs = list(synthetic_objects(size))
+    queries = [o["text"] for o in objs[:: max(1, size // num_queries)]][:num_queries]
+
+    def _scenario(name: str, function: Callable[[], Dict[str, float]]) -> BenchmarkResult:
+        result = BenchmarkResult(adapter=adapter, size=size, scenario=name)
+        try:
+            result.metrics = function()
+        except Exception as e:
+            logger.warning(f"Benchmark {name} failed for {adapter} at {size}: {e}")
+            result.error = f"{type(e).__name__}: {e}"
+        return result
+
+    try:
+        db = get_store(adapter, f"{workdir}/{adapter}_{size}{suffix}")
+    except Exception as e:
+        logger.warning(f"Could not create {adapter} store: {e}")
+        yield BenchmarkResult(
+            adapter=adapter, size=size, scenario="insert", error=f"{type(e).__name__}: {e}"
+        )
+        return
+
+    def _insert():
+        start = time.perf_counter()
+        db.insert(
+            objs, collection=BENCHMARK_COLLECTION, model=model, batch_size=batch_size
+        )
+        elapsed = time.perf_counter() - start
+        return {"seconds": elapsed, "objects_per_second": size / elapsed if elapsed else 0.0}
+
+    # other scenarios need the collection, so it is always loaded
+    yield _scenario("insert", _insert)
+    search_kwargs = {"collection": BENCHMARK_COLLECTION, "limit": 10}
+    if "search" in scenarios:
+        yield _scenario(
+            "search", lambda: _latencies(lambda q: list(db.search(q, **search_kwargs)), queries)
+        )
+    if "filtered_search" in scenarios:
+        yield _scenario(
+            "filtered_search",
+            lambda: _latencies(
+                lambda q: list(db.search(q, where={"category": "c3"}, **search_kwargs)), queries
+            ),
+        )
+    if "diversified_search" in scenarios:
+        yield _scenario(
+            "diversified_search",
+            lambda: _latencies(
+                lambda q: list(db.search(q, relevance_factor=0.5, **search_kwargs)), queries
+            ),
+        )
+    if "all_by_all" in scenarios:
+
+        def _all_by_all():
+            # all-by-all is quadratic, so it runs on a sample of the collection
+            sample = objs[:all_by_all_size]
+            db.insert(sample, collection=BENCHMARK_SAMPLE_COLLECTION, model=model)
+            start = time.perf_counter()
+            matches = list(
+                match_collections(db, BENCHMARK_SAMPLE_COLLECTION, BENCHMARK_SAMPLE_COLLECTION)
+            )
+            elapsed = time.perf_counter() - start
+            return {"seconds": elapsed, "objects": len(matches), "comparisons": len(sample) ** 2}
+
+        yield _scenario("all_by_all", _all_by_all)
+    if "dump" in scenarios:
+
+        def _dump():
+            start = time.perf_counter()
+            db.dump(BENCHMARK_COLLECTION, to_file=f"{workdir}/{adapter}_{size}_dump.json")
+            elapsed = time.perf_counter() - start
+            return {"seconds": elapsed, "objects_per_second": size / elapsed if elapsed else 0.0}
+
+        yield _scenario("dump", _dump)
+    if "copy" in scenarios:
+
+        def _copy():
+            target = get_store(adapter, f"{workdir}/{adapter}_{size}_copy{suffix}")
+            start = time.perf_counter()
+            db.dump_then_load(BENCHMARK_COLLECTION, target=target)
+            elapsed = time.perf_counter() - start
+            return {"seconds": elapsed, "objects_per_second": size / elapsed if elapsed else 0.0}
+
+        yield _scenario("copy", _copy)
+
+
+def _mmr_benchmark(num_candidates: int, dimension: int, repeat: int) -> BenchmarkResult:
+    rng = np.random.RandomState(0)
+    query = rng.rand(dimension)
+    candidates = list(rng.rand(num_candidates, dimension))
+    metrics = _latencies(
+        lambda _: mmr_diversified_search(query, candidates, relevance_factor=0.5, top_n=10),
+        [""] * repeat,
+    )
+    return BenchmarkResult(adapter="none", size=num_candidates, scenario="mmr", metrics=metrics)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(
+    adapters: List[str],
+    sizes: List[int],
+    scenarios: List[str] = None,
+    num_queries: int = 50,
+    dimension: int = 384,
+    batch_size: Optional[int] = None,
+    all_by_all_size: int = 1000,
+    workdir: str = None,
+) -> Dict[str, Any]:
+    """
+    Run benchmarks and return the results as a JSON-serializable dictionary.
+
+    :param adapters: store types to benchmark, e.g. chromadb, duckdb
+    :param sizes: numbers of objects in the synthetic collections
+    :param scenarios: scenarios to run (default all); the insert scenario always runs
+    :param num_queries: number of queries used for latency percentiles
+    :param dimension: dimension of the hashing embeddings
+    :param batch_size: batch size for inserts
+    :param all_by_all_size: number of objects used for the all-by-all scenario
+    :param workdir: directory for the stores (default a temporary directory)
+    :return:
+    """
+    from curategpt import __version__
+
+    if scenarios is None:
+        scenarios = SCENARIOS
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f"Unknown scenarios {unknown}; choose from {SCENARIOS}")
+    results = []
+    tmpdir = None
+    if workdir is None:
+        tmpdir = workdir = tempfile.mkdtemp(prefix="curategpt-bench-")
+    try:
+        for adapter in adapters:
+            for size in sizes:
+                logger.info(f"Benchmarking {adapter} with {size} objects")
+                for result in _run_scenarios(
+                    adapter,
+                    size,
+                    scenarios,
+                    workdir,
+                    num_queries,
+                    dimension,
+                    batch_size,
+                    all_by_all_size,
+                ):
+                    results.append(result)
+        if "mmr" in scenarios:
+            results.append(_mmr_benchmark(100, dimension, num_queries))
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+    return {
+        "curategpt_version": __version__,
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "adapters": adapters,
+            "sizes": sizes,
+            "num_queries": num_queries,
+            "dimension": dimension,
+            "batch_size": batch_size,
+            "all_by_all_size": all_by_all_size,
+        },
+        "results": [asdict(r) for r in results],
+    }
+
+
+def compare_benchmarks(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Compare two benchmark runs.
+
+    For each metric present in both runs, the ratio is current / baseline
+    (so for times, values above 1 are slower; for throughput, faster).
+
+    :param baseline: results of an earlier run
+    :param current: results of this run
+    :return: one row per metric
+    """
+
+    def _index(run):
+        return {(r["adapter"], r["size"], r["scenario"]): r["metrics"] for r in run["results"]}
+
+    baseline_index = _index(baseline)
+    rows = []
+    for key, metrics in _index(current).items():
+        old_metrics = baseline_index.get(key, {})
+        for metric, value in metrics.items():
+            old = old_metrics.get(metric)
+            if old is None:
+                continue
+            rows.append(
+                {
+                    "adapter": key[0],
+                    "size": key[1],
+                    "scenario": key[2],
+                    "metric": metric,
+                    "baseline": old,
+                    "current": value,
+                    "ratio": value / old if old else None,
+                }
+            )
+    return rows
+
+
+def write_benchmarks(results: Dict[str, Any], path: str):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
@@ -0,0 +1,155 @@
+"""
+Token-aware splitting of long texts into chunks for embedding.
+
+Texts are split into sentences, and sentences are packed into chunks of at most
+``max_tokens`` tokens of the embedding model, each chunk overlapping the previous one
+by whole sentences. A chunk ends early at a section break (a blank line) if it is at
+least half full. Chunks are yielded as they are made, so no more than one chunk of a
+document is held at a time.
+
+>>> list(split_text("One sentence. Another one.", max_tokens=100))
+[(0, 26)]
+"""
+
+import itertools
+import logging
+import re
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Iterator, Optional, Tuple
+
+from curategpt.utils.tokens import embedding_encoding
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TOKENS = 750
+DEFAULT_OVERLAP_TOKENS = 50
+
+# a sentence, with its trailing whitespace; a blank line also ends a sentence
+SENTENCE_PATTERN = re.compile(r".*?(?:[.!?]+(?:\s+|$)|\n\s*\n|$)", re.DOTALL)
+WORD_PATTERN = re.compile(r"\s*\S+\s*")
+SECTION_BREAK = re.compile(r"\n\s*\n\s*$")
+
+# start and end offsets, number of tokens, and whether a section ends here
+_UNIT = Tuple[int, int, int, bool]
+
+
+def _units(text: str, encoding, max_tokens: int, sentences: bool) -> Iterator[_UNIT]:
+    """
+    Split a text into units of at most ``max_tokens`` tokens.
+
+    Units are sentences, or words; sentences that are too long are split into words, and
+    words that are too long are split by tokens.
+    """
+    pattern = SENTENCE_PATTERN if sentences else WORD_PATTERN
+    for m in pattern.finditer(text):
+        start, end = m.span()
+        if start == end:
+            continue
+        unit_text = m.group()
+        tokens = encoding.encode(unit_text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            yield start, end, len(tokens), bool(SECTION_BREAK.search(unit_text))
+        elif sentences:
+            for s, e, n, _ in _units(unit_text, encoding, max_tokens, False):
+                yield start + s, start + e, n, False
+        else:
+            # offsets are approximate if a character is split between token slices
+            for i in range(0, len(tokens), max_tokens):
+                piece = encoding.decode(tokens[i : i + max_tokens])
+                piece_end = min(start + len(piece), end)
+                yield start, piece_end, len(tokens[i : i + max_tokens]), False
+                start = piece_end
+
+
+def split_text(
+    text: str,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+    model: Optional[str] = None,
+    sentences: bool = True,
+) -> Iterator[Tuple[int, int]]:
+    """
+    Split a text into chunks that fit the token budget of an embedding model.
+
+    Token counts of the sentences in a chunk are added up, which approximates the
+    count of the chunk.
+
+    :param text:
+    :param max_tokens: maximum tokens per chunk
+    :param overlap_tokens: maximum tokens of the sentences repeated from the previous chunk
+    :param model: embedding model whose encoding is used to count tokens
+    :param sentences: if False, split at any word rather than at sentence and section ends
+    :return: iterator over start and end offsets of chunks in the text
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError(f"Overlap of {overlap_tokens} must be less than {max_tokens} tokens")
+    encoding = embedding_encoding(model)
+    window: Deque[_UNIT] = deque()
+    total = 0
+    # whether the window has units that are not yet in a chunk
+    fresh = False
+    for unit in _units(text, encoding, max_tokens, sentences):
+        while window and total + unit[2] > max_tokens:
+            if fresh:
+                yield window[0][0], window[-1][1]
+                fresh = False
+                while window and total > overlap_tokens:
+                    total -= window.popleft()[2]
+            else:
+                total -= window.popleft()[2]
+        window.append(unit)
+        total += unit[2]
+        fresh = True
+        if unit[3] and total * 2 >= max_tokens:
+            yield window[0][0], window[-1][1]
+            window.clear()
+            total = 0
+            fresh = False
+    if fresh:
+        yield window[0][0], window[-1][1]
+
+
+def split_objects(
+    objects: Iterable[Dict[str, Any]],
+    text_field: str = "text",
+    id_field: str = "id",
+    **kwargs,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Split objects whose text is over the token budget into one object per chunk.
+
+    Objects whose text is a single chunk are yielded unchanged. A chunk object has the
+    id of its parent with ``#<n>`` appended, the text of the chunk, the id of the parent
+    as ``parent_id``, and the offsets of the chunk in the parent text as ``start`` and
+    ``end``. Other fields are those of the parent; their values are shared, not copied.
+
+    :param objects:
+    :param text_field:
+    :param id_field:
+    :param kwargs: passed to :func:`split_text`
+    :return: iterator over objects and chunks
+    """
+    for obj in objects:
+        text = obj.get(text_field)
+        if not text:
+            yield obj
+            continue
+        spans = split_text(text, **kwargs)
+        first = next(spans, None)
+        second = next(spans, None)
+        if second is None:
+            yield obj
+            continue
+        obj_id = obj[id_field]
+        metadata = {k: v for k, v in obj.items() if k not in (id_field, text_field)}
+        n = 0
+        for n, (start, end) in enumerate(itertools.chain([first, second], spans), 1):
+            yield {
+                **metadata,
+                id_field: f"{obj_id}#{n}",
+                text_field: text[start:end],
+                "parent_id": obj_id,
+                "start": start,
+                "end": end,
+            }
+        logger.debug(f"Split {obj_id} into {n} chunks")
@@ -0,0 +1,144 @@
+"""
+Bounded-concurrency execution of slow per-item work, such as LLM completions.
+
+>>> results = map_ordered(lambda x: x * 2, [1, 2, 3], workers=2)
+>>> [r.result for r in results]
+[2, 4, 6]
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Generic, Iterable, Iterator, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+ITEM = TypeVar("ITEM")
+RESULT = TypeVar("RESULT")
+
+
+@dataclass
+class TaskResult(Generic[ITEM, RESULT]):
+    """Outcome of applying a function to one item."""
+
+    index: int
+    item: ITEM
+    result: Optional[RESULT] = None
+    error: Optional[Exception] = None
+    attempts: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class RateLimiter:
+    """
+    Spaces out calls so that at most ``requests_per_minute`` start in any minute.
+
+    Shared between threads.
+    """
+
+    requests_per_minute: float
+    _next_time: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def wait(self):
+        """Block until the next call may start."""
+        if not self.requests_per_minute:
+            return
+        interval = 60.0 / self.requests_per_minute
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_time)
+            self._next_time = start + interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _run(
+    func: Callable[[ITEM], RESULT],
+    index: int,
+    item: ITEM,
+    retries: int,
+    backoff: float,
+    rate_limiter: Optional[RateLimiter],
+) -> TaskResult:
+    task = TaskResult(index=index, item=item)
+    while True:
+        task.attempts += 1
+        if rate_limiter:
+            rate_limiter.wait()
+        try:
+            task.result = func(item)
+            task.error = None
+            return task
+        except Exception as e:
+            task.error = e
+            if task.attempts > retries:
+                logger.warning(f"Failed on item {index} after {task.attempts} attempts: {e}")
+                return task
+            delay = backoff * 2 ** (task.attempts - 1)
+            logger.info(f"Retrying item {index} in {delay:.1f}s after error: {e}")
+            time.sleep(delay)
+
+
+def map_ordered(
+    func: Callable[[ITEM], RESULT],
+    items: Iterable[ITEM],
+    workers: int = 1,
+    retries: int = 0,
+    backoff: float = 1.0,
+    rate_limiter: Optional[RateLimiter] = None,
+    processes: bool = False,
+) -> Iterator[TaskResult]:
+    """
+    Apply a function to each item, with up to ``workers`` calls running at once.
+
+    Results are yielded in the order of the items, as soon as each one and all
+    before it have finished, so they can be written out while later items are still
+    running. Items are read from ``items`` as workers become free.
+
+    An item whose function call raises is retried up to ``retries`` times, with
+    exponential backoff; if it still fails, the error is returned in its
+    :class:`TaskResult` and the other items are unaffected.
+
+    :param func: called with each item; must be safe to call from several threads
+    :param items:
+    :param workers: maximum number of concurrent calls; 1 runs everything in the calling thread
+    :param retries: number of retries per item
+    :param backoff: delay in seconds before the first retry, doubled for each further retry
+    :param rate_limiter: limits how often calls (including retries) start
+    :param processes: run calls in worker processes rather than threads, for CPU-bound work;
+        ``func`` and the items must then be picklable, and there can be no rate limiter
+    :return: iterator over results, in item order
+    """
+    if processes and rate_limiter:
+        raise ValueError("A rate limiter cannot be shared between processes")
+    if workers <= 1:
+        for index, item in enumerate(items):
+            yield _run(func, index, item, retries, backoff, rate_limiter)
+        return
+    pending: Deque[Future] = deque()
+    # submit a few items ahead, so workers are never idle waiting on the consumer
+    window = workers * 2
+    executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor_class(max_workers=workers) as executor:
+        try:
+            for index, item in enumerate(items):
+                pending.append(
+                    executor.submit(_run, func, index, item, retries, backoff, rate_limiter)
+                )
+                while len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # stop promptly if the consumer stops early
+            for future in pending:
+                future.cancel()
+
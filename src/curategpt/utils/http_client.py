@@ -0,0 +1,130 @@
+"""
+Shared HTTP sessions for wrappers over remote sources.
+
+Sessions keep connections to each host alive in a pool, retry failed requests with
+exponential backoff, and space out requests to each host so that they stay within its
+rate limit. Limits are declared per host, rather than each wrapper sleeping between
+calls, and apply to all sessions and threads, so wrappers can safely fetch concurrently
+(e.g. with :func:`curategpt.utils.concurrency.map_ordered`). Responses served from a
+cache do not count towards a limit.
+
+>>> set_rate_limit("api.example.org", 5)
+>>> rate_limit("api.example.org")
+5
+>>> get_session() is get_session()
+True
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from curategpt.utils.concurrency import RateLimiter
+from curategpt.utils.instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRIES = int(os.environ.get("CURATEGPT_HTTP_RETRIES", 3))
+DEFAULT_BACKOFF = float(os.environ.get("CURATEGPT_HTTP_BACKOFF", 0.5))
+DEFAULT_POOL_SIZE = int(os.environ.get("CURATEGPT_HTTP_POOL_SIZE", 16))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_rate_limits: Dict[str, float] = {}
+_limiters: Dict[str, RateLimiter] = {}
+_sessions: Dict[Tuple[Optional[str], int, float, int], requests.Session] = {}
+_lock = threading.Lock()
+
+
+def set_rate_limit(host: str, requests_per_second: float):
+    """
+    Limit how often requests are sent to a host.
+
+    :param host: host name, e.g. ``eutils.ncbi.nlm.nih.gov``
+    :param requests_per_second: maximum rate; 0 for no limit
+    """
+    with _lock:
+        _rate_limits[host] = requests_per_second
+        _limiters[host] = RateLimiter(requests_per_minute=requests_per_second * 60)
+
+
+def rate_limit(host: str) -> Optional[float]:
+    """
+    Get the rate limit of a host.
+
+    :param host:
+    :return: maximum requests per second, or None if the host is not limited
+    """
+    return _rate_limits.get(host)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """Transport adapter that waits for the rate limit of the host before each request."""
+
+    def send(self, request, **kwargs):
+        limiter = _limiters.get(urlparse(request.url).hostname)
+        if limiter:
+            limiter.wait()
+        with span("http.request", method=request.method) as s:
+            response = super().send(request, **kwargs)
+            s.count("bytes", int(response.headers.get("Content-Length", 0) or 0))
+            return response
+
+
+def _mount(session: requests.Session, retries: int, backoff: float, pool_size: int):
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = RateLimitedAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+
+def get_session(
+    cache_name: Optional[str] = None,
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+    pool_size: int = DEFAULT_POOL_SIZE,
+) -> requests.Session:
+    """
+    Get the shared session for a cache.
+
+    There is one session per cache name and retry and pool settings, created on first
+    use, so that all wrappers using the same cache and settings share its connections.
+
+    :param cache_name: name of a ``requests_cache`` cache; None for an uncached session
+    :param retries: number of retries of failed requests, including those with
+        a status in ``RETRY_STATUSES``
+    :param backoff: backoff factor between retries, in seconds
+    :param pool_size: maximum number of connections kept alive per host
+    :return: session; safe to share between threads
+    """
+    key = (cache_name, retries, backoff, pool_size)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            if cache_name:
+                import requests_cache
+
+                # sources use POST only for read-only batch queries, so those are cached too
+                session = requests_cache.CachedSession(
+                    cache_name, allowable_methods=("GET", "HEAD", "POST")
+                )
+            else:
+                session = requests.Session()
+            _mount(session, retries, backoff, pool_size)
+            logger.debug(f"Created HTTP session for cache {cache_name}")
+            _sessions[key] = session
+        return session
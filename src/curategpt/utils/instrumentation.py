@@ -0,0 +1,423 @@
+"""
+Lightweight instrumentation of hot paths.
+
+Spans time a block of code (wall and CPU time), and counters accumulate quantities
+such as texts embedded or bytes downloaded. Span names start with the stage they
+belong to, e.g. ``embed.duckdb``, ``search.chromadb``, ``sql.duckdb``, ``json.decode.chromadb``,
+``llm.prompt`` or ``http.request``. Spans are recorded at curategpt's own call sites
+(adapters, :func:`curategpt.utils.llm_cache.cached_prompt` and the shared HTTP sessions
+of :mod:`curategpt.utils.http_client`); third-party libraries are not patched.
+
+Nothing is recorded unless metrics are enabled, either with :func:`enable_metrics`
+or with the ``CURATEGPT_METRICS`` environment variable; while disabled, a span or a
+call to a decorated function costs a single flag check.
+
+Recorded spans and counters are passed to exporters. The registry, which aggregates
+them in-process, is always one of them; others write JSON lines or Prometheus text.
+
+>>> registry = enable_metrics()
+>>> with span("example") as s:
+...     s.count("items", 3)
+>>> registry.spans["example"].count
+1
+>>> registry.counters["example.items"]
+3
+>>> disable_metrics()
+"""
+
+import atexit
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+import types
+from abc import ABC
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENV_VAR = "CURATEGPT_METRICS"
+
+
+@dataclass
+class SpanStats:
+    """Aggregated timings of all spans with the same name."""
+
+    count: int = 0
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    max_wall_time: float = 0.0
+    errors: int = 0
+
+
+class MetricsExporter(ABC):
+    """Receives spans and counters as they are recorded."""
+
+    def on_span(
+        self,
+        name: str,
+        wall_time: float,
+        cpu_time: float,
+        error: bool,
+        attributes: Dict[str, Any],
+    ):
+        pass
+
+    def on_count(self, name: str, value: float, attributes: Dict[str, Any]):
+        pass
+
+    def close(self):
+        pass
+
+
+@dataclass(eq=False)
+class MetricsRegistry(MetricsExporter):
+    """In-process aggregation of spans and counters."""
+
+    spans: Dict[str, SpanStats] = field(default_factory=dict)
+    counters: Dict[str, float] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def on_span(self, name, wall_time, cpu_time, error, attributes):
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = SpanStats()
+            stats.count += 1
+            stats.wall_time += wall_time
+            stats.cpu_time += cpu_time
+            stats.max_wall_time = max(stats.max_wall_time, wall_time)
+            if error:
+                stats.errors += 1
+
+    def on_count(self, name, value, attributes):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Copy of the current spans and counters as plain dictionaries.
+
+        :return:
+        """
+        with self._lock:
+            return {
+                "spans": {name: asdict(stats) for name, stats in self.spans.items()},
+                "counters": dict(self.counters),
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Current spans and counters in the Prometheus text exposition format.
+
+        :return:
+        """
+        snapshot = self.snapshot()
+        metrics = [
+            ("curategpt_span_count", "counter", "count"),
+            ("curategpt_span_errors", "counter", "errors"),
+            ("curategpt_span_seconds_total", "counter", "wall_time"),
+            ("curategpt_span_cpu_seconds_total", "counter", "cpu_time"),
+            ("curategpt_span_max_seconds", "gauge", "max_wall_time"),
+        ]
+        lines = []
+        for metric, metric_type, key in metrics:
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for name, stats in sorted(snapshot["spans"].items()):
+                lines.append(f'{metric}{{span="{_label(name)}"}} {stats[key]}')
+        lines.append("# TYPE curategpt_counter_total counter")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'curategpt_counter_total{{name="{_label(name)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+def _label(value: str) -> str:
+    return re.sub(r'(["\\])', r"\\\1", value)
+
+
+class JsonLinesExporter(MetricsExporter):
+    """Writes one JSON object per span or counter increment."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file: Optional[TextIO] = None
+        self._lock = threading.Lock()
+
+    def _write(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a")
+            self._file.write(line)
+
+    def on_span(self, name, wall_time, cpu_time, error, attributes):
+        self._write(
+            {
+                "type": "span",
+                "name": name,
+                "timestamp": time.time(),
+                "wall_time": wall_time,
+                "cpu_time": cpu_time,
+                "error": error,
+                "attributes": attributes,
+            }
+        )
+
+    def on_count(self, name, value, attributes):
+        self._write(
+            {
+                "type": "count",
+                "name": name,
+                "timestamp": time.time(),
+                "value": value,
+                "attributes": attributes,
+            }
+        )
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class PrometheusFileExporter(MetricsExporter):
+    """Writes the registry in Prometheus text format when closed, e.g. for a textfile collector."""
+
+    def __init__(self, path: str, registry: MetricsRegistry = None):
+        self.path = path
+        self.registry = registry
+
+    def close(self):
+        registry = self.registry or get_registry()
+        with open(self.path, "w") as f:
+            f.write(registry.to_prometheus())
+
+
+@dataclass
+class _MetricsState:
+    enabled: bool = False
+    registry: MetricsRegistry = field(default_factory=MetricsRegistry)
+    exporters: List[MetricsExporter] = field(default_factory=list)
+
+
+_state = _MetricsState()
+
+
+def metrics_enabled() -> bool:
+    return _state.enabled
+
+
+def get_registry() -> MetricsRegistry:
+    """
+    Get the in-process registry of recorded spans and counters.
+
+    :return:
+    """
+    return _state.registry
+
+
+def enable_metrics(*exporters: MetricsExporter) -> MetricsRegistry:
+    """
+    Start recording spans and counters.
+
+    :param exporters: exporters in addition to the in-process registry
+    :return: the registry
+    """
+    for exporter in exporters:
+        if exporter not in _state.exporters:
+            _state.exporters.append(exporter)
+    if _state.registry not in _state.exporters:
+        _state.exporters.insert(0, _state.registry)
+    _state.enabled = True
+    return _state.registry
+
+
+def disable_metrics():
+    """
+    Stop recording, and close all exporters except the registry.
+    """
+    _state.enabled = False
+    for exporter in _state.exporters:
+        try:
+            exporter.close()
+        except Exception as e:
+            logger.warning(f"Could not close metrics exporter {exporter}: {e}")
+    _state.exporters = []
+
+
+def count(name: str, value: float = 1, **attributes):
+    """
+    Increment a counter.
+
+    :param name:
+    :param value:
+    :param attributes: passed to exporters, e.g. for JSON lines
+    """
+    if not _state.enabled:
+        return
+    for exporter in _state.exporters:
+        exporter.on_count(name, value, attributes)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def count(self, key: str, value: float = 1):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span(_NullSpan):
+    """A timed block; counts added to a span are recorded as ``<span name>.<key>``."""
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self._start_cpu = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self._stop()
+        self.finish(error=exc_type is not None)
+        return False
+
+    def _stop(self):
+        self.wall_time += time.perf_counter() - self._start
+        self.cpu_time += time.thread_time() - self._start_cpu
+
+    def count(self, key: str, value: float = 1):
+        count(f"{self.name}.{key}", value, **self.attributes)
+
+    def finish(self, error: bool = False):
+        for exporter in _state.exporters:
+            exporter.on_span(self.name, self.wall_time, self.cpu_time, error, self.attributes)
+
+
+def span(name: str, **attributes) -> _NullSpan:
+    """
+    Time a block of code.
+
+    >>> with span("embed.example", model="hashing:64") as s:
+    ...     s.count("texts", 2)
+
+    :param name: span name, prefixed by its stage
+    :param attributes: passed to exporters, e.g. for JSON lines
+    :return: context manager
+    """
+    if not _state.enabled:
+        return _NULL_SPAN
+    return Span(name, attributes)
+
+
+def _timed_generator(s: Span, generator: types.GeneratorType):
+    # only time spent producing items counts, not time spent by the consumer
+    error = False
+    try:
+        while True:
+            s.__enter__()
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            except Exception:
+                error = True
+                raise
+            finally:
+                s._stop()
+            yield item
+    finally:
+        generator.close()
+        s.finish(error=error)
+
+
+def timed(name: str) -> Callable:
+    """
+    Decorate a function so that each call is recorded as a span.
+
+    If the function returns a generator, the span covers consuming it.
+
+    :param name: span name
+    :return: decorator
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return func(*args, **kwargs)
+            s = Span(name, {}).__enter__()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                s._stop()
+                s.finish(error=True)
+                raise
+            s._stop()
+            if isinstance(result, types.GeneratorType):
+                return _timed_generator(s, result)
+            s.finish()
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+class TimedEmbeddingFunction:
+    """Embedding function wrapper recording a span per call, with the number of texts."""
+
+    def __init__(self, embedding_function: Callable, name: str):
+        self.embedding_function = embedding_function
+        self.name = name
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        with span(self.name) as s:
+            s.count("texts", len(input))
+            return self.embedding_function(input)
+
+
+def _enable_from_environment():
+    """
+    Enable metrics from ``CURATEGPT_METRICS``.
+
+    The value is a comma-separated list of ``1`` (registry only), ``jsonl:<path>``
+    or ``prometheus:<path>``.
+    """
+    value = os.environ.get(METRICS_ENV_VAR)
+    if not value or value.lower() in ("0", "false"):
+        return
+    exporters = []
+    for part in value.split(","):
+        kind, _, path = part.partition(":")
+        if kind == "jsonl" and path:
+            exporters.append(JsonLinesExporter(path))
+        elif kind == "prometheus" and path:
+            exporters.append(PrometheusFileExporter(path))
+        elif part.lower() not in ("1", "true"):
+            logger.warning(f"Ignoring unknown {METRICS_ENV_VAR} value: {part}")
+    enable_metrics(*exporters)
+    atexit.register(disable_metrics)
+
+
+_enable_from_environment()
@@ -0,0 +1,29 @@
+"""Iteration helpers that avoid importing heavier libraries."""
+
+import itertools
+from typing import Iterable, Iterator
+
+DEFAULT_CHUNK = 1000
+
+
+def chunk(iterable: Iterable, size: int = DEFAULT_CHUNK) -> Iterator[Iterable]:
+    """
+    Split an iterable into lazily consumed chunks of at most ``size`` items.
+
+    Same semantics as ``oaklib.utilities.iterator_utils.chunk``, without importing oaklib.
+
+    >>> [list(c) for c in chunk(range(5), 2)]
+    [[0, 1], [2, 3], [4]]
+
+    :param iterable:
+    :param size:
+    :return: iterator over chunks; each chunk must be consumed before the next is requested
+    """
+    it = iter(iterable)
+    while True:
+        chunk_it = itertools.islice(it, size)
+        try:
+            first_el = next(chunk_it)
+        except StopIteration:
+            return
+        yield itertools.chain((first_el,), chunk_it)
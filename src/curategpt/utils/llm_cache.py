@@ -0,0 +1,273 @@
+"""
+Disk-backed cache of LLM completions.
+
+Completions are keyed by a hash of the model id, system prompt, prompt and model
+options, so re-running an extraction, evaluation or completion over the same inputs
+does not call the model again. The cache is disabled unless enabled with
+:func:`enable_llm_cache` (the CLI does this with ``--llm-cache``).
+
+>>> cache = LLMCache(path=":memory:")
+>>> key = cache.make_key("gpt-4", "Say hi", system="Be brief")
+>>> cache.get(key) is None
+True
+>>> cache.put(key, "hi", model="gpt-4")
+>>> cache.get(key)
+'hi'
+>>> cache.stats()["hits"]
+1
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from curategpt.utils.instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LLM_CACHE_PATH = os.environ.get(
+    "CURATEGPT_LLM_CACHE", str(Path.home() / ".cache" / "curategpt" / "llm_cache.sqlite")
+)
+DEFAULT_LLM_CACHE_SIZE = int(os.environ.get("CURATEGPT_LLM_CACHE_SIZE", 100000))
+DEFAULT_LLM_CACHE_TTL = float(os.environ.get("CURATEGPT_LLM_CACHE_TTL", 0)) or None
+
+
+@dataclass
+class LLMCache:
+    """
+    SQLite cache of completions, with expiry and least-recently-used eviction.
+
+    The connection is shared between threads, so that concurrent prompts can use one cache.
+    """
+
+    path: str = DEFAULT_LLM_CACHE_PATH
+    """SQLite file; ``:memory:`` keeps completions for the lifetime of the cache only"""
+
+    max_size: int = DEFAULT_LLM_CACHE_SIZE
+    """Maximum number of cached completions"""
+
+    ttl: Optional[float] = DEFAULT_LLM_CACHE_TTL
+    """Seconds after which a completion expires; None for no expiry"""
+
+    hits: int = 0
+    misses: int = 0
+
+    _conn: Optional[sqlite3.Connection] = field(default=None, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self):
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions "
+            "(key TEXT PRIMARY KEY, model TEXT, response TEXT, created REAL, last_used REAL)"
+        )
+        self._conn.commit()
+        self.evict()
+
+    @staticmethod
+    def make_key(
+        model: str, prompt: Optional[str], system: Optional[str] = None, **options
+    ) -> str:
+        """
+        Make a cache key from everything that determines a completion.
+
+        :param model: model id
+        :param prompt:
+        :param system: system prompt
+        :param options: model options, e.g. temperature
+        :return:
+        """
+        serialized = json.dumps(
+            {"model": model, "prompt": prompt, "system": system, "options": options},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a cached completion.
+
+        :param key:
+        :return: completion text, or None on a miss or if it has expired
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM completions WHERE key = ?", [key]
+            ).fetchone()
+            if row and self.ttl and row[1] < now - self.ttl:
+                row = None
+            if row:
+                self._conn.execute(
+                    "UPDATE completions SET last_used = ? WHERE key = ?", [now, key]
+                )
+                self._conn.commit()
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: str, model: str = None):
+        """
+        Store a completion, evicting the least recently used ones if the cache is full.
+
+        :param key:
+        :param response: completion text
+        :param model: model id, kept for inspection and :meth:`clear`
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?)",
+                [key, model, response, now, now],
+            )
+            self._conn.execute(
+                "DELETE FROM completions WHERE key NOT IN "
+                "(SELECT key FROM completions ORDER BY last_used DESC LIMIT ?)",
+                [self.max_size],
+            )
+            self._conn.commit()
+
+    def evict(self):
+        """
+        Remove expired completions, and the least recently used ones beyond the maximum size.
+        """
+        with self._lock:
+            if self.ttl:
+                self._conn.execute(
+                    "DELETE FROM completions WHERE created < ?", [time.time() - self.ttl]
+                )
+            self._conn.execute(
+                "DELETE FROM completions WHERE key NOT IN "
+                "(SELECT key FROM completions ORDER BY last_used DESC LIMIT ?)",
+                [self.max_size],
+            )
+            self._conn.commit()
+
+    def clear(self, model: str = None):
+        """
+        Remove cached completions.
+
+        :param model: only remove completions of this model
+        """
+        with self._lock:
+            if model:
+                self._conn.execute("DELETE FROM completions WHERE model = ?", [model])
+            else:
+                self._conn.execute("DELETE FROM completions")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Cache statistics.
+
+        :return: dictionary with hits, misses, hit_rate and size
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass
+class CachedResponse:
+    """A cached completion, with the methods of an ``llm`` response that callers use."""
+
+    completion: str
+    model_id: Optional[str] = None
+
+    def text(self) -> str:
+        return self.completion
+
+    def __str__(self) -> str:
+        return self.completion
+
+
+_llm_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    Get the cache used by :func:`cached_prompt`.
+
+    :return: the cache, or None if caching is disabled
+    """
+    return _llm_cache
+
+
+def enable_llm_cache(path: str = None, **kwargs) -> LLMCache:
+    """
+    Cache completions made with :func:`cached_prompt`.
+
+    :param path: SQLite file; defaults to ``CURATEGPT_LLM_CACHE`` or ``~/.cache/curategpt``
+    :param kwargs: passed to :class:`LLMCache`, e.g. max_size or ttl
+    :return: the cache
+    """
+    global _llm_cache
+    disable_llm_cache()
+    _llm_cache = LLMCache(path=path or DEFAULT_LLM_CACHE_PATH, **kwargs)
+    return _llm_cache
+
+
+def disable_llm_cache():
+    global _llm_cache
+    if _llm_cache is not None:
+        _llm_cache.close()
+    _llm_cache = None
+
+
+def _prompt(model, prompt: Optional[str], system: Optional[str] = None, **options):
+    # responses are lazy, so the completion is forced here for the span to time it
+    response = model.prompt(prompt, system=system, **options)
+    with span("llm.prompt", model=model.model_id) as s:
+        text = response.text()
+        s.count("prompt_chars", len(prompt or ""))
+        s.count("response_chars", len(text))
+    return response
+
+
+def cached_prompt(model, prompt: Optional[str], system: Optional[str] = None, **options):
+    """
+    Prompt a model, returning a cached completion if there is one.
+
+    If caching is disabled, this is the same as ``model.prompt``, except that the
+    completion is made before returning, and recorded as an ``llm.prompt`` span.
+
+    :param model: an ``llm`` model
+    :param prompt:
+    :param system: system prompt
+    :param options: model options, e.g. temperature
+    :return: ``llm`` response, or a :class:`CachedResponse` for a cached completion
+    """
+    cache = _llm_cache
+    if cache is None:
+        return _prompt(model, prompt, system=system, **options)
+    key = cache.make_key(model.model_id, prompt, system=system, **options)
+    text = cache.get(key)
+    if text is None:
+        response = _prompt(model, prompt, system=system, **options)
+        cache.put(key, response.text(), model=model.model_id)
+        return response
+    logger.debug(f"Using cached completion for {model.model_id}")
+    return CachedResponse(text, model_id=model.model_id)
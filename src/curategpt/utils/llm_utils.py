@@ -3,6 +3,8 @@ import logging
 from llm import Model, Response
 from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
 
+from curategpt.utils.llm_cache import cached_prompt
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,6 +30,6 @@ def is_rate_limit_error(exception):
 )
 def query_model(model: Model, *args, **kwargs) -> Response:
     logger.debug(f"Querying model {model.model_id}, args: {args}, kwargs: {kwargs}")
-    response = model.prompt(*args, **kwargs)
+    response = cached_prompt(model, *args, **kwargs)
     _text = response.text()
     return response
@@ -0,0 +1,221 @@
+"""
+Profiling of CLI runs.
+
+Two modes are supported:
+
+- ``stages``: records instrumentation spans (see :mod:`curategpt.utils.instrumentation`)
+  and reports wall time, CPU time, calls and counts (texts, tokens, bytes, ...)
+  per stage, e.g. embed, search, llm or http
+- ``cprofile``: additionally runs :mod:`cProfile`, whose statistics can be written as
+  a pstats file, or as a speedscope file for https://www.speedscope.app
+
+>>> profiler = Profiler("stages")
+>>> profiler.start()
+>>> from curategpt.utils.instrumentation import span
+>>> with span("embed.example") as s:
+...     s.count("texts", 2)
+>>> profiler.stop()
+>>> print(profiler.report())  # doctest: +ELLIPSIS
+Stage ...
+embed ...
+"""
+
+import cProfile
+import json
+import pstats
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from curategpt.utils.instrumentation import disable_metrics, enable_metrics, get_registry
+
+PROFILE_MODES = ["stages", "cprofile"]
+
+# speedscope samples below this many seconds are dropped
+MIN_SAMPLE_TIME = 1e-6
+
+# cProfile keys are (file, line, function)
+FUNCTION = Tuple[str, int, str]
+
+
+@dataclass
+class Profiler:
+    """Collects a profile between start and stop."""
+
+    mode: str = "stages"
+    _profile: Optional[cProfile.Profile] = field(default=None, repr=False)
+    _start: float = 0.0
+    _start_cpu: float = 0.0
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+
+    def __post_init__(self):
+        if self.mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {self.mode}; choose from {PROFILE_MODES}")
+
+    def start(self):
+        enable_metrics().reset()
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._start = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+    def stop(self):
+        self.wall_time = time.perf_counter() - self._start
+        self.cpu_time = time.process_time() - self._start_cpu
+        if self._profile:
+            self._profile.disable()
+        disable_metrics()
+
+    def stage_rows(self) -> List[Dict]:
+        """
+        One row per span, with the counts recorded on it.
+
+        :return:
+        """
+        snapshot = get_registry().snapshot()
+        rows = []
+        for name, stats in sorted(snapshot["spans"].items()):
+            counts = {
+                counter[len(name) + 1 :]: value
+                for counter, value in snapshot["counters"].items()
+                if counter.startswith(f"{name}.")
+            }
+            rows.append(
+                {
+                    "stage": name.split(".")[0],
+                    "span": name,
+                    "calls": stats["count"],
+                    "wall_time": stats["wall_time"],
+                    "cpu_time": stats["cpu_time"],
+                    "errors": stats["errors"],
+                    "counts": counts,
+                }
+            )
+        return rows
+
+    def report(self, top: int = 15) -> str:
+        """
+        Summary table of the profile.
+
+        :param top: number of functions to list in cprofile mode
+        :return:
+        """
+        lines = [
+            f"{'Stage':<10} {'Span':<24} {'Calls':>7} {'Wall s':>9} {'CPU s':>9} {'%Wall':>6}  Counts"
+        ]
+        for row in self.stage_rows():
+            share = 100 * row["wall_time"] / self.wall_time if self.wall_time else 0.0
+            counts = ", ".join(f"{k}={v:g}" for k, v in sorted(row["counts"].items()))
+            lines.append(
+                f"{row['stage']:<10} {row['span']:<24} {row['calls']:>7} "
+                f"{row['wall_time']:>9.3f} {row['cpu_time']:>9.3f} {share:>6.1f}  {counts}"
+            )
+        lines.append(f"Total: wall {self.wall_time:.3f}s, CPU {self.cpu_time:.3f}s")
+        lines.append("(nested spans, e.g. embed within insert, are included in both)")
+        if self._profile:
+            stats = pstats.Stats(self._profile)
+            entries = sorted(stats.stats.items(), key=lambda e: e[1][3], reverse=True)[:top]
+            lines.append("")
+            lines.append(f"{'Calls':>9} {'Own s':>9} {'Cum s':>9}  Function")
+            for (filename, line, function), (_, nc, tt, ct, _) in entries:
+                lines.append(f"{nc:>9} {tt:>9.3f} {ct:>9.3f}  {function} ({filename}:{line})")
+        return "\n".join(lines)
+
+    def write(self, path: str):
+        """
+        Write the profile to a file.
+
+        In cprofile mode, files ending in ``.json`` are written in speedscope format,
+        others as pstats. In stages mode, the stage rows are written as JSON.
+
+        :param path:
+        """
+        if self._profile is None:
+            with open(path, "w") as f:
+                json.dump(
+                    {
+                        "wall_time": self.wall_time,
+                        "cpu_time": self.cpu_time,
+                        "stages": self.stage_rows(),
+                    },
+                    f,
+                    indent=2,
+                )
+        elif path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump(speedscope_profile(pstats.Stats(self._profile)), f)
+        else:
+            self._profile.dump_stats(path)
+
+
+def speedscope_profile(stats: pstats.Stats, max_depth: int = 64) -> Dict:
+    """
+    Convert cProfile statistics to a speedscope file.
+
+    cProfile only records caller/callee pairs, so stacks are reconstructed from the
+    roots down, splitting each function's time between its callers in proportion to
+    the time spent on each call edge.
+
+    :param stats:
+    :param max_depth: stacks are truncated beyond this depth
+    :return: speedscope JSON document
+    """
+    entries = stats.stats
+    frames: List[Dict] = []
+    frame_index: Dict[FUNCTION, int] = {}
+
+    def _frame(function: FUNCTION) -> int:
+        if function not in frame_index:
+            filename, line, name = function
+            frame_index[function] = len(frames)
+            frames.append({"name": name, "file": filename, "line": line})
+        return frame_index[function]
+
+    callees: Dict[FUNCTION, List[Tuple[FUNCTION, float]]] = {}
+    for function, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            # edge is (calls, primitive calls, own time, cumulative time)
+            callees.setdefault(caller, []).append((function, edge[3]))
+
+    samples: List[List[int]] = []
+    weights: List[float] = []
+
+    def _walk(function: FUNCTION, stack: List[int], time_in_context: float):
+        _, _, tt, ct, _ = entries[function]
+        stack = stack + [_frame(function)]
+        scale = time_in_context / ct if ct else 0.0
+        own = tt * scale
+        if own >= MIN_SAMPLE_TIME:
+            samples.append(stack)
+            weights.append(own)
+        if len(stack) >= max_depth:
+            return
+        for callee, edge_time in callees.get(function, []):
+            if (
+                callee in entries
+                and _frame(callee) not in stack
+                and edge_time * scale >= MIN_SAMPLE_TIME
+            ):
+                _walk(callee, stack, edge_time * scale)
+
+    roots = [f for f, (_, _, _, _, callers) in entries.items() if not callers]
+    for root in roots:
+        _walk(root, [], entries[root][3])
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": "curategpt",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+        ],
+        "exporter": "curategpt",
+    }
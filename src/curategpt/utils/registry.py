@@ -0,0 +1,110 @@
+"""
+Registries of pluggable implementations, such as wrappers and store adapters.
+
+Each registry maps a name to a ``module:Class`` reference, so that only the
+implementation that is requested gets imported. Built-in implementations are
+declared in curategpt; other packages can add their own through entry points, e.g.
+in a ``pyproject.toml``:
+
+.. code-block:: toml
+
+    [project.entry-points."curategpt.wrappers"]
+    my_source = "my_package.my_wrapper:MySourceWrapper"
+
+>>> registry = Registry("curategpt.examples", {"ordered": "collections:OrderedDict"})
+>>> registry.load("ordered").__name__
+'OrderedDict'
+>>> "ordered" in registry.names()
+True
+"""
+
+import importlib
+import logging
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Type
+
+logger = logging.getLogger(__name__)
+
+
+def _entry_points(group: str) -> Dict[str, str]:
+    from importlib.metadata import entry_points
+
+    if sys.version_info >= (3, 10):
+        eps = entry_points(group=group)
+    else:
+        eps = entry_points().get(group, [])
+    return {ep.name: ep.value for ep in eps}
+
+
+def load_reference(reference: str) -> Type:
+    """
+    Import the object referred to by ``module:attribute``.
+
+    :param reference:
+    :return:
+    """
+    module_name, _, attribute = reference.partition(":")
+    obj = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+@dataclass
+class Registry:
+    """Named implementations, imported on demand."""
+
+    group: str
+    """Entry point group in which plugins register implementations."""
+
+    builtins: Dict[str, str] = field(default_factory=dict)
+    """Built-in implementations, as name to ``module:Class`` reference."""
+
+    _plugins: Optional[Dict[str, str]] = field(default=None, repr=False)
+
+    def plugins(self) -> Dict[str, str]:
+        """
+        Implementations registered by other packages through entry points.
+
+        :return: name to ``module:Class`` reference
+        """
+        if self._plugins is None:
+            try:
+                self._plugins = _entry_points(self.group)
+            except Exception as e:
+                logger.warning(f"Could not read entry points for {self.group}: {e}")
+                self._plugins = {}
+        return self._plugins
+
+    def references(self) -> Dict[str, str]:
+        """
+        All registered implementations; built-in ones take precedence.
+
+        :return: name to ``module:Class`` reference
+        """
+        return {**self.plugins(), **self.builtins}
+
+    def names(self) -> List[str]:
+        return sorted(self.references())
+
+    def register(self, name: str, reference: str):
+        """
+        Register an implementation at runtime.
+
+        :param name:
+        :param reference: ``module:Class``
+        """
+        self.builtins[name] = reference
+
+    def load(self, name: str) -> Optional[Type]:
+        """
+        Import the implementation registered under a name.
+
+        :param name:
+        :return: the class, or None if nothing is registered under that name
+        """
+        reference = self.references().get(name)
+        if reference is None:
+            return None
+        return load_reference(reference)
@@ -1,9 +1,12 @@
 # https://github.com/openai/openai-cookbook/blob/main/examples/How_to_count_tokens_with_tiktoken.ipynb
 import logging
-from typing import List, Optional
+from functools import lru_cache
+from typing import List, Optional, Tuple
 
 import tiktoken
 
+from curategpt.utils.instrumentation import span
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,17 +28,13 @@ def max_tokens_by_model(model_id: Optional[str] = None):
         return 4097
 
 
-def estimate_num_tokens(messages: List[str], model="gpt-4"):
+@lru_cache(maxsize=None)
+def _encoding(model: str) -> Tuple[tiktoken.Encoding, int]:
     """
-    Return the number of tokens used by a list of messages.
+    Get the encoding of a model, and the number of tokens added per message.
 
-    Note: this is an estimate
+    Looking up an encoding is slow, so this is cached.
     """
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        logger.warning("Warning: model not found. Using cl100k_base encoding.")
-        encoding = tiktoken.get_encoding("cl100k_base")
     if model in {
         "gpt-3.5-turbo-0613",
         "gpt-3.5-turbo-16k-0613",
@@ -53,21 +52,131 @@ def estimate_num_tokens(messages: List[str], model="gpt-4"):
         logger.info(
             "Warning: gpt-3.5-turbo may update over time. Returning num tokens assuming gpt-3.5-turbo-0613."
         )
-        return estimate_num_tokens(messages, model="gpt-3.5-turbo-0613")
+        return _encoding("gpt-3.5-turbo-0613")
     elif "gpt-4" in model:
         logger.info(
             "Warning: gpt-4 may update over time. Returning num tokens assuming gpt-4-0613."
         )
-        return estimate_num_tokens(messages, model="gpt-4-0613")
+        return _encoding("gpt-4-0613")
     else:
         raise NotImplementedError(
             f"num_tokens_from_messages() is not implemented for model {model}."
             "See https://github.com/openai/openai-python/blob/main/chatml.md"
             " for information on how messages are converted to tokens."
         )
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        logger.warning("Warning: model not found. Using cl100k_base encoding.")
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return encoding, tokens_per_message
+
+
+class _ApproximateEncoding:
+    """Counts four characters as a token, for when no tiktoken encoding can be loaded."""
+
+    chars_per_token = 4
+
+    def encode(self, text: str, **kwargs) -> List[str]:
+        n = self.chars_per_token
+        return [text[i : i + n] for i in range(0, len(text), n)]
+
+    def decode(self, tokens: List[str]) -> str:
+        return "".join(tokens)
+
+
+@lru_cache(maxsize=None)
+def embedding_encoding(model: Optional[str] = None):
+    """
+    Get the encoding used to count the tokens of texts to embed.
+
+    Models are given as in the stores, e.g. ``openai:text-embedding-3-small``.
+    ``cl100k_base``, the encoding of the OpenAI embedding models, is used as an
+    approximation for models that tiktoken does not know. If the encoding cannot be
+    loaded, e.g. as tiktoken cannot download it, tokens are estimated from the length
+    of texts.
+    """
+    name = model.split(":", 1)[-1] if model else ""
+    try:
+        try:
+            return tiktoken.encoding_for_model(name)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Cannot load a tiktoken encoding for {model}; estimating tokens: {e}")
+        return _ApproximateEncoding()
+
+
+def estimate_num_tokens(messages: List[str], model="gpt-4"):
+    """
+    Return the number of tokens used by a list of messages.
+
+    Note: this is an estimate
+    """
+    encoding, tokens_per_message = _encoding(model)
     num_tokens = 0
-    for message in messages:
-        num_tokens += tokens_per_message
-        num_tokens += len(encoding.encode(message))
+    with span("tokens.estimate") as s:
+        for message in messages:
+            num_tokens += tokens_per_message
+            num_tokens += len(encoding.encode(message))
+        s.count("tokens", num_tokens)
     num_tokens += 3  # every reply is primed with <|start|>assistant<|message|>
     return num_tokens
+
+
+def select_within_budget(
+    fixed: str,
+    texts: List[str],
+    max_tokens: int,
+    reserved_tokens: int = 300,
+    model: str = "gpt-4",
+    skip_oversized: bool = False,
+) -> List[int]:
+    """
+    Select the texts, e.g. references or examples, that fit in a prompt.
+
+    Each text is tokenized once, and texts are added in a single pass, so this is
+    linear in the size of the prompt. Texts are considered in order, most relevant
+    first. By default selection stops at the first text that does not fit, giving the
+    longest prefix that fits; with ``skip_oversized``, texts that do not fit are skipped
+    and later, shorter ones may still be selected.
+
+    The prompt fits if its estimated tokens plus ``reserved_tokens`` are fewer than
+    ``max_tokens``; token counts of the parts are added up, which approximates the
+    count of the assembled prompt.
+
+    >>> select_within_budget("Answer using:", ["short", "a much longer text " * 40], 360)
+    [0]
+    >>> select_within_budget("Answer using:", ["long text " * 40, "short"], 360)
+    []
+    >>> select_within_budget("Answer using:", ["long text " * 40, "short"], 360, skip_oversized=True)
+    [1]
+
+    :param fixed: the parts of the prompt that are always included
+    :param texts: candidate texts, each including its heading and separator
+    :param max_tokens: maximum tokens of the model, see :func:`max_tokens_by_model`
+    :param reserved_tokens: tokens reserved for the response
+    :param model: model whose encoding is used to estimate tokens
+    :param skip_oversized:
+    :return: indexes of the selected texts, in order
+    :raises ValueError: if the fixed parts alone do not fit
+    """
+    encoding, tokens_per_message = _encoding(model)
+    with span("tokens.select") as s:
+        # one message, and the reply priming; see estimate_num_tokens
+        total = tokens_per_message + 3 + len(encoding.encode(fixed))
+        budget = max_tokens - reserved_tokens - 1
+        if total > budget:
+            raise ValueError(f"Prompt too long: {fixed}.")
+        selected = []
+        for i, text in enumerate(texts):
+            num_tokens = len(encoding.encode(text))
+            if total + num_tokens <= budget:
+                total += num_tokens
+                selected.append(i)
+            elif not skip_oversized:
+                break
+        s.count("tokens", total)
+    if len(selected) < len(texts):
+        logger.debug(f"Selected {len(selected)} of {len(texts)} texts, {total} tokens")
+    return selected
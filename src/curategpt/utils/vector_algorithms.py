@@ -2,6 +2,7 @@ from typing import List, Tuple
 
 import numpy as np
 
+from curategpt.utils.instrumentation import timed
 from curategpt.utils.search import logger
 
 LOL = List[List[float]]
@@ -62,6 +63,7 @@ def top_n_matches(
     return top_n_indices, top_n_values
 
 
+@timed("mmr")
 def mmr_diversified_search(
     query_vector: np.ndarray, document_vectors: List[np.ndarray], relevance_factor=0.5, top_n=None
 ) -> List[int]:
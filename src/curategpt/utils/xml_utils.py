@@ -0,0 +1,118 @@
+"""
+Streaming helpers for large XML documents, such as PMC full text and eutils responses.
+
+Documents are parsed incrementally with ``iterparse``, and elements are discarded as
+soon as they have been used, so memory is bounded by the largest record rather than
+the whole document.
+
+>>> xml_text(b"<article><p>Some <b>bold</b> text.</p></article>")
+'Some bold text.'
+"""
+
+import io
+from typing import IO, Dict, Iterator, Optional, Union
+from xml.etree.ElementTree import Element
+
+from defusedxml.ElementTree import iterparse
+
+XML_SOURCE = Union[bytes, str, IO[bytes]]
+
+
+def _stream(source: XML_SOURCE) -> IO[bytes]:
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+    if isinstance(source, bytes):
+        return io.BytesIO(source)
+    return source
+
+
+def iter_elements(source: XML_SOURCE, tag: str) -> Iterator[Element]:
+    """
+    Iterate over the elements with a tag, as each one is parsed.
+
+    Each element is removed from the tree and cleared once the next one is requested,
+    so it must be used (e.g. with :func:`element_to_dict`) before iterating further.
+    Elements with the tag should not be nested in one another.
+
+    >>> [e.text for e in iter_elements(b"<set><r>a</r><r>b</r></set>", "r")]
+    ['a', 'b']
+
+    :param source: XML content, or a binary file object
+    :param tag: tag of the elements, with its namespace as ``{uri}tag`` if it has one
+    :return: iterator over elements
+    """
+    ancestors = []
+    for event, elem in iterparse(_stream(source), events=("start", "end")):
+        if event == "start":
+            ancestors.append(elem)
+            continue
+        ancestors.pop()
+        if elem.tag == tag:
+            yield elem
+            if ancestors:
+                ancestors[-1].remove(elem)
+            elem.clear()
+
+
+def element_text(element: Element) -> str:
+    """
+    All text of an element and its descendants, in document order.
+
+    :param element:
+    :return:
+    """
+    return "".join(element.itertext())
+
+
+def xml_text(source: XML_SOURCE) -> str:
+    """
+    All text of a document, in document order.
+
+    Text is assembled bottom-up as elements end, and the children of an element are
+    dropped once its text is known, so the parsed tree is never held in full.
+
+    :param source: XML content, or a binary file object
+    :return:
+    """
+    texts: Dict[Element, str] = {}
+    elem: Optional[Element] = None
+    for _, elem in iterparse(_stream(source), events=("end",)):
+        parts = [elem.text or ""]
+        for child in elem:
+            parts.append(texts.pop(child))
+            parts.append(child.tail or "")
+        # an element is not cleared itself, as its tail may be parsed already
+        del elem[:]
+        texts[elem] = "".join(parts)
+    return texts.pop(elem) if elem is not None else ""
+
+
+def element_to_dict(element: Element) -> Union[Dict, str, None]:
+    """
+    Convert an element to the structure ``xmltodict.parse`` gives for it.
+
+    Attributes are keys prefixed with ``@``, children are keys by tag (a list if a tag
+    is repeated), and text is ``#text``; an element with text only is its text, and an
+    empty element is None.
+
+    >>> element_to_dict(Element("Organism", taxonomy_name="Homo sapiens"))
+    {'@taxonomy_name': 'Homo sapiens'}
+
+    :param element:
+    :return:
+    """
+    d: Dict = {f"@{k}": v for k, v in element.attrib.items()}
+    for child in element:
+        value = element_to_dict(child)
+        if child.tag not in d:
+            d[child.tag] = value
+        elif isinstance(d[child.tag], list):
+            d[child.tag].append(value)
+        else:
+            d[child.tag] = [d[child.tag], value]
+    text = "".join([element.text or ""] + [child.tail or "" for child in element]).strip()
+    if not d:
+        return text or None
+    if text:
+        d["#text"] = text
+    return d
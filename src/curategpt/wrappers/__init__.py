@@ -5,7 +5,12 @@ Wrappers allow for dynamic or static loading of an external data source
 into a store.
 """
 
-from curategpt.wrappers.base_wrapper import BaseWrapper
+from typing import TYPE_CHECKING
+
+from curategpt.utils.registry import Registry
+
+if TYPE_CHECKING:
+    from curategpt.wrappers.base_wrapper import BaseWrapper
 
 __all__ = [
     "BaseWrapper",
@@ -31,10 +36,60 @@ __all__ = [
     "GoogleDriveWrapper",
     "FAIRSharingWrapper",
     "FilesystemWrapper",
+    "WRAPPERS",
     "get_wrapper",
 ]
 
 
+# built-in wrappers, by wrapper name; other packages can register wrappers
+# in the "curategpt.wrappers" entry point group. A wrapper module is only
+# imported when that wrapper is requested
+WRAPPERS = Registry(
+    "curategpt.wrappers",
+    {
+        "alliance_gene": "curategpt.wrappers.bio.alliance_gene_wrapper:AllianceGeneWrapper",
+        "bacdive": "curategpt.wrappers.bio.bacdive_wrapper:BacDiveWrapper",
+        "gocam": "curategpt.wrappers.bio.gocam_wrapper:GOCAMWrapper",
+        "mediadive": "curategpt.wrappers.bio.mediadive_wrapper:MediaDiveWrapper",
+        "omicsdi": "curategpt.wrappers.bio.omicsdi_wrapper:OmicsDIWrapper",
+        "reactome": "curategpt.wrappers.bio.reactome_wrapper:ReactomeWrapper",
+        "uniprot": "curategpt.wrappers.bio.uniprot_wrapper:UniprotWrapper",
+        "clinvar": "curategpt.wrappers.clinical.clinvar_wrapper:ClinVarWrapper",
+        "ctgov": "curategpt.wrappers.clinical.ctgov_wrapper:ClinicalTrialsWrapper",
+        "hpoa_by_pub": "curategpt.wrappers.clinical.hpoa_by_pub_wrapper:HPOAByPubWrapper",
+        "hpoa": "curategpt.wrappers.clinical.hpoa_wrapper:HPOAWrapper",
+        "maxoa": "curategpt.wrappers.clinical.maxoa_wrapper:MAXOAWrapper",
+        "filesystem": "curategpt.wrappers.general.filesystem_wrapper:FilesystemWrapper",
+        "github": "curategpt.wrappers.general.github_wrapper:GitHubWrapper",
+        "google_drive": "curategpt.wrappers.general.google_drive_wrapper:GoogleDriveWrapper",
+        "gspread": "curategpt.wrappers.general.gspread_wrapper:GSpreadWrapper",
+        "json": "curategpt.wrappers.general.json_wrapper:JSONWrapper",
+        "linkml_schema": "curategpt.wrappers.general.linkml_schema_wrapper:LinkMLSchemarapper",
+        "ess_deepdive": "curategpt.wrappers.investigation.ess_deepdive_wrapper:ESSDeepDiveWrapper",
+        "fairsharing": "curategpt.wrappers.investigation.fairsharing_wrapper:FAIRSharingWrapper",
+        "jgi": "curategpt.wrappers.investigation.jgi_wrapper:JGIWrapper",
+        "ncbi_bioproject": "curategpt.wrappers.investigation.ncbi_bioproject_wrapper:NCBIBioprojectWrapper",
+        "ncbi_biosample": "curategpt.wrappers.investigation.ncbi_biosample_wrapper:NCBIBiosampleWrapper",
+        "nmdc": "curategpt.wrappers.investigation.nmdc_wrapper:NMDCWrapper",
+        "reusabledata": "curategpt.wrappers.legal.reusabledata_wrapper:ReusableDataWrapper",
+        "bioc": "curategpt.wrappers.literature.bioc_wrapper:BiocWrapper",
+        "pmc": "curategpt.wrappers.literature.pmc_wrapper:PMCWrapper",
+        "pubmed": "curategpt.wrappers.literature.pubmed_wrapper:PubmedWrapper",
+        "wikipedia": "curategpt.wrappers.literature.wikipedia_wrapper:WikipediaWrapper",
+        "oboformat": "curategpt.wrappers.ontology.oboformat_wrapper:OBOFormatWrapper",
+        "oaklib": "curategpt.wrappers.ontology.ontology_wrapper:OntologyWrapper",
+    },
+)
+
+
+def __getattr__(name: str):
+    if name == "BaseWrapper":
+        from curategpt.wrappers.base_wrapper import BaseWrapper
+
+        return BaseWrapper
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def get_all_subclasses(cls):
     """Recursively get all subclasses of a given class."""
     direct_subclasses = cls.__subclasses__()
@@ -43,65 +98,13 @@ def get_all_subclasses(cls):
     ]
 
 
-def get_wrapper(name: str, **kwargs) -> BaseWrapper:
-    # NOTE: ORDER DEPENDENT. TODO: fix this
-    from curategpt.wrappers.bio.alliance_gene_wrapper import \
-        AllianceGeneWrapper  # noqa
-    from curategpt.wrappers.bio.bacdive_wrapper import BacDiveWrapper  # noqa
-    from curategpt.wrappers.bio.gocam_wrapper import GOCAMWrapper  # noqa
-    from curategpt.wrappers.bio.mediadive_wrapper import \
-        MediaDiveWrapper  # noqa
-    from curategpt.wrappers.bio.omicsdi_wrapper import OmicsDIWrapper  # noqa
-    from curategpt.wrappers.bio.reactome_wrapper import \
-        ReactomeWrapper  # noqa
-    from curategpt.wrappers.bio.uniprot_wrapper import UniprotWrapper  # noqa
-    from curategpt.wrappers.clinical.clinvar_wrapper import \
-        ClinVarWrapper  # noqa
-    from curategpt.wrappers.clinical.ctgov_wrapper import \
-        ClinicalTrialsWrapper  # noqa
-    from curategpt.wrappers.clinical.hpoa_by_pub_wrapper import \
-        HPOAByPubWrapper  # noqa
-    from curategpt.wrappers.clinical.hpoa_wrapper import HPOAWrapper  # noqa
-    from curategpt.wrappers.clinical.maxoa_wrapper import MAXOAWrapper  # noqa
-    from curategpt.wrappers.general.filesystem_wrapper import \
-        FilesystemWrapper  # noqa
-    from curategpt.wrappers.general.github_wrapper import \
-        GitHubWrapper  # noqa
-    from curategpt.wrappers.general.google_drive_wrapper import \
-        GoogleDriveWrapper  # noqa
-    from curategpt.wrappers.general.gspread_wrapper import \
-        GSpreadWrapper  # noqa
-    from curategpt.wrappers.general.json_wrapper import JSONWrapper  # noqa
-    from curategpt.wrappers.general.linkml_schema_wrapper import \
-        LinkMLSchemarapper  # noqa
-    from curategpt.wrappers.investigation.ess_deepdive_wrapper import \
-        ESSDeepDiveWrapper  # noqa
-    from curategpt.wrappers.investigation.fairsharing_wrapper import \
-        FAIRSharingWrapper  # noqa
-    from curategpt.wrappers.investigation.jgi_wrapper import \
-        JGIWrapper  # noqa
-    from curategpt.wrappers.investigation.ncbi_bioproject_wrapper import \
-        NCBIBioprojectWrapper  # noqa
-    from curategpt.wrappers.investigation.ncbi_biosample_wrapper import \
-        NCBIBiosampleWrapper  # noqa
-    from curategpt.wrappers.investigation.nmdc_wrapper import \
-        NMDCWrapper  # noqa
-    from curategpt.wrappers.legal.reusabledata_wrapper import \
-        ReusableDataWrapper  # noqa
-    from curategpt.wrappers.literature.bioc_wrapper import BiocWrapper  # noqa
-    from curategpt.wrappers.literature.pmc_wrapper import PMCWrapper  # noqa
-    from curategpt.wrappers.literature.pubmed_wrapper import \
-        PubmedWrapper  # noqa
-    from curategpt.wrappers.literature.wikipedia_wrapper import \
-        WikipediaWrapper  # noqa
-    from curategpt.wrappers.ontology.bioportal_wrapper import \
-        BioportalWrapper  # noqa
-    from curategpt.wrappers.ontology.oboformat_wrapper import \
-        OBOFormatWrapper  # noqa
-    from curategpt.wrappers.ontology.ontology_wrapper import \
-        OntologyWrapper  # noqa
+def get_wrapper(name: str, **kwargs) -> "BaseWrapper":
+    from curategpt.wrappers.base_wrapper import BaseWrapper
 
-    for c in get_all_subclasses(BaseWrapper):
-        if c.name == name:
-            return c(**kwargs)
-    raise ValueError(f"Unknown view {name}, not found in {get_all_subclasses(BaseWrapper)}")
+    cls = WRAPPERS.load(name)
+    if cls is None:
+        # wrappers that are not registered are found if they have been imported
+        cls = next((c for c in get_all_subclasses(BaseWrapper) if c.name == name), None)
+    if cls is None:
+        raise ValueError(f"Unknown view {name}, choose from {WRAPPERS.names()}")
+    return cls(**kwargs)
@@ -8,10 +8,12 @@ from typing import Any, ClassVar, Dict, Iterable, Iterator, List, Optional, Unio
 
 from deprecation import deprecated
 
-from curategpt import ChromaDBAdapter
 from curategpt.extract import Extractor
 from curategpt.store import DBAdapter
 from curategpt.store.db_adapter import SEARCH_RESULT
+from curategpt.utils.chunking import DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS, split_objects
+from curategpt.utils.http_client import set_rate_limit
+from curategpt.utils.llm_cache import cached_prompt
 
 logger = logging.getLogger(__name__)
 
@@ -39,8 +41,18 @@ class BaseWrapper(ABC):  # noqa: B024
 
     search_limit_multiplier: ClassVar[int] = 3
 
-    max_text_length = 3000
-    text_overlap = 200
+    rate_limits: ClassVar[Dict[str, float]] = {}
+    """Maximum requests per second to each host the wrapper calls; see :mod:`curategpt.utils.http_client`"""
+
+    max_chunk_tokens = DEFAULT_MAX_TOKENS
+    """Texts with more tokens of the embedding model are split by :meth:`split_objects`"""
+
+    chunk_overlap_tokens = DEFAULT_OVERLAP_TOKENS
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for host, requests_per_second in cls.__dict__.get("rate_limits", {}).items():
+            set_rate_limit(host, requests_per_second)
 
     def search(
         self,
@@ -68,21 +80,51 @@ class BaseWrapper(ABC):  # noqa: B024
         )
         db = self.local_store
         if db is None:
+            from curategpt.store.chromadb_adapter import ChromaDBAdapter
+
             tmpdir = Path("/tmp")
             db = ChromaDBAdapter(str(tmpdir))
         if collection is None:
             collection = self._cached_collection_name(is_temp=not cache)
         if not cache:
             db.remove_collection(collection, exists_ok=True)
-        logger.info(f"Inserting {len(parsed_data)} records into {collection}")
-        db.upsert(parsed_data, collection=collection, model=self.default_embedding_model)
-        db.update_collection_metadata(
-            collection,
-            object_type="Publication",
-            description=f"Special cache for {self.name} searches",
-        )
+        exists = collection in db.list_collection_names()
+        if exists:
+            new_objs = self._new_or_changed_objects(db, parsed_data, collection)
+        else:
+            new_objs = parsed_data
+        if new_objs or not exists:
+            logger.info(f"Inserting {len(new_objs)} records into {collection}")
+            db.upsert(new_objs, collection=collection, model=self.default_embedding_model)
+        else:
+            logger.info(f"All {len(parsed_data)} records are already in {collection}")
+        metadata = {
+            "object_type": "Publication",
+            "description": f"Special cache for {self.name} searches",
+        }
+        cm = db.collection_metadata(collection)
+        if cm is None or any(getattr(cm, k) != v for k, v in metadata.items()):
+            db.update_collection_metadata(collection, **metadata)
         yield from db.search(text, collection=collection, limit=limit, **kwargs)
 
+    def _new_or_changed_objects(
+        self, db: DBAdapter, objs: List[Dict], collection: str
+    ) -> List[Dict]:
+        """
+        Filter out objects that are already stored unchanged, so they are not embedded again.
+
+        :param db:
+        :param objs:
+        :param collection:
+        :return: objects that are not stored, or differ from the stored version
+        """
+        id_field = db.identifier_field(collection)
+        ids = [obj.get(id_field) for obj in objs]
+        if not all(ids):
+            return objs
+        stored = {obj.get(id_field): obj for obj in db.lookup_multiple(ids, collection=collection)}
+        return [obj for id, obj in zip(ids, objs) if stored.get(id) != obj]  # noqa: B905
+
     def objects(
         self, collection: str = None, object_ids: Iterable[str] = None, **kwargs
     ) -> Iterator[Dict]:
@@ -120,8 +162,8 @@ class BaseWrapper(ABC):  # noqa: B024
 
     def extract_concepts_from_text(self, text: str, **kwargs):
         model = self.extractor.model
-        response = model.prompt(
-            text, system="generate a semi-colon separated list of the most relevant terms"
+        response = cached_prompt(
+            model, text, system="generate a semi-colon separated list of the most relevant terms"
         )
         terms = response.text().split(";")
         return terms
@@ -165,29 +207,25 @@ class BaseWrapper(ABC):  # noqa: B024
         else:
             return self.name + "_api_cached"
 
-    def split_objects(self, objects: List[Dict], text_field="text", id_field="id") -> List[Dict]:
+    def split_objects(
+        self, objects: Iterable[Dict], text_field="text", id_field="id"
+    ) -> Iterator[Dict]:
         """
-        Split objects with text above a certain length into multiple objects.
+        Split objects with text above a certain number of tokens into multiple objects.
+
+        See :func:`curategpt.utils.chunking.split_objects`.
 
         :param objects:
         :return:
         """
-        new_objects = []
-        for obj in objects:
-            if len(obj[text_field]) > self.max_text_length:
-                obj_id = obj[id_field]
-                text = obj[text_field]
-                n = 0
-                while text:
-                    new_obj = obj.copy()
-                    n += 1
-                    new_obj[id_field] = f"{obj_id}#{n}"
-                    new_obj[text_field] = text[: self.max_text_length + self.text_overlap]
-                    new_objects.append(new_obj)
-                    text = text[self.max_text_length :]
-            else:
-                new_objects.append(obj)
-        return new_objects
+        yield from split_objects(
+            objects,
+            text_field=text_field,
+            id_field=id_field,
+            max_tokens=self.max_chunk_tokens,
+            overlap_tokens=self.chunk_overlap_tokens,
+            model=self.default_embedding_model,
+        )
 
     def create_curie(self, local_id: str) -> str:
         """
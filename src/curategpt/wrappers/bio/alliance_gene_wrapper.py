@@ -4,9 +4,9 @@ import logging
 from dataclasses import dataclass, field
 from typing import ClassVar, Dict, Iterable, Iterator, Optional
 
-import requests_cache
 from oaklib import BasicOntologyInterface
 
+from curategpt.utils.http_client import get_session
 from curategpt.wrappers import BaseWrapper
 
 logger = logging.getLogger(__name__)
@@ -38,7 +38,7 @@ class AllianceGeneWrapper(BaseWrapper):
         :param kwargs:
         :return:
         """
-        session = requests_cache.CachedSession("alliance")
+        session = get_session("alliance")
 
         if not taxon_id:
             taxon_id = self.taxon_id
@@ -64,7 +64,7 @@ class AllianceGeneWrapper(BaseWrapper):
         :param kwargs:
         :return:
         """
-        session = requests_cache.CachedSession("alliance")
+        session = get_session("alliance")
 
         if not object_ids:
             gene_ids = self.object_ids(**kwargs)
@@ -5,12 +5,13 @@ from functools import lru_cache
 from typing import ClassVar, Dict, Iterable, Iterator, Optional
 
 import requests
-import requests_cache
 import yaml
 from oaklib import BasicOntologyInterface, get_adapter
 from oaklib.interfaces.association_provider_interface import AssociationProviderInterface
 
 from curategpt.formatters.format_utils import camelify
+from curategpt.utils.concurrency import map_ordered
+from curategpt.utils.http_client import get_session
 from curategpt.wrappers import BaseWrapper
 from curategpt.wrappers.literature import PubmedWrapper
 
@@ -69,27 +70,45 @@ class GOCAMWrapper(BaseWrapper):
 
     ro_adapter: BasicOntologyInterface = None
 
-    session: requests.Session = field(default_factory=lambda: requests.Session())
+    session: requests.Session = field(default_factory=get_session)
 
     include_standard_annotations: bool = False
 
+    max_workers: int = 4
+    """Number of concurrent requests when fetching models"""
+
     def __post_init__(self):
         self.pubmed_wrapper = PubmedWrapper()
         self.pubmed_wrapper.set_cache("gocam_pubmed_cache")
         self.ro_adapter = get_adapter("sqlite:obo:ro")
-        self.session = requests_cache.CachedSession("gocam_s3_cache")
+        self.session = get_session("gocam_s3_cache")
 
     def objects(
         self, collection: str = None, object_ids: Optional[Iterable[str]] = None, **kwargs
     ) -> Iterator[Dict]:
-        models = requests.get(INDEX_URL).json()
+        if object_ids is None:
+            object_ids = self.object_ids()
+        # models are fetched concurrently, but converted in this thread,
+        # as the ontology adapters are not thread safe
+        for task in map_ordered(self._fetch_model, object_ids, workers=self.max_workers):
+            if not task.ok:
+                raise task.error
+            yield self.object_from_dict(task.result)
+
+    def object_ids(self, **kwargs) -> Iterator[str]:
+        """
+        Get the ids of all models in the index.
+
+        :return:
+        """
+        models = get_session().get(INDEX_URL).json()
         for model in models:
             if "gocam" not in model:
                 raise ValueError(f"Missing gocam in {model}")
             gocam = model["gocam"]
-            yield self.object_by_id(gocam.replace("http://model.geneontology.org/", ""))
+            yield gocam.replace("http://model.geneontology.org/", "")
 
-    def object_by_id(self, object_id: str) -> Optional[Dict]:
+    def _fetch_model(self, object_id: str) -> Dict:
         session = self.session
         if not object_id:
             raise ValueError(f"Missing object ID: {object_id}")
@@ -98,8 +117,10 @@ class GOCAMWrapper(BaseWrapper):
         local_id = object_id.replace("gocam:", "")
         response = session.get(f"{GOCAM_ENDPOINT}/{local_id}")
         response.raise_for_status()
-        obj = response.json()
-        return self.object_from_dict(obj)
+        return response.json()
+
+    def object_by_id(self, object_id: str) -> Optional[Dict]:
+        return self.object_from_dict(self._fetch_model(object_id))
 
     def object_from_dict(self, obj: Dict) -> Optional[Dict]:
         id = obj["id"]
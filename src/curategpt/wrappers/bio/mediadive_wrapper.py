@@ -2,9 +2,9 @@ import logging
 from dataclasses import dataclass
 from typing import ClassVar, Dict, Iterable, Iterator, Optional
 
-import requests_cache
 from oaklib import BasicOntologyInterface
 
+from curategpt.utils.http_client import get_session
 from curategpt.wrappers import BaseWrapper
 
 logger = logging.getLogger(__name__)
@@ -31,7 +31,7 @@ class MediaDiveWrapper(BaseWrapper):
         :param kwargs:
         :return:
         """
-        session = requests_cache.CachedSession("mediadive")
+        session = get_session("mediadive")
 
         response = session.get(f"{BASE_URL}/media")
         response.raise_for_status()
@@ -49,7 +49,7 @@ class MediaDiveWrapper(BaseWrapper):
         :param kwargs:
         :return:
         """
-        session = requests_cache.CachedSession("mediadive")
+        session = get_session("mediadive")
 
         if not object_ids:
             object_ids = self.object_ids(**kwargs)
@@ -1,12 +1,11 @@
 """Chat with a KB."""
 
 import logging
-import time
 from dataclasses import dataclass
 from typing import ClassVar, Dict, List, Optional
 
-import requests
-
+from curategpt.utils.http_client import get_session
+from curategpt.utils.llm_cache import cached_prompt
 from curategpt.wrappers.base_wrapper import BaseWrapper
 
 logger = logging.getLogger(__name__)
@@ -25,6 +24,8 @@ class OmicsDIWrapper(BaseWrapper):
 
     name: ClassVar[str] = "omicsdi"
 
+    rate_limits: ClassVar[Dict[str, float]] = {"wwwdev.ebi.ac.uk": 4}
+
     default_object_type = "Dataset"
 
     source: str = None  # pride, ...
@@ -51,7 +52,8 @@ class OmicsDIWrapper(BaseWrapper):
 
             logger.info(f"Expanding search term: {text} to create OmicsDI query")
             model = self.extractor.model
-            response = model.prompt(
+            response = cached_prompt(
+                model,
                 text,
                 system="""
                 Take the specified search text, and expand it to a list
@@ -69,11 +71,10 @@ class OmicsDIWrapper(BaseWrapper):
         params["query"] = search_term
         if where:
             params.update(where)
-        time.sleep(0.25)
         logger.info(f"Constructed query: {params}")
         url = f"{BASE_URL}/dataset/search"
         logger.info(f"Searching OmicsDI {url} with query: {params}")
-        response = requests.get(url, params=params)
+        response = get_session().get(url, params=params)
         data = response.json()
 
         datasets = data["datasets"]
@@ -88,7 +89,7 @@ class OmicsDIWrapper(BaseWrapper):
         """
         url = f"{BASE_URL}/dataset/{source}/{local_id}"
         logger.info(f"Getting additional info from {url}")
-        response = requests.get(url)
+        response = get_session().get(url)
         response.raise_for_status()
         data = response.json()
         return data["additional"]
@@ -109,7 +110,7 @@ class OmicsDIWrapper(BaseWrapper):
             source = source.lower()
             url = f"{BASE_URL}/dataset/{source}/{local_id}"
             logger.info(f"Getting additional info from {url}")
-            response = requests.get(url)
+            response = get_session().get(url)
             response.raise_for_status()
             data = response.json()
             data_objects.append(data)
@@ -4,15 +4,20 @@ import logging
 from dataclasses import dataclass, field
 from typing import ClassVar, Dict, Iterable, Iterator, List, Optional
 
-import requests_cache
 from oaklib import BasicOntologyInterface
 
+from curategpt.utils.concurrency import map_ordered
+from curategpt.utils.http_client import get_session
+from curategpt.utils.iterators import chunk
 from curategpt.wrappers import BaseWrapper
 
 logger = logging.getLogger(__name__)
 
 BASE_URL = "https://reactome.org/ContentService/data"
 
+QUERY_BATCH_SIZE = 20
+"""Maximum number of ids accepted by the ``query/ids`` endpoint"""
+
 
 def ids_from_tree(objs: List):
     """
@@ -86,6 +91,9 @@ class ReactomeWrapper(BaseWrapper):
 
     taxon_id: str = field(default="NCBITaxon:9606")
 
+    max_workers: int = 4
+    """Number of concurrent requests when fetching events"""
+
     def object_ids(self, taxon_id: str = None, **kwargs) -> Iterator[str]:
         """
         Get all object ids for a given taxon id
@@ -94,7 +102,7 @@ class ReactomeWrapper(BaseWrapper):
         :param kwargs:
         :return:
         """
-        session = requests_cache.CachedSession("reactome")
+        session = get_session("reactome")
 
         if not taxon_id:
             taxon_id = self.taxon_id
@@ -115,31 +123,57 @@ class ReactomeWrapper(BaseWrapper):
         :param kwargs:
         :return:
         """
-        session = requests_cache.CachedSession("reactome")
-
         if not object_ids:
             object_ids = self.object_ids(**kwargs)
         else:
             object_ids = object_ids
 
-        visited = set()
-        for object_id in object_ids:
-            if object_id in visited:
-                continue
-            visited.add(object_id)
-            logger.info(f"Getting {object_id}")
-            local_id = object_id.split(":")[1]
-            response = session.get(f"{BASE_URL}/query/{local_id}")
-            obj = response.json()
-            summations = obj["summation"]
-            new_obj = {
-                "id": object_id,
-                "label": obj["displayName"],
-                "speciesName": obj["speciesName"],
-                "description": "\n".join([x["text"] for x in summations]),
-                "type": obj["schemaClass"],
-            }
-            for key, func in OBJECT_FUNCTION_MAP.items():
-                if key in obj:
-                    new_obj[key] = [func(x) for x in obj[key] if isinstance(x, dict)]
-            yield new_obj
+        def _unique(ids: Iterable[str]) -> Iterator[str]:
+            visited = set()
+            for object_id in ids:
+                if object_id not in visited:
+                    visited.add(object_id)
+                    yield object_id
+
+        batches = (list(batch) for batch in chunk(_unique(object_ids), QUERY_BATCH_SIZE))
+        for task in map_ordered(self._query_ids, batches, workers=self.max_workers, retries=2):
+            if not task.ok:
+                raise task.error
+            for object_id in task.item:
+                obj = task.result.get(object_id.split(":")[1])
+                if obj is None:
+                    logger.warning(f"Reactome has no event {object_id}")
+                    continue
+                yield self._event_object(object_id, obj)
+
+    def _query_ids(self, object_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch events with a single request.
+
+        :param object_ids:
+        :return: events by stable id
+        """
+        session = get_session("reactome")
+        logger.info(f"Getting {len(object_ids)} events, from {object_ids[0]}")
+        local_ids = [object_id.split(":")[1] for object_id in object_ids]
+        response = session.post(
+            f"{BASE_URL}/query/ids",
+            data=",".join(local_ids),
+            headers={"Content-Type": "text/plain"},
+        )
+        response.raise_for_status()
+        return {obj["stId"]: obj for obj in response.json()}
+
+    def _event_object(self, object_id: str, obj: Dict) -> Dict:
+        summations = obj["summation"]
+        new_obj = {
+            "id": object_id,
+            "label": obj["displayName"],
+            "speciesName": obj["speciesName"],
+            "description": "\n".join([x["text"] for x in summations]),
+            "type": obj["schemaClass"],
+        }
+        for key, func in OBJECT_FUNCTION_MAP.items():
+            if key in obj:
+                new_obj[key] = [func(x) for x in obj[key] if isinstance(x, dict)]
+        return new_obj
@@ -4,15 +4,20 @@ import logging
 from dataclasses import dataclass, field
 from typing import ClassVar, Dict, Iterable, Iterator, List, Optional
 
-import requests_cache
+import requests
 from oaklib import BasicOntologyInterface
 
+from curategpt.utils.concurrency import map_ordered
+from curategpt.utils.http_client import get_session
+from curategpt.utils.iterators import chunk
 from curategpt.wrappers import BaseWrapper
 
 logger = logging.getLogger(__name__)
 
 BASE_URL = "https://rest.uniprot.org/uniprotkb"
 
+ACCESSIONS_BATCH_SIZE = 100
+
 
 @dataclass
 class UniprotWrapper(BaseWrapper):
@@ -29,9 +34,10 @@ class UniprotWrapper(BaseWrapper):
     # taxon_id: str = field(default="NCBITaxon:9606")
     taxon_id: Optional[str] = None
 
-    session: requests_cache.CachedSession = field(
-        default_factory=lambda: requests_cache.CachedSession("uniprot")
-    )
+    session: requests.Session = field(default_factory=lambda: get_session("uniprot"))
+
+    max_workers: int = 4
+    """Number of concurrent requests when fetching proteins"""
 
     def objects(
         self, collection: str = None, object_ids: Iterable[str] = None, **kwargs
@@ -50,7 +56,8 @@ class UniprotWrapper(BaseWrapper):
         :param kwargs:
         :return:
         """
-        url = f"{BASE_URL}/search"
+        # unlike search, stream returns all results without paging
+        url = f"{BASE_URL}/stream"
         session = self.session
         taxon_id = taxon_id or self.taxon_id
         if not taxon_id:
@@ -60,7 +67,6 @@ class UniprotWrapper(BaseWrapper):
             "query": f"organism_id:{taxon_id} AND reviewed:true",
             # Query for E. coli using NCBI taxon ID and reviewed (Swiss-Prot) proteins
             "format": "json",  # Response format
-            "size": 500,  # Number of results per page (max 500)
             "fields": "accession,id",  # Fields to retrieve
         }
 
@@ -74,18 +80,38 @@ class UniprotWrapper(BaseWrapper):
             logger.debug(f"Got entry: {entry}")
             yield entry["primaryAccession"]
 
-    def objects_by_ids(self, object_ids: List[str]) -> List[Dict]:
-        session = self.session
-        objs = []
-        for object_id in object_ids:
+    def objects_by_ids(self, object_ids: Iterable[str]) -> List[Dict]:
+        def _accession(object_id: str) -> str:
             if ":" in object_id:
-                pfx, object_id = object_id.split(":")[1]
+                pfx, object_id = object_id.split(":", 1)
                 if pfx.lower() not in ["uniprot", "uniprotkb"]:
                     raise ValueError(f"Invalid object id prefix: {pfx}")
-            url = f"{BASE_URL}/{object_id}.json"
-            logger.info(f"Getting protein data for {object_id} from {url}")
-            response = session.get(url)
-            response.raise_for_status()
-            data = response.json()
-            objs.append(data)
+            return object_id
+
+        accessions = (_accession(object_id) for object_id in object_ids)
+        batches = (list(batch) for batch in chunk(accessions, ACCESSIONS_BATCH_SIZE))
+        objs = []
+        for task in map_ordered(self._fetch_accessions, batches, workers=self.max_workers):
+            if not task.ok:
+                raise task.error
+            for accession in task.item:
+                if accession in task.result:
+                    objs.append(task.result[accession])
+                else:
+                    logger.warning(f"UniProt has no entry {accession}")
         return objs
+
+    def _fetch_accessions(self, accessions: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch entries with a single request.
+
+        :param accessions:
+        :return: entries by primary accession
+        """
+        url = f"{BASE_URL}/accessions"
+        logger.info(f"Getting protein data for {len(accessions)} proteins, from {accessions[0]}")
+        response = self.session.get(
+            url, params={"accessions": ",".join(accessions), "format": "json"}
+        )
+        response.raise_for_status()
+        return {entry["primaryAccession"]: entry for entry in response.json()["results"]}
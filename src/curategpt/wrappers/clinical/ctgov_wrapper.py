@@ -1,14 +1,14 @@
 """Chat with a KB."""
 
 import logging
-import time
 from dataclasses import dataclass, field
 from typing import ClassVar, Dict, List, Optional
 
 import requests
-import requests_cache
 from oaklib import BasicOntologyInterface
 
+from curategpt.utils.http_client import get_session
+from curategpt.utils.llm_cache import cached_prompt
 from curategpt.wrappers import BaseWrapper
 
 logger = logging.getLogger(__name__)
@@ -16,8 +16,6 @@ logger = logging.getLogger(__name__)
 BASE_URL = "https://clinicaltrials.gov/api/v2"
 STUDY_URL = f"{BASE_URL}/studies"
 
-RATE_LIMIT_DELAY = 0.5
-
 
 @dataclass
 class ClinicalTrialsWrapper(BaseWrapper):
@@ -28,18 +26,20 @@ class ClinicalTrialsWrapper(BaseWrapper):
 
     name: ClassVar[str] = "ctgov"
 
+    rate_limits: ClassVar[Dict[str, float]] = {"clinicaltrials.gov": 2}
+
     _label_adapter: BasicOntologyInterface = None
 
     default_object_type = "ClinicalTrial"
 
-    session: requests.Session = field(default_factory=lambda: requests.Session())
+    session: requests.Session = field(default_factory=get_session)
 
     where: Optional[Dict] = None
 
     _uses_cache: bool = False
 
     def set_cache(self, name: str) -> None:
-        self.session = requests_cache.CachedSession(name)
+        self.session = get_session(name)
         self._uses_cache = True
 
     def external_search(
@@ -48,7 +48,8 @@ class ClinicalTrialsWrapper(BaseWrapper):
         if expand:
             logger.info(f"Expanding search term: {text} to create ctgov query")
             model = self.extractor.model
-            response = model.prompt(
+            response = cached_prompt(
+                model,
                 text,
                 system=(
                     "generate a MINIMAL semi-colon separated list of the most relevant terms. "
@@ -73,8 +74,7 @@ class ClinicalTrialsWrapper(BaseWrapper):
         }
         # Note: we don't cache this call as there could be many
         # different search terms
-        response = requests.get(STUDY_URL, params=params)
-        time.sleep(RATE_LIMIT_DELAY)
+        response = get_session().get(STUDY_URL, params=params)
         data = response.json()
         return self.objects_from_list(data["studies"])
 
@@ -1,15 +1,17 @@
 """Chat with a KB."""
 
+import io
 import logging
+import tempfile
 from copy import deepcopy
 from csv import DictReader
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import lru_cache
-from typing import ClassVar, Dict, Iterable, Iterator, Optional, TextIO
+from typing import ClassVar, Dict, Iterable, Iterator, List, Optional, TextIO
 
-import requests
 from oaklib import BasicOntologyInterface, get_adapter
 
+from curategpt.utils.http_client import get_session
 from curategpt.wrappers import BaseWrapper
 from curategpt.wrappers.literature import PubmedWrapper
 
@@ -48,6 +50,15 @@ def term_label(identifier: str) -> str:
     return hpo_ont_adapter().label(identifier)
 
 
+def term_labels(identifiers: Iterable[str]) -> Dict[str, str]:
+    """Look up the labels of many HPO terms in one query."""
+    return dict(hpo_ont_adapter().labels(list(identifiers)))
+
+
+def references(row: Dict) -> List[str]:
+    return [ref for ref in row["reference"].split(";") if ref != "PMID:UNKNOWN"]
+
+
 @dataclass
 class HPOAWrapper(BaseWrapper):
     """
@@ -69,6 +80,15 @@ class HPOAWrapper(BaseWrapper):
 
     group_by_publication: bool = False
 
+    prefetch: bool = True
+    """Read a file twice: first to fetch all its publications and labels in bulk, then to join"""
+
+    workers: int = 3
+    """Number of concurrent PubMed requests when prefetching"""
+
+    _publications: Dict[str, Optional[Dict]] = field(default_factory=dict, repr=False)
+    _labels: Dict[str, str] = field(default_factory=dict, repr=False)
+
     def __post_init__(self):
         from curategpt.wrappers.literature import PubmedWrapper
 
@@ -82,22 +102,73 @@ class HPOAWrapper(BaseWrapper):
         if url is None:
             url = self.source_url
         logger.info(f"Fetching {url}")
-        with requests.get(url, stream=True) as response:
-            response.raise_for_status()  # Raise an error for failed requests
-            reader = DictReader(stream_filtered_lines(response), delimiter="\t")
-            yield from self.objects_from_rows(reader)
+        if not self.prefetch:
+            with get_session().get(url, stream=True) as response:
+                response.raise_for_status()  # Raise an error for failed requests
+                reader = DictReader(stream_filtered_lines(response), delimiter="\t")
+                yield from self.objects_from_rows(reader)
+            return
+        # download to a temporary file, so that it can be read twice
+        with tempfile.TemporaryFile() as tmp:
+            with get_session().get(url, stream=True) as response:
+                response.raise_for_status()
+                for data in response.iter_content(chunk_size=1 << 20):
+                    tmp.write(data)
+            tmp.seek(0)
+            yield from self.objects_from_file(io.TextIOWrapper(tmp, encoding="utf-8"))
+
+    def prefetch_rows(self, rows: Iterable[Dict]):
+        """
+        Fetch the publications and phenotype labels of all rows in bulk.
+
+        Subsequent calls to :meth:`objects_from_rows` look these up in memory,
+        rather than making one request per row.
+
+        :param rows: rows of an HPOA file
+        """
+        pmids = set()
+        phenotypes = set()
+        for row in rows:
+            phenotypes.add(row["hpo_id"])
+            if self.expand_publications:
+                pmids.update(ref for ref in references(row) if ref.startswith("PMID"))
+        phenotypes.difference_update(self._labels)
+        pmids.difference_update(self._publications)
+        logger.info(f"Prefetching {len(phenotypes)} labels and {len(pmids)} publications")
+        if phenotypes:
+            self._labels.update(term_labels(phenotypes))
+        if pmids:
+            for pub in self.pubmed_wrapper.objects_by_ids_in_batches(pmids, workers=self.workers):
+                self._publications[pub["id"]] = pub
+            # do not look up ids that PubMed did not return again
+            for pmid in pmids:
+                self._publications.setdefault(pmid, None)
+
+    def _label(self, identifier: str) -> str:
+        if identifier in self._labels:
+            return self._labels[identifier]
+        return term_label(identifier)
+
+    def _publications_by_ids(self, pmids: List[str]) -> List[Dict]:
+        missing = [pmid for pmid in pmids if pmid not in self._publications]
+        if missing:
+            for pub in self.pubmed_wrapper.objects_by_ids(missing):
+                self._publications[pub["id"]] = pub
+            for pmid in missing:
+                self._publications.setdefault(pmid, None)
+        return [self._publications[pmid] for pmid in pmids if self._publications[pmid]]
 
     def objects_from_rows(self, rows: Iterable[Dict]) -> Iterator[Dict]:
         by_pub = {}
         for row in rows:
             row = {MAP.get(k, k): v for k, v in row.items()}
-            row["phenotype_label"] = term_label(row["phenotype"])
-            refs = [ref for ref in row["reference"].split(";") if ref != "PMID:UNKNOWN"]
+            row["phenotype_label"] = self._label(row["phenotype"])
+            refs = references(row)
             if self.expand_publications:
                 pmids = [ref for ref in refs if ref.startswith("PMID")]
                 logger.debug(f"Expanding {refs}, pmids={pmids}")
                 if pmids:
-                    pubs = self.pubmed_wrapper.objects_by_ids(pmids)
+                    pubs = self._publications_by_ids(pmids)
                     row["publications"] = pubs
                     for pub in row["publications"]:
                         pub_id = pub["id"]
@@ -115,5 +186,8 @@ class HPOAWrapper(BaseWrapper):
                 yield pub
 
     def objects_from_file(self, file: TextIO) -> Iterator[Dict]:
+        if self.prefetch and file.seekable():
+            self.prefetch_rows(DictReader(filter(filter_header, file), delimiter="\t"))
+            file.seek(0)
         rows = DictReader(filter(filter_header, file), delimiter="\t")
         yield from self.objects_from_rows(rows)
@@ -7,9 +7,9 @@ from dataclasses import dataclass
 from functools import lru_cache
 from typing import ClassVar, Dict, Iterable, Iterator, Optional, TextIO
 
-import requests
 from oaklib import BasicOntologyInterface, get_adapter
 
+from curategpt.utils.http_client import get_session
 from curategpt.wrappers import BaseWrapper
 from curategpt.wrappers.literature.pubmed_wrapper import PubmedWrapper
 
@@ -100,7 +100,7 @@ class MAXOAWrapper(BaseWrapper):
             source_locator = self.source_url
         if source_locator.startswith("http"):
             logger.info(f"Fetching {source_locator}")
-            with requests.get(source_locator, stream=True) as response:
+            with get_session().get(source_locator, stream=True) as response:
                 response.raise_for_status()  # Raise an error for failed requests
                 reader = DictReader(stream_filtered_lines(response), delimiter="\t")
                 yield from self.objects_from_rows(reader)
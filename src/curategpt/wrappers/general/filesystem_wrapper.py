@@ -3,21 +3,109 @@
 import glob
 import logging
 import os
-from dataclasses import dataclass
+import sqlite3
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import ClassVar, Dict, Iterable, Iterator, Optional
+from typing import ClassVar, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from curategpt.utils.concurrency import map_ordered
 from curategpt.wrappers.base_wrapper import BaseWrapper
 
 logger = logging.getLogger(__name__)
 
+EXTRACTION_CACHE_ENV_VAR = "CURATEGPT_EXTRACTION_CACHE"
+"""Environment variable with the default extraction cache of filesystem wrappers"""
+
+PLAIN_TEXT_EXTENSIONS = ["py", "md"]
+
+
+def is_plain_text(file: str) -> bool:
+    return file.split(".")[-1] in PLAIN_TEXT_EXTENSIONS
+
+
+def extract_text(file: str) -> str:
+    """
+    Extract the text of a file, using textract unless it is plain text.
+
+    :param file:
+    :return:
+    """
+    if is_plain_text(file):
+        with open(file) as f:
+            return f.read()
+    import textract
+
+    return textract.process(file).decode("utf-8")
+
+
+@dataclass
+class ExtractionCache:
+    """
+    SQLite cache of the text extracted from files.
+
+    Texts are keyed by path, size and modification time, so a file is extracted
+    again only if it changed. Only the latest text of each path is kept.
+    """
+
+    path: str = ":memory:"
+    """SQLite file; ``:memory:`` keeps texts for the lifetime of the cache only"""
+
+    _conn: Optional[sqlite3.Connection] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS texts "
+            "(path TEXT PRIMARY KEY, size INTEGER, mtime REAL, text TEXT)"
+        )
+        self._conn.commit()
+
+    def get(self, path: str, size: int, mtime: float) -> Optional[str]:
+        """
+        Get the text of a file, if it has not changed since it was cached.
+
+        :param path:
+        :param size:
+        :param mtime:
+        :return: text, or None
+        """
+        row = self._conn.execute(
+            "SELECT text FROM texts WHERE path = ? AND size = ? AND mtime = ?",
+            [path, size, mtime],
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, path: str, size: int, mtime: float, text: str):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO texts VALUES (?, ?, ?, ?)", [path, size, mtime, text]
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
 
 @dataclass
 class FilesystemWrapper(BaseWrapper):
     """
     A wrapper over a filesystem.
 
-    This is a static wrapper: it cannot be searched
+    This is a static wrapper: it cannot be searched.
+
+    Text is extracted with textract, in ``max_workers`` processes. Extracted texts can
+    be cached in an ``extraction_cache`` file, so that unchanged files are not
+    extracted again, e.g.
+
+    .. code-block:: bash
+
+        curategpt view index -V filesystem \
+          --view-settings "{root_directory: docs, max_workers: 8, extraction_cache: docs.sqlite}"
+
+    The cache keeps a copy of the text of every file, so it is off unless it is set,
+    or the ``CURATEGPT_EXTRACTION_CACHE`` environment variable is. Plain text files are
+    read directly and not cached.
     """
 
     name: ClassVar[str] = "filesystem"
@@ -26,8 +114,13 @@ class FilesystemWrapper(BaseWrapper):
 
     skip_unprocessable = True
 
-    max_text_length = 3000
-    text_overlap = 200
+    max_workers: int = 1
+    """Number of processes extracting text; 1 extracts in the calling process"""
+
+    extraction_cache: Optional[str] = field(
+        default_factory=lambda: os.environ.get(EXTRACTION_CACHE_ENV_VAR)
+    )
+    """SQLite file caching extracted texts; None to always extract"""
 
     search_limit_multiplier: ClassVar[int] = 1
 
@@ -42,30 +135,48 @@ class FilesystemWrapper(BaseWrapper):
             for dirpath, _dirnames, filenames in os.walk(path):
                 for filename in filenames:
                     files.append(os.path.join(dirpath, filename))
-        import textract
-
-        for file in set(files):
-            try:
-                # Extract text from the file
-                ex = file.split(".")[-1]
-                if ex in ["py", "md"]:
-                    text_utf8 = open(file).read()
-                else:
-                    text = textract.process(file)
-                    text_utf8 = text.decode("utf-8")
-                path = Path(file)
-                stat = path.lstat()
-                obj = {
-                    "id": file,
-                    "name": path.name,
-                    "text": text_utf8,
-                    "parent": str(path.parent),
-                    "size": stat.st_size,
-                    "mtime": stat.st_mtime,
-                }
-                yield from self.split_objects([obj])
-            except Exception as e:
-                if self.skip_unprocessable:
-                    logger.warning(f"Failed to extract text from {file}. Reason: {e}")
+        cache = ExtractionCache(self.extraction_cache) if self.extraction_cache else None
+        try:
+            # files whose text is cached are yielded first, then the others as they are extracted
+            to_extract: List[Tuple[str, os.stat_result]] = []
+            for file in sorted(set(files)):
+                stat = Path(file).lstat()
+                key = os.path.abspath(file)
+                cached = cache and not is_plain_text(file)
+                text = cache.get(key, stat.st_size, stat.st_mtime) if cached else None
+                if text is None:
+                    to_extract.append((file, stat))
                 else:
-                    raise e
+                    yield from self._file_objects(file, stat, text)
+            logger.info(f"Extracting text from {len(to_extract)} of {len(set(files))} files")
+            tasks = map_ordered(
+                extract_text,
+                [file for file, _ in to_extract],
+                workers=self.max_workers,
+                processes=True,
+            )
+            for task in tasks:
+                file, stat = to_extract[task.index]
+                if not task.ok:
+                    if self.skip_unprocessable:
+                        logger.warning(f"Failed to extract text from {file}. Reason: {task.error}")
+                        continue
+                    raise task.error
+                if cache and not is_plain_text(file):
+                    cache.put(os.path.abspath(file), stat.st_size, stat.st_mtime, task.result)
+                yield from self._file_objects(file, stat, task.result)
+        finally:
+            if cache:
+                cache.close()
+
+    def _file_objects(self, file: str, stat: os.stat_result, text: str) -> Iterator[Dict]:
+        path = Path(file)
+        obj = {
+            "id": file,
+            "name": path.name,
+            "text": text,
+            "parent": str(path.parent),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+        }
+        yield from self.split_objects([obj])
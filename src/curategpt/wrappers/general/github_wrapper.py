@@ -2,18 +2,29 @@
 
 import logging
 import os
+import time
 from dataclasses import dataclass
-from time import sleep
 from typing import ClassVar, Dict, Iterable, Iterator, List, Optional
 
 import requests
-import requests_cache
 from pydantic import BaseModel, ConfigDict
+from requests_cache import CachedSession
 
+from curategpt.utils.concurrency import map_ordered
+from curategpt.utils.http_client import get_session, set_rate_limit
+from curategpt.utils.llm_cache import cached_prompt
 from curategpt.wrappers.base_wrapper import BaseWrapper
 
 logger = logging.getLogger(__name__)
 
+GITHUB_HOST = "api.github.com"
+
+GITHUB_REQUESTS_PER_SECOND = 10
+"""Within GitHub's secondary limits, for clients with a token"""
+
+GITHUB_UNAUTHENTICATED_REQUESTS_PER_SECOND = 1 / 60
+"""GitHub's quota for clients without a token is 60 requests per hour"""
+
 
 class Comment(BaseModel):
     model_config = ConfigDict(protected_namespaces=())
@@ -32,6 +43,7 @@ class PullRequest(BaseModel):
     state: str = None
     assignees: List[str] = None
     created_at: str = None
+    updated_at: str = None
     body: str = None
     comments: List[Comment] = None
 
@@ -47,6 +59,7 @@ class Issue(BaseModel):
     state: str = None
     assignees: List[str] = None
     created_at: str = None
+    updated_at: str = None
     body: str = None
     # pull_request: str = None
     comments: List[Comment] = None
@@ -64,6 +77,19 @@ def pr_comments(self, pr_number: str) -> Iterator[Dict]:
         url = response.links.get("next", {}).get("url")
 
 
+def _retry_wait(response: requests.Response) -> Optional[float]:
+    """Seconds to wait before retrying a request refused by a rate limit, if it was."""
+    if response.status_code not in (403, 429):
+        return None
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        return float(retry_after)
+    reset = response.headers.get("X-RateLimit-Reset")
+    if response.headers.get("X-RateLimit-Remaining") == "0" and reset:
+        return max(float(reset) - time.time(), 0) + 1
+    return None
+
+
 def get_token(token: str = None) -> Optional[str]:
     if token:
         return token
@@ -81,12 +107,20 @@ class GitHubWrapper(BaseWrapper):
 
     This is a dynamic wrapper: it can be used as a search facade,
     but cannot be ingested in whole.
+
+    Issues can be synced incrementally: with ``since``, only issues updated since then
+    are fetched, and ``synced_until`` is set to the latest update of a fetched issue.
+    Cached responses are revalidated with conditional requests, which do not count
+    towards GitHub's quota if nothing changed.
     """
 
     name: ClassVar[str] = "github"
 
     cache_name: ClassVar[str] = "github_requests"
 
+    # lowered in __post_init__ if there is no token
+    rate_limits: ClassVar[Dict[str, float]] = {GITHUB_HOST: GITHUB_REQUESTS_PER_SECOND}
+
     default_object_type = "Issue"
 
     session: requests.Session = None
@@ -94,10 +128,29 @@ class GitHubWrapper(BaseWrapper):
     owner: str = None
     repo: str = None
 
+    since: Optional[str] = None
+    """Only fetch issues updated at or after this ISO 8601 time"""
+
+    synced_until: Optional[str] = None
+    """Latest update time of the fetched issues, from which a later sync can start"""
+
+    max_workers: int = 4
+    """Number of issues whose comments are fetched concurrently"""
+
+    rate_limit_reserve: int = 10
+    """Pause until the quota resets when fewer requests than this are left"""
+
+    rate_limit_retries: int = 3
+    """Number of times a request refused by a rate limit is retried after waiting"""
+
     _repo_description: str = None
 
     def __post_init__(self):
-        self.session = requests_cache.CachedSession(self.cache_name)
+        self.session = get_session(self.cache_name)
+        if get_token():
+            set_rate_limit(GITHUB_HOST, GITHUB_REQUESTS_PER_SECOND)
+        else:
+            set_rate_limit(GITHUB_HOST, GITHUB_UNAUTHENTICATED_REQUESTS_PER_SECOND)
         if self.repo and "/" in self.repo:
             if self.owner:
                 raise ValueError("Cannot specify both owner and a slash in repo")
@@ -120,7 +173,7 @@ class GitHubWrapper(BaseWrapper):
     def repo_description(self) -> str:
         if not self._repo_description:
             url = f"https://api.github.com/repos/{self.owner}/{self.repo}"
-            response = requests.get(url, headers=self.headers)
+            response = get_session().get(url, headers=self.headers)
             response.raise_for_status()
             repo_data = response.json()
             self._repo_description = repo_data.get("description")
@@ -144,7 +197,8 @@ class GitHubWrapper(BaseWrapper):
                 f"The description of the repo is: {self.repo_description}.\n"
                 f"\n---\nHere is the text:\n{text}"
             )
-            response = model.prompt(
+            response = cached_prompt(
+                model,
                 q,
                 system="You are an agent to expand query terms to search github. ALWAYS SEPARATE WITH SEMI-COLONS",
             )
@@ -158,7 +212,7 @@ class GitHubWrapper(BaseWrapper):
         headers = self.headers
         del headers["Authorization"]
 
-        response = requests.get(url, headers=headers)
+        response = get_session().get(url, headers=headers)
         if response.status_code != 200:
             response.raise_for_status()
         all_issues = []
@@ -184,30 +238,68 @@ class GitHubWrapper(BaseWrapper):
         headers = {"Authorization": f"token {token}", "Accept": "application/vnd.github.v3+json"}
         if not token:
             del headers["Authorization"]
-            sleep(5)
         logger.debug(f"Header: {headers}")
         params = {
             "state": "all",  # To fetch both open and closed issues and PRs
             "per_page": 100,  # Fetch 100 results per page (max allowed)
         }
+        if self.since:
+            params["since"] = self.since
+            logger.info(f"Fetching issues updated since {self.since}")
 
         while url:
-            response = session.get(url, headers=headers, params=params)
-            response.raise_for_status()
+            response = self._get(session, url, headers=headers, params=params)
+            # the next page url includes the params
+            params = None
             issues = response.json()
-            for issue in issues:
-                issue_number = issue.get("number")
-                # Fetch both issue comments and PR comments
-                if "pull_request" in issue:
-                    issue["comments"] = list(self.pr_comments(issue_number))
-                else:
-                    issue["comments"] = list(self.issue_comments(issue_number))
-                issue_obj = self.transform_issue(issue)
+            for task in map_ordered(self._with_comments, issues, workers=self.max_workers):
+                if not task.ok:
+                    raise task.error
+                issue_obj = self.transform_issue(task.result)
+                if issue_obj.updated_at and (
+                    not self.synced_until or issue_obj.updated_at > self.synced_until
+                ):
+                    self.synced_until = issue_obj.updated_at
                 yield issue_obj.dict()
                 # Check if there are more pages to process
             url = response.links.get("next", {}).get("url")
-            if not response.from_cache:
-                sleep(0.2)
+
+    def _with_comments(self, issue: Dict) -> Dict:
+        issue_number = issue.get("number")
+        # Fetch both issue comments and PR comments
+        if "pull_request" in issue:
+            issue["comments"] = list(self.pr_comments(issue_number))
+        else:
+            issue["comments"] = list(self.issue_comments(issue_number))
+        return issue
+
+    def _get(
+        self, session: requests.Session, url: str, headers: Dict, params: Optional[Dict] = None
+    ) -> requests.Response:
+        """
+        Get a page from the GitHub API, revalidating any cached copy.
+
+        If the quota is nearly used up, this waits until it resets, as reported by the
+        rate limit headers of the response. Requests refused by the quota or by a
+        secondary limit (403 or 429) are retried after the wait GitHub asks for.
+        """
+        kwargs = {"refresh": True} if isinstance(session, CachedSession) else {}
+        response = session.get(url, headers=headers, params=params, **kwargs)
+        for _ in range(self.rate_limit_retries):
+            wait = _retry_wait(response)
+            if wait is None:
+                break
+            logger.warning(f"GitHub rate limit exceeded; retrying in {wait:.0f}s")
+            time.sleep(wait)
+            response = session.get(url, headers=headers, params=params, **kwargs)
+        response.raise_for_status()
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining and reset and int(remaining) < self.rate_limit_reserve:
+            wait = max(float(reset) - time.time(), 0) + 1
+            logger.warning(f"{remaining} GitHub requests left; waiting {wait:.0f}s for reset")
+            time.sleep(wait)
+        return response
 
     def issue_comments(self, issue_number: str) -> Iterator[Dict]:
         session = self.session
@@ -217,8 +309,8 @@ class GitHubWrapper(BaseWrapper):
         params = {"per_page": 100}
 
         while url:
-            response = session.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
+            response = self._get(session, url, headers=self.headers, params=params)
+            params = None
             yield from response.json()
             url = response.links.get("next", {}).get("url")
 
@@ -236,6 +328,7 @@ class GitHubWrapper(BaseWrapper):
             state=obj.get("state"),
             assignees=[assignee.get("login") for assignee in obj.get("assignees")],
             created_at=obj.get("created_at"),
+            updated_at=obj.get("updated_at"),
             type="pull_request" if obj.get("pull_request") else "issue",
             body=obj.get("body"),
             # pull_request=pr.get("url") if pr else None,
@@ -256,7 +349,7 @@ class GitHubWrapper(BaseWrapper):
         params = {"per_page": 100}
 
         while url:
-            response = session.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
+            response = self._get(session, url, headers=self.headers, params=params)
+            params = None
             yield from response.json()
             url = response.links.get("next", {}).get("url")
@@ -102,7 +102,7 @@ class GoogleDriveWrapper(BaseWrapper):
                     "mime_type": file.get("mimeType", None),
                 }
             )
-        return self.split_objects(objs)
+        return list(self.split_objects(objs))
 
     def objects_by_ids(self, object_ids: List[str]) -> List[Dict]:
         files = [{"id: object_id"} for object_id in object_ids]
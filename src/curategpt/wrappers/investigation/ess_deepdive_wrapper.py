@@ -2,17 +2,17 @@
 
 import logging
 from dataclasses import dataclass, field
-from time import sleep
 from typing import ClassVar, Dict, Iterable, Iterator, Optional
 
-import requests_cache
+import requests
 
+from curategpt.utils.http_client import get_session
 from curategpt.wrappers import BaseWrapper
 
 URL = "https://fusion.ess-dive.lbl.gov/deepdive?rowStart={cursor}&pageSize={limit}"
 
 
-def _get_records_chunk(session: requests_cache.CachedSession, cursor=1, limit=200) -> dict:
+def _get_records_chunk(session: requests.Session, cursor=1, limit=200) -> dict:
     """
     Get a chunk of records from ESSDeepDive.
 
@@ -28,7 +28,7 @@ def _get_records_chunk(session: requests_cache.CachedSession, cursor=1, limit=20
 
 
 def get_records(
-    session: requests_cache.CachedSession, cursor=1, limit=200, maximum: int = None
+    session: requests.Session, cursor=1, limit=200, maximum: int = None
 ) -> Iterator[dict]:
     """
     Iterate through all records in ESSDeepDive and download them.
@@ -47,7 +47,6 @@ def get_records(
         logger.warning(f"Got {pc} pages")
         if not pc:
             break
-        sleep(0.1)
 
 
 logger = logging.getLogger(__name__)
@@ -61,11 +60,11 @@ class ESSDeepDiveWrapper(BaseWrapper):
 
     name: ClassVar[str] = "ess_deepdive"
 
+    rate_limits: ClassVar[Dict[str, float]] = {"fusion.ess-dive.lbl.gov": 10}
+
     default_object_type = "Class"
 
-    session: requests_cache.CachedSession = field(
-        default_factory=lambda: requests_cache.CachedSession("ess_deepdive")
-    )
+    session: requests.Session = field(default_factory=lambda: get_session("ess_deepdive"))
 
     limit: int = field(default=50)
 
@@ -7,8 +7,8 @@ from dataclasses import dataclass, field
 from typing import ClassVar, Dict, Iterable, Iterator, Optional
 
 import requests
-import requests_cache
 
+from curategpt.utils.http_client import get_session
 from curategpt.wrappers import BaseWrapper
 
 URL = "https://api.fairsharing.org"
@@ -32,9 +32,7 @@ class FAIRSharingWrapper(BaseWrapper):
 
     default_object_type = "Metadata"
 
-    session: requests_cache.CachedSession = field(
-        default_factory=lambda: requests_cache.CachedSession("fairsharing")
-    )
+    session: requests.Session = field(default_factory=lambda: get_session("fairsharing"))
 
     user: str = field(default=os.getenv("FAIRSHARING_USER"))
 
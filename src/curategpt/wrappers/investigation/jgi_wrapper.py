@@ -1,12 +1,11 @@
 """Chat with a KB."""
 
 import logging
-import time
 from dataclasses import dataclass
 from typing import ClassVar, Dict, List, Optional
 
-import requests
-
+from curategpt.utils.http_client import get_session
+from curategpt.utils.llm_cache import cached_prompt
 from curategpt.wrappers.base_wrapper import BaseWrapper
 
 logger = logging.getLogger(__name__)
@@ -25,6 +24,8 @@ class JGIWrapper(BaseWrapper):
 
     name: ClassVar[str] = "jgi"
 
+    rate_limits: ClassVar[Dict[str, float]] = {"files.jgi.doe.gov": 2}
+
     def external_search(
         self, text: str, expand: bool = False, where: Optional[Dict] = None, **kwargs
     ) -> List:
@@ -41,7 +42,8 @@ class JGIWrapper(BaseWrapper):
 
             logger.info(f"Expanding search term: {text} to create JGI query")
             model = self.extractor.model
-            response = model.prompt(
+            response = cached_prompt(
+                model,
                 text,
                 system="""
                 Take the specified search text, and expand it to a list
@@ -59,9 +61,8 @@ class JGIWrapper(BaseWrapper):
         params["q"] = search_term
         if where:
             params.update(where)
-        time.sleep(0.5)
         logger.info(f"Constructed query: {params}")
-        response = requests.get(BASE_URL, params=params)
+        response = get_session().get(BASE_URL, params=params)
         data = response.json()
 
         organisms = data["organisms"]
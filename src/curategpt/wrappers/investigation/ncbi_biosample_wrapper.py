@@ -2,7 +2,7 @@
 
 import logging
 from dataclasses import dataclass
-from typing import ClassVar, Dict, List
+from typing import ClassVar, Dict, List, Optional
 
 from curategpt.wrappers.literature.eutils_wrapper import EUtilsWrapper
 
@@ -26,24 +26,30 @@ class NCBIBiosampleWrapper(EUtilsWrapper):
 
     default_object_type = "Sample"
 
+    record_tag: ClassVar[str] = "BioSample"
+
     def objects_from_dict(self, results: Dict) -> List[Dict]:
         samples = []
         for s in results["BioSampleSet"]["BioSample"]:
-            d = s["Description"]
-            sample = {}
-            sample["id"] = f"biosample:{s['@accession']}"
-            sample["title"] = d["Title"]
-            sample["organism"] = d["Organism"]["@taxonomy_name"]
-            sample["package"] = s["Package"]["@display_name"]
-            if not s["Attributes"]:
-                logger.warning(f"Skipping sample with no attributes: {s}")
-                continue
-            for a in s["Attributes"]["Attribute"]:
-                if isinstance(a, str):
-                    logger.warning(f"Skipping attribute: {a} in {s['Attributes']}")
-                    continue
-                a_name = a.get("@harmonized_name", a.get("@attribute_name"))
-                sample[a_name] = a["#text"]
-            samples.append(sample)
-
+            sample = self.object_from_record(s)
+            if sample:
+                samples.append(sample)
         return samples
+
+    def object_from_record(self, s: Dict) -> Optional[Dict]:
+        d = s["Description"]
+        sample = {}
+        sample["id"] = f"biosample:{s['@accession']}"
+        sample["title"] = d["Title"]
+        sample["organism"] = d["Organism"]["@taxonomy_name"]
+        sample["package"] = s["Package"]["@display_name"]
+        if not s["Attributes"]:
+            logger.warning(f"Skipping sample with no attributes: {s}")
+            return None
+        for a in s["Attributes"]["Attribute"]:
+            if isinstance(a, str):
+                logger.warning(f"Skipping attribute: {a} in {s['Attributes']}")
+                continue
+            a_name = a.get("@harmonized_name", a.get("@attribute_name"))
+            sample[a_name] = a["#text"]
+        return sample
@@ -4,9 +4,9 @@ import logging
 from dataclasses import dataclass
 from typing import ClassVar, Dict, Iterable, Iterator, Optional
 
-import requests
 from oaklib import BasicOntologyInterface, get_adapter
 
+from curategpt.utils.http_client import get_session
 from curategpt.wrappers import BaseWrapper
 
 URL = "https://api.microbiomedata.org/biosamples?per_page={limit}&page={cursor}"
@@ -20,7 +20,7 @@ def _get_samples_chunk(cursor=1, limit=200) -> dict:
     :return:
     """
     url = URL.format(limit=limit, cursor=cursor)
-    response = requests.get(url)
+    response = get_session().get(url)
     if response.status_code == 200:
         return response.json()
     else:
@@ -4,11 +4,10 @@ import logging
 from dataclasses import dataclass
 from typing import ClassVar, Dict, Iterable, Iterator, Optional
 
-import requests
-import requests_cache
 from bs4 import BeautifulSoup
 from oaklib import BasicOntologyInterface
 
+from curategpt.utils.http_client import get_session
 from curategpt.wrappers import BaseWrapper
 
 logger = logging.getLogger(__name__)
@@ -40,10 +39,10 @@ class ReusableDataWrapper(BaseWrapper):
     def objects(
         self, collection: str = None, object_ids: Optional[Iterable[str]] = None, **kwargs
     ) -> Iterator[Dict]:
-        session = requests_cache.CachedSession("reusabledata")
+        session = get_session("reusabledata")
 
         path = self.source_locator or "https://reusabledata.org/data.json"
-        objs = requests.get(path).json()
+        objs = get_session().get(path).json()
         for obj in objs:
             obj_id = obj["id"]
             license_link = obj.get("license-link", None)
@@ -1,16 +1,17 @@
 """Chat with a KB."""
 
 import logging
-import time
 from abc import ABC
 from dataclasses import dataclass, field
-from typing import ClassVar, Dict, List
+from typing import ClassVar, Dict, List, Optional
 
 import requests
-import requests_cache
 import xmltodict
 from eutils import Client
 
+from curategpt.utils.http_client import get_session
+from curategpt.utils.llm_cache import cached_prompt
+from curategpt.utils.xml_utils import element_to_dict, iter_elements
 from curategpt.wrappers import BaseWrapper
 
 logger = logging.getLogger(__name__)
@@ -18,6 +19,13 @@ logger = logging.getLogger(__name__)
 ESEARCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
 EFETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/{tool}.fcgi"
 
+NCBI_HOST = "eutils.ncbi.nlm.nih.gov"
+NCBI_REQUESTS_PER_SECOND = 3
+"""NCBI limit for clients without an API key"""
+
+NCBI_REQUESTS_PER_SECOND_WITH_KEY = 10
+"""NCBI limit for clients that send an API key"""
+
 
 @dataclass
 class EUtilsWrapper(BaseWrapper, ABC):
@@ -36,14 +44,19 @@ class EUtilsWrapper(BaseWrapper, ABC):
 
     fetch_tool: ClassVar[str] = "efetch"
 
+    record_tag: ClassVar[Optional[str]] = None
+    """Tag of the records in fetched XML; if set, records are parsed one at a time"""
+
+    rate_limits: ClassVar[Dict[str, float]] = {NCBI_HOST: NCBI_REQUESTS_PER_SECOND}
+
     eutils_client: Client = None
 
-    session: requests.Session = field(default_factory=lambda: requests.Session())
+    session: requests.Session = field(default_factory=get_session)
 
     _uses_cache: bool = False
 
     def set_cache(self, name: str) -> None:
-        self.session = requests_cache.CachedSession(name)
+        self.session = get_session(name)
         self._uses_cache = True
 
     def external_search(self, text: str, expand: bool = True, **kwargs) -> List[Dict]:
@@ -51,8 +64,10 @@ class EUtilsWrapper(BaseWrapper, ABC):
         if expand:
             logger.info(f"Expanding search term: {text} to create {db} query")
             model = self.extractor.model
-            response = model.prompt(
-                text, system="generate a semi-colon separated list of the most relevant terms"
+            response = cached_prompt(
+                model,
+                text,
+                system="generate a semi-colon separated list of the most relevant terms",
             )
             terms = response.text().split(";")
             search_term = " OR ".join(terms)
@@ -68,8 +83,7 @@ class EUtilsWrapper(BaseWrapper, ABC):
             "retmode": "json",
         }
 
-        time.sleep(0.5)
-        response = requests.get(ESEARCH_URL, params=params)
+        response = get_session().get(ESEARCH_URL, params=params)
         data = response.json()
 
         # Extract IDs from the response
@@ -99,8 +113,6 @@ class EUtilsWrapper(BaseWrapper, ABC):
             "id": ",".join(object_ids),  # Combine  IDs into a comma-separated string
             "retmode": "xml",
         }
-        # if not self._uses_cache:
-        time.sleep(0.25)
         tool = self.fetch_tool
         efetch_response = session.get(EFETCH_URL.format(tool=tool), params=efetch_params)
         if not efetch_response.ok:
@@ -108,8 +120,23 @@ class EUtilsWrapper(BaseWrapper, ABC):
             raise ValueError(
                 f"Failed to fetch data for {object_ids} using {session} and {efetch_params}"
             )
+        if self.record_tag:
+            records = iter_elements(efetch_response.content, self.record_tag)
+            objs = (self.object_from_record(element_to_dict(r)) for r in records)
+            return [obj for obj in objs if obj is not None]
         results = xmltodict.parse(efetch_response.text)
         return self.objects_from_dict(results)
 
     def objects_from_dict(self, results: Dict) -> List[Dict]:
         raise NotImplementedError
+
+    def object_from_record(self, record: Dict) -> Optional[Dict]:
+        """
+        Convert one record, as parsed by xmltodict, to an object.
+
+        Used instead of :meth:`objects_from_dict` if ``record_tag`` is set.
+
+        :param record:
+        :return: object, or None to skip the record
+        """
+        raise NotImplementedError
@@ -2,40 +2,41 @@
 
 import logging
 import tarfile
-import tempfile
-import time
 from dataclasses import dataclass, field
-from typing import ClassVar, Dict, List, Optional
+from typing import ClassVar, Dict, Iterable, Iterator, List, Optional
 from urllib.parse import urlparse
-from urllib.request import urlretrieve
+from urllib.request import urlopen
 
 import requests
-import requests_cache
-from bs4 import BeautifulSoup
 from defusedxml.ElementTree import fromstring
 from eutils import Client
 
+from curategpt.utils.concurrency import map_ordered
+from curategpt.utils.http_client import get_session, set_rate_limit
+from curategpt.utils.iterators import chunk
+from curategpt.utils.llm_cache import cached_prompt
+from curategpt.utils.xml_utils import element_text, iter_elements, xml_text
 from curategpt.wrappers import BaseWrapper
+from curategpt.wrappers.literature.eutils_wrapper import (
+    NCBI_HOST,
+    NCBI_REQUESTS_PER_SECOND,
+    NCBI_REQUESTS_PER_SECOND_WITH_KEY,
+)
 
 logger = logging.getLogger(__name__)
 
 ESEARCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
 EFETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
 
-RATE_LIMIT_DELAY = 1.0
+EFETCH_BATCH_SIZE = 200
 
 
 def extract_all_text(element):
-    text = element.text or ""
-    for subelement in element:
-        text += extract_all_text(subelement)
-        text += subelement.tail if subelement.tail else ""
-    return text
+    return element_text(element)
 
 
 def extract_text_from_xml(xml_content):
-    root = fromstring(xml_content)
-    return extract_all_text(root).strip()
+    return xml_text(xml_content).strip()
 
 
 # TODO: rewrite to subclass EUtilsWrapper
@@ -67,22 +68,37 @@ class PubmedWrapper(BaseWrapper):
 
     name: ClassVar[str] = "pubmed"
 
+    rate_limits: ClassVar[Dict[str, float]] = {NCBI_HOST: NCBI_REQUESTS_PER_SECOND}
+
     eutils_client: Client = None
 
-    session: requests.Session = field(default_factory=lambda: requests.Session())
+    session: requests.Session = field(default_factory=get_session)
 
     where: Optional[Dict] = None
 
     email: Optional[str] = None
 
     ncbi_key: Optional[str] = None
+    """NCBI API key; sent with every request, which raises the NCBI rate limit"""
 
     is_fetch_full_text: Optional[bool] = None
 
     _uses_cache: bool = None
 
+    def __post_init__(self):
+        if self.ncbi_key:
+            set_rate_limit(NCBI_HOST, NCBI_REQUESTS_PER_SECOND_WITH_KEY)
+
+    def _params(self, params: Dict) -> Dict:
+        """Add the API key, if there is one, to the parameters of an NCBI request."""
+        if self.ncbi_key:
+            params["api_key"] = self.ncbi_key
+            if self.email:
+                params["email"] = self.email
+        return params
+
     def set_cache(self, name: str) -> None:
-        self.session = requests_cache.CachedSession(name)
+        self.session = get_session(name)
         self._uses_cache = True
 
     def external_search(
@@ -91,7 +107,8 @@ class PubmedWrapper(BaseWrapper):
         if expand:
             logger.info(f"Expanding search term: {text} to create pubmed query")
             model = self.extractor.model
-            response = model.prompt(
+            response = cached_prompt(
+                model,
                 text,
                 system="""
                 Take the specified search text, and expand it to a list
@@ -120,8 +137,7 @@ class PubmedWrapper(BaseWrapper):
 
         # Note: we don't cache this call as there could be many
         # different search terms
-        response = requests.get(ESEARCH_URL, params=params)
-        time.sleep(RATE_LIMIT_DELAY)
+        response = get_session().get(ESEARCH_URL, params=self._params(params))
         if response.status_code != 200:
             logger.error(f"Failed to search for {text}; params: {params}")
             return []
@@ -144,7 +160,8 @@ class PubmedWrapper(BaseWrapper):
                 return []
 
         logger.info(f"Found {len(pubmed_ids)} results: {pubmed_ids}")
-        return self.objects_by_ids(pubmed_ids)
+        # full texts are split into chunks that fit the embedding model
+        return list(self.split_objects(self.objects_by_ids(pubmed_ids), text_field="full_text"))
 
     def objects_by_ids(self, object_ids: List[str]) -> List[Dict]:
         pubmed_ids = sorted([x.replace("PMID:", "") for x in object_ids])
@@ -158,11 +175,7 @@ class PubmedWrapper(BaseWrapper):
             "rettype": "medline",
             "retmode": "text",
         }
-        efetch_response = session.get(EFETCH_URL, params=efetch_params)
-        if not self._uses_cache or not efetch_response.from_cache:
-            # throttle if not using cache or if not cached
-            logger.debug(f"Sleeping for {RATE_LIMIT_DELAY} seconds")
-            time.sleep(RATE_LIMIT_DELAY)
+        efetch_response = session.get(EFETCH_URL, params=self._params(efetch_params))
         if not efetch_response.ok:
             logger.error(f"Failed to fetch data for {pubmed_ids}")
             raise ValueError(
@@ -205,12 +218,38 @@ class PubmedWrapper(BaseWrapper):
                     current_record = {}
         return parsed_data
 
+    def objects_by_ids_in_batches(
+        self,
+        object_ids: Iterable[str],
+        batch_size: int = EFETCH_BATCH_SIZE,
+        workers: int = 3,
+        retries: int = 2,
+    ) -> Iterator[Dict]:
+        """
+        Fetch many publications, with one efetch request per batch of ids.
+
+        Batches are fetched concurrently; the NCBI rate limit of the shared session
+        applies across all workers.
+
+        :param object_ids: PMIDs, with or without the ``PMID:`` prefix
+        :param batch_size: maximum number of ids per request
+        :param workers: number of concurrent requests
+        :param retries: number of retries for a failed batch
+        :return: iterator over publications
+        """
+        batches = [list(batch) for batch in chunk(sorted(set(object_ids)), batch_size)]
+        logger.info(f"Fetching publications in {len(batches)} batches of up to {batch_size}")
+        for task in map_ordered(self.objects_by_ids, batches, workers=workers, retries=retries):
+            if not task.ok:
+                raise task.error
+            yield from task.result
+
     def fetch_pmcid(self, pmid: str) -> Optional[str]:
         pmid = pmid.replace("PMID:", "")
         session = self.session
         params = {"db": "pmc", "linkname": "pubmed_pmc", "id": pmid}
         url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/elink.fcgi"
-        response = session.get(url, params=params)
+        response = session.get(url, params=self._params(params))
         root = fromstring(response.content)
 
         pmcid = None
@@ -244,24 +283,18 @@ class PubmedWrapper(BaseWrapper):
                 format_type = link.attrib.get("format")
                 download_url = link.attrib.get("href")
                 if format_type == "xml":
-                    xml_response = requests.get(download_url)
+                    xml_response = get_session().get(download_url)
                     return xml_response.text
                 elif format_type == "tgz":
-                    # make a named temp file
-                    local_file_path = tempfile.NamedTemporaryFile().name
                     parsed_url = urlparse(download_url)
                     if parsed_url.scheme not in ["http", "https", "ftp"]:
                         continue
-                    urlretrieve(download_url, local_file_path)  # noqa S310
-
-                    # Open and extract the tar.gz file
-                    with tarfile.open(local_file_path, "r:gz") as tar:
-                        for member in tar.getmembers():
-                            if member.name.endswith(".xml") or member.name.endswith(".nxml"):
-                                f = tar.extractfile(member)
-                                xml_str = f.read().decode("utf-8")
-                                return extract_text_from_xml(xml_str)
-                                # return xml_str
+                    # stream the archive, parsing the article without saving it
+                    with urlopen(download_url) as stream:  # noqa S310
+                        with tarfile.open(fileobj=stream, mode="r|gz") as tar:
+                            for member in tar:
+                                if member.name.endswith(".xml") or member.name.endswith(".nxml"):
+                                    return extract_text_from_xml(tar.extractfile(member))
         return None
 
     def pmc_full_text(self, object_id: str) -> Optional[str]:
@@ -271,12 +304,10 @@ class PubmedWrapper(BaseWrapper):
             pmcid = object_id
         fulltext = self.pmc_xml(pmcid)
         logger.debug(f"FULL TEXT XML: {fulltext}")
-        fullsoup = BeautifulSoup(fulltext, "xml")
-        if fullsoup.find("pmc-articleset").find("article").find("body"):
-            body = fullsoup.find("pmc-articleset").find("article").find("body").text
-            return body
-        else:
-            return None
+        # the first body to end is that of the article, not of a sub-article
+        for body in iter_elements(fulltext, "body"):
+            return element_text(body)
+        return None
 
     def pmc_xml(self, pmc_id: str) -> str:
         """Get the text of one PubMed Central entry.
@@ -296,15 +327,7 @@ class PubmedWrapper(BaseWrapper):
             "retmode": "xml",
         }
 
-        if self.email and self.ncbi_key:
-            params["api_key"] = self.ncbi_key
-            params["email"] = self.email
-
-        efetch_response = session.get(EFETCH_URL, params=params)
-        if not self._uses_cache or not efetch_response.from_cache:
-            # throttle if not using cache or if not cached
-            logger.debug(f"Sleeping for {RATE_LIMIT_DELAY} seconds")
-            time.sleep(RATE_LIMIT_DELAY)
+        efetch_response = session.get(EFETCH_URL, params=self._params(params))
         if not efetch_response.ok:
             logger.error(f"Failed to fetch data for {pmc_id}")
             raise ValueError(f"Failed to fetch data for {pmc_id} using {session} and {params}")
@@ -1,13 +1,12 @@
 """Chat with a KB."""
 
 import logging
-import time
 from dataclasses import dataclass
-from typing import ClassVar, List
+from typing import ClassVar, Dict, List
 
 import inflection
-import requests
 
+from curategpt.utils.http_client import get_session
 from curategpt.wrappers.base_wrapper import BaseWrapper
 
 logger = logging.getLogger(__name__)
@@ -26,6 +25,8 @@ class WikipediaWrapper(BaseWrapper):
 
     name: ClassVar[str] = "wikipedia"
 
+    rate_limits: ClassVar[Dict[str, float]] = {"en.wikipedia.org": 2}
+
     def external_search(self, text: str, expand: bool = False, **kwargs) -> List:
         # if expand:
         #    raise NotImplementedError
@@ -36,8 +37,8 @@ class WikipediaWrapper(BaseWrapper):
         # Parameters for the request
         params = {"action": "query", "format": "json", "list": "search", "srsearch": search_term}
 
-        time.sleep(0.5)
-        response = requests.get(BASE_URL, params=params)
+        session = get_session()
+        response = session.get(BASE_URL, params=params)
         data = response.json()
         search_results = data["query"]["search"]
         snippets = {result["title"]: result["snippet"] for result in search_results}
@@ -52,7 +53,7 @@ class WikipediaWrapper(BaseWrapper):
             "explaintext": True,  # Get plain text instead of HTML
         }
 
-        info_response = requests.get(BASE_URL, params=info_params)
+        info_response = session.get(BASE_URL, params=info_params)
         if not info_response.ok:
             raise ValueError(f"Could not get info for {titles}")
         info_data = info_response.json()
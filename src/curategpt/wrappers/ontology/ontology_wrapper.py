@@ -3,13 +3,26 @@
 import logging
 from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import Any, Callable, ClassVar, Dict, Iterable, Iterator, List, Mapping, Optional
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+)
 
 import oaklib.datamodels.obograph as og
 from oaklib import BasicOntologyInterface
 from oaklib.datamodels.obograph import GraphDocument
 from oaklib.datamodels.search import SearchConfiguration
 from oaklib.datamodels.vocabulary import IS_A
+from oaklib.implementations.sqldb.sql_implementation import SqlImplementation
 from oaklib.interfaces import OboGraphInterface, SearchInterface
 from oaklib.types import CURIE
 from oaklib.utilities.iterator_utils import chunk
@@ -21,6 +34,23 @@ from curategpt.wrappers.ontology.ontology import OntologyClass, Relationship
 
 logger = logging.getLogger(__name__)
 
+# ordered as oaklib's per-entity queries, so that the last of several labels
+# or definitions is kept, as before
+LABELS_QUERY = "SELECT subject, value FROM rdfs_label_statement ORDER BY subject, value"
+DEFINITIONS_QUERY = (
+    "SELECT subject, value FROM has_text_definition_statement ORDER BY subject, value"
+)
+
+
+def _sql_rows(adapter: SqlImplementation, query: str) -> Iterator[Tuple]:
+    from sqlalchemy import text
+
+    yield from adapter.session.execute(text(query))
+
+
+def _sql_labels(adapter: SqlImplementation, entities: Set[CURIE]) -> Dict[CURIE, str]:
+    return {id: lbl for id, lbl in _sql_rows(adapter, LABELS_QUERY) if id in entities}
+
 
 @dataclass
 class OntologyWrapper(BaseWrapper):
@@ -47,6 +77,12 @@ class OntologyWrapper(BaseWrapper):
     fetch_relationships: bool = field(default=True)
     relationships_as_fields: bool = field(default=False)
 
+    chunk_size: int = field(default=1000)
+    """Number of entities whose details are fetched per query"""
+
+    bulk_sql: bool = field(default=True)
+    """For SQLite adapters, fetch all definitions and relationships at once, rather than by chunk"""
+
     branches: List[str] = None
 
     def __post_init__(self):
@@ -71,6 +107,12 @@ class OntologyWrapper(BaseWrapper):
         """
         Yield all objects in the view.
 
+        Labels of all entities are fetched first, as they are needed to make the
+        shorthand of any referenced entity. Objects are then built and yielded one chunk
+        of ``chunk_size`` at a time, each with its own definition, relationship and
+        logical definition queries, unless all of these were fetched in bulk (see
+        ``bulk_sql``).
+
         :return:
         """
         adapter = self.oak_adapter
@@ -79,29 +121,24 @@ class OntologyWrapper(BaseWrapper):
         if self.branches:
             if not isinstance(adapter, OboGraphInterface):
                 raise ValueError(f"OAK adapter {self.oak_adapter} does not support branches")
-            selected_ids = []
+            selected_ids = set()
             for branch in self.branches:
-                selected_ids.extend(list(adapter.descendants([branch], predicates=[IS_A])))
-            selected_ids = list(set(selected_ids))
+                selected_ids.update(adapter.descendants([branch], predicates=[IS_A]))
         elif object_ids:
-            selected_ids = list(object_ids)
+            selected_ids = set(object_ids)
         else:
-            selected_ids = list(entities)
+            selected_ids = set(entities)
         logger.info(f"Found {len(selected_ids)} selected ids")
+        bulk = self.bulk_sql and isinstance(adapter, SqlImplementation)
         # need to fetch ALL labels in store, even if not selected,
         # as may be used in references
-        labels = {e: lbl for e, lbl in adapter.labels(entities, allow_none=False)}
+        if bulk:
+            labels = _sql_labels(adapter, set(entities))
+        else:
+            labels = {}
+            for chunked_entities in chunk(entities, self.chunk_size):
+                labels.update(adapter.labels(chunked_entities, allow_none=False))
         logger.info(f"Found {len(labels)} labels")
-        definitions = {}
-        if self.fetch_definitions:
-            for chunked_entities in chunk(selected_ids, 100):
-                for id, defn, _ in adapter.definitions(chunked_entities):
-                    definitions[id] = defn
-        relationships = defaultdict(list)
-        if self.fetch_relationships:
-            for sub, pred, obj in adapter.relationships():
-                if sub in entities:
-                    relationships[sub].append((pred, obj))
         self.id_to_shorthand = {}
         self.shorthand_to_id = {}
         for id, lbl in labels.items():
@@ -114,49 +151,97 @@ class OntologyWrapper(BaseWrapper):
             self.shorthand_to_id[shorthand] = id
         self._objects_by_curie = {}
         self._objects_by_shorthand = {}
-        for id, shorthand in self.id_to_shorthand.items():
-            if id not in selected_ids:
-                continue
-            obj = OntologyClass(
-                id=shorthand,
-                label=labels[id],
-                original_id=id,
-            )
-            for pred, tgt in relationships.get(id, []):
-                k = self._as_shorthand(pred)
-                k = k.replace("rdfs:", "")
-                if self.relationships_as_fields:
-                    if not hasattr(obj, k):
-                        setattr(obj, k, [])
-                    getattr(obj, k).append(self._as_shorthand(tgt))
-                else:
-                    if not obj.relationships:
-                        obj.relationships = []
-                    obj.relationships.append(
-                        Relationship(predicate=k, target=self._as_shorthand(tgt))
-                    )
-            if id in definitions:
-                obj.definition = definitions[id]
-            self._objects_by_curie[id] = obj
-        # for id, alias in adapter.alias_relationships():
+        ids = [id for id in self.id_to_shorthand if id in selected_ids]
+        if bulk:
+            definitions, relationships, logical_definitions = self._fetch_all(set(ids))
+        for chunked_ids in chunk(ids, self.chunk_size):
+            chunked_ids = list(chunked_ids)
+            if not bulk:
+                definitions, relationships, logical_definitions = self._fetch(chunked_ids)
+            for id in chunked_ids:
+                obj = OntologyClass(
+                    id=self.id_to_shorthand[id],
+                    label=labels[id],
+                    original_id=id,
+                )
+                for pred, tgt in relationships.get(id, []):
+                    k = self._as_shorthand(pred)
+                    k = k.replace("rdfs:", "")
+                    if self.relationships_as_fields:
+                        if not hasattr(obj, k):
+                            setattr(obj, k, [])
+                        getattr(obj, k).append(self._as_shorthand(tgt))
+                    else:
+                        if not obj.relationships:
+                            obj.relationships = []
+                        obj.relationships.append(
+                            Relationship(predicate=k, target=self._as_shorthand(tgt))
+                        )
+                if id in definitions:
+                    obj.definition = definitions[id]
+                if id in logical_definitions:
+                    ldef = logical_definitions[id]
+                    obj.logical_definition = [
+                        Relationship(predicate=IS_A, target=self._as_shorthand(g))
+                        for g in ldef.genusIds
+                    ] + [
+                        Relationship(
+                            predicate=self._as_shorthand(r.propertyId),
+                            target=self._as_shorthand(r.fillerId),
+                        )
+                        for r in ldef.restrictions
+                    ]
+                self._objects_by_curie[id] = obj
+                yield obj.dict()
+
+    def _fetch(self, ids: List[CURIE]) -> Tuple[Dict, Dict, Dict]:
+        """
+        Fetch the definitions, relationships and logical definitions of some entities.
+
+        :param ids:
+        :return: dictionaries of definitions, relationships and logical definitions by id
+        """
+        adapter = self.oak_adapter
+        definitions = {}
+        if self.fetch_definitions:
+            for id, defn, _ in adapter.definitions(ids):
+                definitions[id] = defn
+        relationships = defaultdict(list)
+        if self.fetch_relationships:
+            for sub, pred, obj in adapter.relationships(subjects=ids):
+                relationships[sub].append((pred, obj))
+        logical_definitions = {}
         if isinstance(adapter, OboGraphInterface):
-            for ldef in adapter.logical_definitions():
-                shorthand = self._as_shorthand(ldef.definedClassId)
-                obj = self._objects_by_curie.get(ldef.definedClassId, None)
-                if obj is None:
-                    continue
-                obj.logical_definition = [
-                    Relationship(predicate=IS_A, target=self._as_shorthand(g))
-                    for g in ldef.genusIds
-                ] + [
-                    Relationship(
-                        predicate=self._as_shorthand(r.propertyId),
-                        target=self._as_shorthand(r.fillerId),
-                    )
-                    for r in ldef.restrictions
-                ]
-        for obj in self._objects_by_curie.values():
-            yield obj.dict()
+            for ldef in adapter.logical_definitions(subjects=ids):
+                logical_definitions[ldef.definedClassId] = ldef
+        return definitions, relationships, logical_definitions
+
+    def _fetch_all(self, ids: Set[CURIE]) -> Tuple[Dict, Dict, Dict]:
+        """
+        Fetch the definitions, relationships and logical definitions of all entities in bulk.
+
+        :param ids: entities to keep results for
+        :return: dictionaries of definitions, relationships and logical definitions by id
+        """
+        adapter = self.oak_adapter
+        definitions = {}
+        if self.fetch_definitions:
+            for id, defn in _sql_rows(adapter, DEFINITIONS_QUERY):
+                if id in ids:
+                    definitions[id] = defn
+        relationships = defaultdict(list)
+        if self.fetch_relationships:
+            for sub, pred, obj in adapter.relationships():
+                if sub in ids:
+                    relationships[sub].append((pred, obj))
+        logical_definitions = {}
+        for ldef in adapter.logical_definitions():
+            if ldef.definedClassId in ids:
+                logical_definitions[ldef.definedClassId] = ldef
+        logger.info(
+            f"Fetched {len(definitions)} definitions and {len(relationships)} relationships"
+        )
+        return definitions, relationships, logical_definitions
 
     def as_object(self, curie: CURIE) -> Optional[OntologyClass]:
         if not self._objects_by_curie:
@@ -183,6 +268,57 @@ class OntologyWrapper(BaseWrapper):
                 self.shorthand_to_id[obj["id"]] = obj["original_id"]
         return self.shorthand_to_id
 
+    def update_collection(
+        self, store: DBAdapter, collection: str, batch_size: int = 1000, **kwargs
+    ) -> Dict[str, int]:
+        """
+        Bring an indexed collection up to date with the ontology, embedding only what changed.
+
+        Terms are matched on their ``original_id``. Stored objects that are equal to the
+        current object are left alone; new and changed objects are upserted, and terms no
+        longer in the ontology are deleted. Objects that refer to a relabeled term have a
+        new shorthand for it, so they count as changed too. If a term's own shorthand
+        changed, its object under the old shorthand is deleted.
+
+        :param store:
+        :param collection:
+        :param batch_size: number of stored objects fetched at a time
+        :param kwargs: passed to ``upsert``, e.g. model
+        :return: number of terms added, changed, removed and unchanged
+        """
+        stored = {}
+        for obj, _, _ in store.fetch_all_objects_memory_safe(
+            collection=collection, batch_size=batch_size
+        ):
+            stored[obj.get("original_id", obj["id"])] = obj
+        counts = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+        stale_ids = set()
+        current_ids = set()
+        objs_to_upsert = []
+        for obj in self.objects():
+            current_ids.add(obj["id"])
+            old = stored.pop(obj["original_id"], None)
+            if old is None:
+                counts["added"] += 1
+            elif old == obj:
+                counts["unchanged"] += 1
+                continue
+            else:
+                counts["changed"] += 1
+                if old["id"] != obj["id"]:
+                    stale_ids.add(old["id"])
+            objs_to_upsert.append(obj)
+        for old in stored.values():
+            counts["removed"] += 1
+            stale_ids.add(old["id"])
+        # a stale shorthand may have been taken over by another term, which the upsert replaces
+        for id in stale_ids - current_ids:
+            store.delete(id, collection=collection)
+        if objs_to_upsert:
+            store.upsert(objs_to_upsert, collection=collection, **kwargs)
+        logger.info(f"Updated {collection}: {counts}")
+        return counts
+
     def unwrap_object(self, obj: Dict[str, Any], store: DBAdapter, **kwargs) -> GraphDocument:
         return self.unwrap_objects([obj], store, **kwargs)
 
@@ -1,8 +1,13 @@
+import time
+from dataclasses import dataclass
+
 import pytest
 import yaml
 
 from curategpt.agents.dragon_agent import DragonAgent
+from curategpt.extract import AnnotatedObject, Extractor
 from curategpt.extract.basic_extractor import BasicExtractor
+from curategpt.store import get_store
 from tests.store.conftest import requires_openai_api_key
 
 
@@ -51,3 +56,56 @@ def test_de_novo(go_test_chroma_db):
     )
     print("RESULT:")
     print(yaml.dump(ao.object, sort_keys=False))
+
+
+@dataclass
+class _LabelExtractor(Extractor):
+    """Predicts a definition from the label, slowly, without calling an LLM."""
+
+    def extract(self, text: str, target_class: str, examples=None, **kwargs) -> AnnotatedObject:
+        label = text.split("label: ")[-1]
+        time.sleep(0.01 * (label == "a"))
+        if label == "c":
+            raise ValueError("failed")
+        return AnnotatedObject(object={"definition": f"a {label}"})
+
+
+def test_generate_all_concurrently(tmp_path):
+    db = get_store("chromadb", str(tmp_path / "db"))
+    objs = [{"id": f"X:{label}", "label": label} for label in "abcd"]
+    db.insert(objs, collection="test", model="hashing:64")
+    dae = DragonAgent(knowledge_source=db, extractor=_LabelExtractor())
+    rows = list(
+        dae.generate_all(
+            collection="test", field_to_predict="definition", target_class="Thing", workers=3
+        )
+    )
+    # the failing object is skipped, the others keep their order
+    assert [(r.id, r.predicted_value) for r in rows] == [
+        ("X:a", "a a"),
+        ("X:b", "a b"),
+        ("X:d", "a d"),
+    ]
+
+
+def test_generate_all_streams(tmp_path):
+    db = get_store("chromadb", str(tmp_path / "db"))
+    objs = [{"id": f"X:{i}", "label": str(i)} for i in range(50)]
+    db.insert(objs, collection="test", model="hashing:64")
+    find = db.find
+    read = []
+
+    def _find(*args, **kwargs):
+        for result in find(*args, **kwargs):
+            read.append(result[0]["id"])
+            yield result
+
+    db.find = _find
+    dae = DragonAgent(knowledge_source=db, extractor=_LabelExtractor())
+    rows = dae.generate_all(
+        collection="test", field_to_predict="definition", target_class="Thing", workers=2
+    )
+    next(rows)
+    # objects are read a window ahead of the completions, not all at once
+    assert len(read) < len(objs)
+    rows.close()
@@ -1,4 +1,8 @@
-from curategpt.cli import main
+import subprocess
+import sys
+import time
+
+from curategpt.cli import annotate, main
 
 
 def test_help(runner):
@@ -11,3 +15,80 @@ def test_help(runner):
     result = runner.invoke(main, ["--help"])
     assert result.exit_code == 0
     assert "index" in result.output
+
+
+def test_lazy_imports():
+    """
+    Tests that loading the CLI does not import heavy dependencies.
+
+    :return:
+    """
+    code = (
+        "import sys, curategpt.cli; "
+        "heavy = ['torch', 'sentence_transformers', 'chromadb', 'duckdb', 'oaklib', 'llm', "
+        "'pandas']; "
+        "print(','.join(m for m in heavy if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_help_time():
+    """
+    Tests that ``curategpt --help`` starts within a time budget.
+
+    The budget is several times what the command takes with lazy imports (about 0.4s),
+    and less than importing torch and chromadb alone takes (about 3s).
+
+    :return:
+    """
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "curategpt.cli", "--help"], capture_output=True, check=True
+    )
+    assert time.perf_counter() - start < 2.0
+
+
+def test_annotation_methods(runner):
+    """
+    Tests that the annotate choices, listed literally in the CLI, match AnnotationMethod.
+
+    :param runner:
+    :return:
+    """
+    from curategpt.agents.concept_recognition_agent import AnnotationMethod
+
+    method_option = next(p for p in annotate.params if p.name == "method")
+    assert method_option.type.choices == [m.value for m in AnnotationMethod]
+
+
+def test_llm_cache(runner, tmp_path, monkeypatch):
+    """
+    Tests that --llm-cache reuses completions across runs and reports its statistics.
+
+    :param runner:
+    :return:
+    """
+    import llm
+
+    from curategpt.utils import llm_cache
+
+    class _EchoModel(llm.Model):
+        model_id = "echo"
+
+        def execute(self, prompt, stream, response, conversation):
+            yield prompt.prompt.upper()
+
+    monkeypatch.setattr(llm, "get_model", lambda name: _EchoModel())
+    monkeypatch.setattr(llm_cache, "DEFAULT_LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite"))
+    file = tmp_path / "terms.tsv"
+    file.write_text("column\nnucleus\n")
+    result = runner.invoke(main, ["multiprompt", "--llm-cache", str(file)])
+    assert result.exit_code == 0
+    assert "WHAT IS THE DEFINITION OF NUCLEUS?" in result.output
+    assert "0 hits, 1 misses" in result.output
+    result = runner.invoke(main, ["multiprompt", "--llm-cache", str(file)])
+    assert "1 hits, 0 misses" in result.output
+    assert llm_cache.get_llm_cache() is None
@@ -1,4 +1,7 @@
+import json
+
 from curategpt.cli import main
+from curategpt.store.duckdb_adapter import DuckDBAdapter
 from tests import INPUT_DIR
 
 ONT_DB = str(INPUT_DIR / "go-nucleus.db")
@@ -26,3 +29,89 @@ def test_store_management(runner):
         main, ["collections", "set", "-c", "default", "description: test description"]
     )
     assert result.exit_code == 0
+
+
+def test_index_resume(runner, tmp_path):
+    files = []
+    for name, n in [("first", 3), ("second", 4)]:
+        path = tmp_path / f"{name}.json"
+        path.write_text(json.dumps([{"id": f"{name}:{i}", "text": f"{name} {i}"} for i in range(n)]))
+        files.append(str(path))
+    db_path = str(tmp_path / "db.duckdb")
+    args = ["index", "-D", "duckdb", "-p", db_path, "-c", "docs", "-m", "all-MiniLM-L6-v2"]
+    result = runner.invoke(main, args + files[:1])
+    assert result.exit_code == 0
+    # simulate a run over both files that died after committing part of the second one
+    db = DuckDBAdapter(db_path)
+    checkpoint = db.index_checkpoint("docs")
+    assert checkpoint.completed_sources == files[:1]
+    checkpoint.source = files[1]
+    checkpoint.offset = 0
+    second = json.loads(open(files[1]).read())
+    db.insert(second[:2], collection="docs", checkpoint=checkpoint)
+    db.conn.close()
+    result = runner.invoke(main, args + ["--resume"] + files)
+    assert result.exit_code == 0, result.output
+    db = DuckDBAdapter(db_path)
+    ids = sorted(obj["id"] for obj, _, _ in db.find(collection="docs", limit=100))
+    assert ids == [f"first:{i}" for i in range(3)] + [f"second:{i}" for i in range(4)]
+    assert db.index_checkpoint("docs").completed_sources == files
+    db.conn.close()
+
+
+def test_index_ontology_incremental(runner, tmp_path):
+    args = ["ontology", "index", "-p", str(tmp_path / "db"), "-c", "ont", "-m", "hashing:64"]
+    result = runner.invoke(main, args + [ONT_DB])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(main, args + ["--incremental", ONT_DB])
+    assert result.exit_code == 0, result.output
+    assert "0 added, 0 changed, 0 removed" in result.output
+    result = runner.invoke(main, args + ["--incremental", "--resume", ONT_DB])
+    assert result.exit_code != 0
+
+
+def test_bench_cli(runner, tmp_path):
+    output = tmp_path / "bench.json"
+    result = runner.invoke(
+        main,
+        ["bench", "-D", "chromadb", "--size", "20", "--scenario", "search", "-o", str(output)],
+    )
+    assert result.exit_code == 0, result.output
+    results = json.loads(output.read_text())
+    assert [r["scenario"] for r in results["results"]] == ["insert", "search"]
+
+
+def test_profile(runner, tmp_path):
+    path = tmp_path / "objs.json"
+    path.write_text(json.dumps([{"id": f"ID:{i}", "text": f"text {i}"} for i in range(3)]))
+    db_path = str(tmp_path / "db")
+    result = runner.invoke(
+        main, ["--profile", "index", "-p", db_path, "-c", "test", "-m", "hashing:64", str(path)]
+    )
+    assert result.exit_code == 0, result.output
+    assert "insert.chromadb" in result.output
+    profile_path = tmp_path / "profile.json"
+    result = runner.invoke(
+        main,
+        ["--profile-output", str(profile_path), "search", "-p", db_path, "-c", "test", "text"],
+    )
+    assert result.exit_code == 0, result.output
+    profile = json.loads(profile_path.read_text())
+    assert "search.chromadb" in [row["span"] for row in profile["stages"]]
+
+
+def test_search_cache_option(runner, tmp_path):
+    path = tmp_path / "objs.json"
+    path.write_text(json.dumps([{"id": f"ID:{i}", "text": f"text {i}"} for i in range(3)]))
+    db_path = str(tmp_path / "db")
+    result = runner.invoke(
+        main, ["index", "-p", db_path, "-c", "test", "-m", "hashing:64", str(path)]
+    )
+    assert result.exit_code == 0, result.output
+    cache_path = str(tmp_path / "search_cache.sqlite")
+    args = ["search", "-p", db_path, "-c", "test", "--search-cache", cache_path, "text"]
+    result = runner.invoke(main, args)
+    assert result.exit_code == 0, result.output
+    assert "Search cache: 0 hits, 1 misses" in result.output
+    result = runner.invoke(main, args)
+    assert "Search cache: 1 hits, 0 misses" in result.output
@@ -7,6 +7,7 @@ from linkml_runtime.utils.schema_builder import SchemaBuilder
 from oaklib import get_adapter
 
 from curategpt.store.chromadb_adapter import ChromaDBAdapter
+from curategpt.store.metadata import IndexCheckpoint
 from curategpt.store.schema_proxy import SchemaProxy
 from curategpt.wrappers.ontology import ONTOLOGY_MODEL_PATH, OntologyWrapper
 from tests import INPUT_DBS, INPUT_DIR, OUTPUT_CHROMA_DB_PATH, OUTPUT_DIR
@@ -278,3 +279,37 @@ def test_diversified_search_on_empty_db(empty_db):
         "pineapple helicopter 5", collection="test", relevance_factor=relevance_factor, limit=20
     )
     assert len(list(results)) == 0
+
+
+def test_index_checkpoint(example_texts):
+    shutil.rmtree(EMPTY_DB_PATH, ignore_errors=True)
+    db = ChromaDBAdapter(str(EMPTY_DB_PATH))
+    collection = "test"
+    objs = terms_to_objects(example_texts)
+    checkpoint = IndexCheckpoint(source="terms.json", model=db.default_model)
+    db.insert(objs[:4], collection=collection, batch_size=2, checkpoint=checkpoint)
+    assert checkpoint.offset == 4
+    # the checkpoint is stored as a json string and parsed back
+    stored = ChromaDBAdapter(str(EMPTY_DB_PATH)).index_checkpoint(collection)
+    assert stored == checkpoint
+    assert stored.last_id == "ID:3"
+    # simulate a crash after the batch was added but before the checkpoint was written;
+    # the overlapping batch is upserted rather than failing or duplicating
+    stored.offset = 2
+    db.insert(objs[2:], collection=collection, batch_size=2, checkpoint=stored)
+    assert stored.offset == len(objs)
+    assert db.collection_metadata(collection, include_derived=True).object_count == len(objs)
+
+
+def test_lookup_multiple(empty_db, example_texts):
+    db = empty_db
+    objs = terms_to_objects(example_texts)
+    db.insert(objs, collection="test")
+    missing = []
+    ids = ["ID:3", "ID:1", "NO:SUCH", "ID:3"]
+    results = list(db.lookup_multiple(ids, collection="test", missing=missing))
+    assert [r["id"] for r in results] == ["ID:3", "ID:1", "ID:3"]
+    assert results[1] == objs[1]
+    assert missing == ["NO:SUCH"]
+    results = list(db.lookup_multiple(["ID:2"], collection="test", projection=["id", "text"]))
+    assert results == [{"id": "ID:2", "text": objs[2]["text"]}]
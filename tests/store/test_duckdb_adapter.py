@@ -2,12 +2,14 @@ import os
 import shutil
 from typing import Dict
 
+import duckdb
 import pytest
 import yaml
 from linkml_runtime.utils.schema_builder import SchemaBuilder
 from oaklib import get_adapter
 
 from curategpt.store.duckdb_adapter import DuckDBAdapter
+from curategpt.store.metadata import IndexCheckpoint
 from curategpt.store.schema_proxy import SchemaProxy
 from curategpt.wrappers.ontology import OntologyWrapper
 from tests import INPUT_DBS, INPUT_DIR, OUTPUT_DIR, OUTPUT_DUCKDB_PATH
@@ -318,3 +320,37 @@ def test_diversified_search_on_empty_db(empty_db):
         limit=20,
     )
     assert len(list(results)) == 0
+
+
+def test_index_checkpoint(empty_db, example_texts):
+    db = empty_db
+    collection = "test_collection"
+    objs = terms_to_objects(example_texts)
+    checkpoint = IndexCheckpoint(source="terms.json", model=db.default_model)
+    db.insert(objs[:4], collection=collection, batch_size=2, checkpoint=checkpoint)
+    assert checkpoint.offset == 4
+    assert checkpoint.last_id == "ID:3"
+    assert DuckDBAdapter(EMPTY_DB_PATH).index_checkpoint(collection) == checkpoint
+    # a failing batch (duplicate id) is rolled back together with its checkpoint
+    with pytest.raises(duckdb.ConstraintException):
+        db.insert(objs[3:], collection=collection, batch_size=2, checkpoint=checkpoint)
+    assert checkpoint.offset == 4
+    assert db.index_checkpoint(collection).offset == 4
+    db.insert(objs[4:], collection=collection, batch_size=2, checkpoint=checkpoint)
+    assert db.index_checkpoint(collection).offset == len(objs)
+    assert db.index_checkpoint(collection).last_id == f"ID:{len(objs) - 1}"
+
+
+def test_lookup_multiple(empty_db, example_texts):
+    db = empty_db
+    collection = "test_collection"
+    objs = terms_to_objects(example_texts)
+    db.insert(objs, collection=collection)
+    missing = []
+    ids = ["ID:3", "ID:1", "NO:SUCH", "ID:3"]
+    results = list(db.lookup_multiple(ids, collection=collection, missing=missing))
+    assert [r["id"] for r in results] == ["ID:3", "ID:1", "ID:3"]
+    assert results[1]["text"] == objs[1]["text"]
+    assert missing == ["NO:SUCH"]
+    results = list(db.lookup_multiple(["ID:2"], collection=collection, projection="text"))
+    assert results == [{"text": objs[2]["text"]}]
@@ -0,0 +1,33 @@
+from curategpt.store.embedding_cache import QueryEmbeddingCache
+
+
+def test_query_embedding_cache():
+    calls = []
+
+    def embed(text):
+        calls.append(text)
+        return [float(len(text))]
+
+    cache = QueryEmbeddingCache(max_size=2)
+    assert cache.get("m1", "foo", embed) == [3.0]
+    assert cache.get("m1", "foo", embed) == [3.0]
+    assert calls == ["foo"]
+    # the model is part of the key
+    cache.get("m2", "foo", embed)
+    assert calls == ["foo", "foo"]
+    # least recently used entry is evicted
+    cache.get("m1", "foo", embed)
+    cache.get("m1", "barbaz", embed)
+    cache.get("m2", "foo", embed)
+    assert calls == ["foo", "foo", "barbaz", "foo"]
+    assert cache.stats()["size"] == 2
+    assert cache.hits == 2
+    assert cache.hit_rate == 2 / 6
+
+
+def test_query_embedding_cache_disabled():
+    cache = QueryEmbeddingCache(max_size=0)
+    cache.get("m", "foo", lambda t: [1.0])
+    cache.get("m", "foo", lambda t: [1.0])
+    assert cache.misses == 2
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from curategpt.store import get_store
+from curategpt.store.hashing_embedder import HashingEmbedder, get_hashing_embedder
+
+
+@pytest.mark.parametrize(
+    "model,dimension,buckets",
+    [
+        ("hashing:", 512, 512),
+        ("hashing:64", 64, 64),
+        ("hashing:1024:32", 32, 1024),
+    ],
+)
+def test_model_names(model, dimension, buckets):
+    embedder = get_hashing_embedder(model)
+    assert embedder.dimension == dimension
+    assert embedder.buckets == buckets
+    vectors = np.array(embedder(["nuclear membrane", "ribosome"]))
+    assert vectors.shape == (2, dimension)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+
+
+def test_invalid_model_names():
+    for model in ["hashing:abc", "hashing:64:128", "hashing:1:2:3"]:
+        with pytest.raises(ValueError):
+            HashingEmbedder.from_model_name(model)
+
+
+def test_deterministic():
+    texts = ["nuclear membrane", "nuclear envelope", "ribosome"]
+    v1 = HashingEmbedder(dimension=256)(texts)
+    v2 = HashingEmbedder(dimension=256)(texts)
+    assert v1 == v2
+    assert HashingEmbedder(dimension=256).embed("") == [0.0] * 256
+    sims = np.array(v1) @ np.array(v1[0])
+    assert sims[1] > sims[2]
+
+
+def test_chromadb_store(tmp_path, example_texts):
+    db = get_store("chromadb", str(tmp_path / "db"))
+    objs = [{"id": f"ID:{i}", "text": t} for i, t in enumerate(example_texts)]
+    db.insert(objs, collection="test", model="hashing:128")
+    assert db.collection_metadata("test").model == "hashing:128"
+    results = list(db.search(example_texts[1], collection="test", limit=2))
+    assert results[0][0]["text"] == example_texts[1]
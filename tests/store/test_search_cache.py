@@ -0,0 +1,76 @@
+import pytest
+
+from curategpt.store.search_cache import SearchResultCache
+from tests import OUTPUT_DIR
+
+CACHE_PATH = OUTPUT_DIR / "search_cache.sqlite"
+
+
+@pytest.fixture(params=[False, True])
+def cache(request) -> SearchResultCache:
+    if request.param:
+        CACHE_PATH.unlink(missing_ok=True)
+        return SearchResultCache(max_size=2, path=str(CACHE_PATH))
+    return SearchResultCache(max_size=2)
+
+
+def test_search_cache(cache):
+    k1 = cache.make_key(collection="c", version=1, text="foo", where={"x": 1}, limit=10)
+    k2 = cache.make_key(collection="c", version=2, text="foo", where={"x": 1}, limit=10)
+    assert k1 != k2
+    assert cache.make_key(collection="c", include={"b", "a"}) is not None
+    assert cache.make_key(collection="c", text_field=lambda x: x) is None
+    results = [({"id": "X:1", "nested": {"a": [1]}}, 0.25, {"document": "foo"})]
+    assert cache.get(k1) is None
+    cache.put(k1, results, collection="c")
+    assert cache.get(k1) == results
+    # results are copies
+    cache.get(k1)[0][0]["id"] = "X:2"
+    assert cache.get(k1) == results
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+
+def test_search_cache_eviction(cache):
+    keys = [cache.make_key(text=str(i)) for i in range(3)]
+    cache.put(keys[0], [], collection="c")
+    cache.put(keys[1], [], collection="c")
+    assert cache.get(keys[0]) == []
+    cache.put(keys[2], [], collection="d")
+    # keys[1] is the least recently used
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == []
+    cache.invalidate("c")
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) == []
+
+
+def test_store_search_cache(tmp_path, example_texts):
+    from curategpt.store import get_store
+
+    db = get_store("chromadb", str(tmp_path / "db"), search_cache="memory")
+    collection = "test_collection"
+    objs = [{"id": f"ID:{i}", "text": t} for i, t in enumerate(example_texts)]
+    db.insert(objs[1:], collection=collection, model="hashing:64")
+    first = list(db.search(example_texts[0], collection=collection, limit=3))
+    assert list(db.search(example_texts[0], collection=collection, limit=3)) == first
+    assert db.search_cache.stats()["hits"] == 1
+    # writes invalidate cached results
+    db.insert(objs[:1], collection=collection)
+    results = list(db.search(example_texts[0], collection=collection, limit=3))
+    assert db.search_cache.stats()["hits"] == 1
+    assert results[0][0]["id"] == "ID:0"
+    db.delete("ID:0", collection=collection)
+    results = list(db.search(example_texts[0], collection=collection, limit=3))
+    assert db.search_cache.stats()["hits"] == 1
+    assert "ID:0" not in [obj["id"] for obj, _, _ in results]
+
+
+def test_store_without_search_cache(tmp_path, example_texts):
+    from curategpt.store import get_store
+
+    db = get_store("chromadb", str(tmp_path / "db"))
+    assert db.search_cache is None
+    db.insert([{"id": "ID:0", "text": example_texts[0]}], collection="test", model="hashing:64")
+    # no version is written when nothing needs invalidating
+    assert db.collection_version("test") is None
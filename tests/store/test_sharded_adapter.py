@@ -0,0 +1,65 @@
+import shutil
+from typing import Dict
+
+import pytest
+from linkml_runtime.utils.schema_builder import SchemaBuilder
+
+from curategpt.store import get_store
+from curategpt.store.schema_proxy import SchemaProxy
+from curategpt.store.sharded_adapter import ShardedAdapter
+from tests import OUTPUT_DIR
+
+SHARDED_DB_PATH = OUTPUT_DIR / "sharded_db"
+
+
+def terms_to_objects(terms: list[str]) -> list[Dict]:
+    return [{"id": f"ID:{i}", "text": t, "wordlen": len(t)} for i, t in enumerate(terms)]
+
+
+@pytest.fixture
+def sharded_db() -> ShardedAdapter:
+    shutil.rmtree(SHARDED_DB_PATH, ignore_errors=True)
+    return get_store("sharded", str(SHARDED_DB_PATH), num_shards=3)
+
+
+def test_sharded_store(sharded_db, example_texts):
+    db = sharded_db
+    collection = "test_collection"
+    objs = terms_to_objects(example_texts)
+    db.insert(objs, collection=collection)
+    counts = [
+        len(list(shard.fetch_all_objects_memory_safe(collection=collection)))
+        for shard in db.shards
+        if collection in shard.list_collection_names()
+    ]
+    assert sum(counts) == len(objs)
+    results = list(db.search("fox", collection=collection, limit=3))
+    assert len(results) == 3
+    assert results[0][0]["text"] == example_texts[0]
+    distances = [r[1] for r in results]
+    assert distances == sorted(distances)
+    diversified = list(db.search("fox", collection=collection, limit=3, relevance_factor=0.5))
+    assert len(diversified) == 3
+    assert db.lookup("ID:2", collection=collection)["text"] == "vulpine"
+    ids = ["ID:4", "ID:0"]
+    assert [o["id"] for o in db.lookup_multiple(ids, collection=collection)] == ids
+    # reopening reads the number of shards from the directory
+    reopened = get_store("sharded", str(SHARDED_DB_PATH))
+    assert reopened.num_shards == 3
+
+
+def test_sharded_schema_id_field(example_texts):
+    shutil.rmtree(SHARDED_DB_PATH, ignore_errors=True)
+    db = get_store("sharded", str(SHARDED_DB_PATH), num_shards=3, shard_store="chromadb")
+    sb = SchemaBuilder()
+    sb.add_class("Term", slots=["curie", "text"])
+    sb.add_slot("curie", identifier=True, replace_if_present=True)
+    db.schema_proxy = SchemaProxy(sb.schema)
+    collection = "test_collection"
+    objs = [{"curie": f"X:{i}", "text": t} for i, t in enumerate(example_texts)]
+    db.insert(objs, collection=collection, model="hashing:64")
+    ids = ["X:3", "X:0", "X:9999"]
+    missing = []
+    results = list(db.lookup_multiple(ids, collection=collection, missing=missing))
+    assert [o["curie"] for o in results] == ["X:3", "X:0"]
+    assert missing == ["X:9999"]
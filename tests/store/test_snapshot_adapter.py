@@ -0,0 +1,38 @@
+import shutil
+
+import pytest
+
+from curategpt.store import get_store
+from curategpt.store.chromadb_adapter import ChromaDBAdapter
+from curategpt.store.snapshot_adapter import write_snapshot
+from tests import OUTPUT_DIR
+
+SOURCE_DB_PATH = OUTPUT_DIR / "snapshot_source_db"
+SNAPSHOT_PATH = OUTPUT_DIR / "snapshots"
+
+
+@pytest.fixture
+def source_db(example_texts) -> ChromaDBAdapter:
+    shutil.rmtree(SOURCE_DB_PATH, ignore_errors=True)
+    db = ChromaDBAdapter(str(SOURCE_DB_PATH))
+    objs = [{"id": f"ID:{i}", "text": t, "wordlen": len(t)} for i, t in enumerate(example_texts)]
+    db.insert(objs, collection="test")
+    return db
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_snapshot(source_db, example_texts, dtype):
+    shutil.rmtree(SNAPSHOT_PATH, ignore_errors=True)
+    cm = write_snapshot(source_db, "test", str(SNAPSHOT_PATH), dtype=dtype)
+    assert cm.object_count == len(example_texts)
+    db = get_store("snapshot", str(SNAPSHOT_PATH))
+    assert db.list_collection_names() == ["test"]
+    assert db.collection_metadata("test").model == source_db.collection_metadata("test").model
+    results = list(db.search("fox", collection="test", limit=3))
+    expected = list(source_db.search("fox", collection="test", limit=3))
+    assert [r[0]["id"] for r in results] == [r[0]["id"] for r in expected]
+    assert len(list(db.search("fox", collection="test", limit=3, relevance_factor=0.5))) == 3
+    assert db.lookup("ID:2", collection="test")["text"] == "vulpine"
+    assert [r[0]["id"] for r in db.find(where={"wordlen": 6}, collection="test")] == ["ID:1"]
+    with pytest.raises(NotImplementedError):
+        db.insert({"id": "ID:100", "text": "new"}, collection="test")
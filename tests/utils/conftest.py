@@ -0,0 +1,37 @@
+from typing import List
+
+import pytest
+import tiktoken
+
+from curategpt.utils import tokens
+
+
+class WordEncoding:
+    """One token per word, so that tests do not need to download encodings."""
+
+    def encode(self, text, **kwargs):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture
+def word_encoding(monkeypatch) -> List[str]:
+    """
+    Use :class:`WordEncoding` for all models.
+
+    :return: models whose encoding was looked up, in order
+    """
+    lookups = []
+
+    def _encoding_for_model(model):
+        lookups.append(model)
+        return WordEncoding()
+
+    monkeypatch.setattr(tiktoken, "encoding_for_model", _encoding_for_model)
+    tokens._encoding.cache_clear()
+    tokens.embedding_encoding.cache_clear()
+    yield lookups
+    tokens._encoding.cache_clear()
+    tokens.embedding_encoding.cache_clear()
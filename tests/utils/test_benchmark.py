@@ -0,0 +1,19 @@
+import json
+
+from curategpt.utils.benchmark import SCENARIOS, compare_benchmarks, run_benchmarks
+
+
+def test_run_benchmarks(tmp_path):
+    results = run_benchmarks(
+        ["chromadb"], sizes=[30], num_queries=3, all_by_all_size=10, workdir=str(tmp_path)
+    )
+    by_scenario = {r["scenario"]: r for r in results["results"]}
+    assert set(by_scenario) == set(SCENARIOS)
+    for r in results["results"]:
+        assert r["error"] is None, r
+    assert by_scenario["search"]["metrics"]["n"] == 3
+    assert by_scenario["all_by_all"]["metrics"]["objects"] == 10
+    # results are JSON and comparable across runs
+    rows = compare_benchmarks(json.loads(json.dumps(results)), results)
+    assert rows and all(row["ratio"] in (1.0, None) for row in rows)
+
@@ -0,0 +1,69 @@
+import pytest
+
+from curategpt.utils.chunking import split_objects, split_text
+from curategpt.wrappers.general.filesystem_wrapper import FilesystemWrapper
+
+pytestmark = pytest.mark.usefixtures("word_encoding")
+
+
+def _text(num_sentences: int, words: int = 5) -> str:
+    return " ".join(" ".join(f"s{i}w{j}" for j in range(words)) + "." for i in range(num_sentences))
+
+
+def test_split_text():
+    text = _text(20)
+    spans = list(split_text(text, max_tokens=12, overlap_tokens=5))
+    assert len(spans) > 5
+    for start, end in spans:
+        chunk = text[start:end]
+        assert len(chunk.split()) <= 12
+        # chunks end at sentence ends
+        assert chunk.rstrip().endswith(".")
+    assert spans[0][0] == 0
+    assert spans[-1][1] == len(text)
+    for (_, end), (next_start, _) in zip(spans, spans[1:]):
+        # one sentence is repeated
+        assert len(text[next_start:end].split()) == 5
+
+
+def test_split_text_sections():
+    text = "a b c.\n\nd e f. g h i."
+    assert [text[s:e] for s, e in split_text(text, max_tokens=6, overlap_tokens=0)] == [
+        "a b c.\n\n",
+        "d e f. g h i.",
+    ]
+    # a section break does not end a chunk that is less than half full
+    assert list(split_text(text, max_tokens=20, overlap_tokens=0)) == [(0, len(text))]
+
+
+def test_split_text_long_sentence():
+    text = " ".join(f"w{i}" for i in range(25)) + "."
+    chunks = [text[s:e] for s, e in split_text(text, max_tokens=10, overlap_tokens=0)]
+    assert [len(chunk.split()) for chunk in chunks] == [10, 10, 5]
+    assert "".join(chunks) == text
+    with pytest.raises(ValueError):
+        list(split_text(text, max_tokens=10, overlap_tokens=10))
+
+
+def test_split_objects():
+    metadata = {"authors": ["a", "b"]}
+    short = {"id": "X:1", "text": "Short.", "meta": metadata}
+    long = {"id": "X:2", "text": _text(10), "meta": metadata}
+    objs = list(split_objects(iter([short, long]), max_tokens=12, overlap_tokens=0))
+    assert objs[0] is short
+    chunks = objs[1:]
+    assert [c["id"] for c in chunks] == [f"X:2#{n}" for n in range(1, len(chunks) + 1)]
+    for c in chunks:
+        assert c["parent_id"] == "X:2"
+        assert c["text"] == long["text"][c["start"] : c["end"]]
+        assert c["meta"] is metadata
+
+
+def test_filesystem_split(tmp_path):
+    (tmp_path / "notes.md").write_text(_text(300))
+    wrapper = FilesystemWrapper(root_directory=str(tmp_path), extraction_cache=None)
+    wrapper.max_chunk_tokens = 100
+    objs = list(wrapper.objects())
+    assert len(objs) > 15
+    assert all(len(obj["text"].split()) <= 100 for obj in objs)
+    assert {obj["parent_id"] for obj in objs} == {str(tmp_path / "notes.md")}
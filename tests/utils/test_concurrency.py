@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from curategpt.utils.concurrency import RateLimiter, map_ordered
+
+
+def test_order_and_concurrency():
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def _work(i):
+        with lock:
+            running.append(i)
+            peak.append(len(running))
+        # later items finish first
+        time.sleep(0.01 * (5 - i))
+        with lock:
+            running.remove(i)
+        return i * 10
+
+    results = list(map_ordered(_work, range(5), workers=4))
+    assert [r.result for r in results] == [0, 10, 20, 30, 40]
+    assert [r.index for r in results] == list(range(5))
+    assert max(peak) > 1
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_retries_and_failures(workers):
+    attempts = {}
+
+    def _work(i):
+        attempts[i] = attempts.get(i, 0) + 1
+        if i == 1 and attempts[i] < 2:
+            raise ValueError("transient")
+        if i == 2:
+            raise ValueError("permanent")
+        return i
+
+    results = list(map_ordered(_work, range(4), workers=workers, retries=1, backoff=0.001))
+    assert [r.ok for r in results] == [True, True, False, True]
+    assert results[1].result == 1
+    assert results[1].attempts == 2
+    assert results[2].attempts == 2
+    assert isinstance(results[2].error, ValueError)
+
+
+def test_rate_limiter():
+    limiter = RateLimiter(requests_per_minute=60 * 50)
+    start = time.monotonic()
+    list(map_ordered(lambda i: i, range(6), workers=3, rate_limiter=limiter))
+    # 6 calls spaced 20ms apart
+    assert time.monotonic() - start >= 0.09
+
+
+def _square(i):
+    return i * i
+
+
+def test_processes():
+    results = list(map_ordered(_square, range(5), workers=2, processes=True))
+    assert [r.result for r in results] == [0, 1, 4, 9, 16]
+    with pytest.raises(ValueError):
+        list(
+            map_ordered(_square, range(5), workers=2, processes=True, rate_limiter=RateLimiter(60))
+        )
@@ -0,0 +1,68 @@
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import ClassVar, Dict
+
+import pytest
+
+from curategpt.utils.http_client import get_session, rate_limit, set_rate_limit
+from curategpt.wrappers.base_wrapper import BaseWrapper
+
+
+@pytest.fixture
+def server():
+    requests = []
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            # the first request to /flaky fails
+            status = 503 if self.path == "/flaky" and requests.count(self.path) == 1 else 200
+            self.send_response(status)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}", requests
+    httpd.shutdown()
+    set_rate_limit("127.0.0.1", 0)
+
+
+def test_retry(server):
+    url, requests = server
+    response = get_session().get(f"{url}/flaky")
+    assert response.status_code == 200
+    assert requests == ["/flaky", "/flaky"]
+
+
+def test_rate_limit(server):
+    url, requests = server
+    set_rate_limit("127.0.0.1", 20)
+    session = get_session()
+    start = time.monotonic()
+    for _ in range(5):
+        session.get(url)
+    assert time.monotonic() - start >= 0.2
+    assert len(requests) == 5
+
+
+def test_session_settings():
+    assert get_session(retries=1) is get_session(retries=1)
+    session = get_session(retries=1, pool_size=2)
+    assert session is not get_session(retries=1)
+    assert session.get_adapter("https://example.org").max_retries.total == 1
+
+
+def test_wrapper_declares_rate_limits():
+    @dataclass
+    class _Wrapper(BaseWrapper):
+        rate_limits: ClassVar[Dict[str, float]] = {"api.example.org": 7}
+
+    assert rate_limit("api.example.org") == 7
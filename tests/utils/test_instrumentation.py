@@ -0,0 +1,112 @@
+import json
+
+import numpy as np
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from curategpt.store import get_store
+from curategpt.utils.http_client import RateLimitedAdapter
+from curategpt.utils.instrumentation import (
+    JsonLinesExporter,
+    PrometheusFileExporter,
+    disable_metrics,
+    enable_metrics,
+    get_registry,
+    span,
+    timed,
+)
+from curategpt.utils.llm_cache import cached_prompt
+from curategpt.utils.vector_algorithms import mmr_diversified_search
+
+
+@pytest.fixture
+def registry():
+    registry = enable_metrics()
+    registry.reset()
+    yield registry
+    disable_metrics()
+    registry.reset()
+
+
+@timed("test.generator")
+def _generate(n):
+    yield from range(n)
+
+
+def test_disabled():
+    registry = get_registry()
+    registry.reset()
+    with span("test.disabled") as s:
+        s.count("items")
+    assert list(_generate(3)) == [0, 1, 2]
+    assert registry.spans == {}
+    assert registry.counters == {}
+
+
+def test_spans(registry):
+    with pytest.raises(ValueError):
+        with span("test.block"):
+            raise ValueError("failed")
+    assert registry.spans["test.block"].errors == 1
+    assert list(_generate(3)) == [0, 1, 2]
+    gen = _generate(10)
+    next(gen)
+    gen.close()
+    assert registry.spans["test.generator"].count == 2
+    mmr_diversified_search(np.array([1.0, 0.0]), np.array([[1.0, 0.0], [0.0, 1.0]]))
+    assert registry.spans["mmr"].count == 1
+
+
+def test_store_spans(registry, tmp_path):
+    db = get_store("chromadb", str(tmp_path / "db"))
+    texts = ["fox", "canine", "vulpine", "feline"]
+    objs = [{"id": f"ID:{i}", "text": t} for i, t in enumerate(texts)]
+    db.insert(objs, collection="test", model="hashing:64")
+    results = list(db.search("fox", collection="test", limit=2))
+    assert len(results) == 2
+    assert registry.spans["insert.chromadb"].count == 1
+    assert registry.spans["search.chromadb"].count == 1
+    assert registry.counters["embed.chromadb.texts"] == len(objs) + 1
+    assert registry.spans["json.decode.chromadb"].count == 2
+
+
+def test_llm_spans(registry):
+    class _Response:
+        def text(self):
+            return "four"
+
+    class _Model:
+        model_id = "test-model"
+
+        def prompt(self, prompt, system=None, **options):
+            return _Response()
+
+    assert cached_prompt(_Model(), "2 + 2?").text() == "four"
+    assert registry.spans["llm.prompt"].count == 1
+    assert registry.counters["llm.prompt.response_chars"] == 4
+
+
+def test_exporters(registry, tmp_path, monkeypatch):
+    jsonl_path = tmp_path / "metrics.jsonl"
+    prometheus_path = tmp_path / "metrics.prom"
+    enable_metrics(JsonLinesExporter(str(jsonl_path)), PrometheusFileExporter(str(prometheus_path)))
+
+    def _send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Length"] = "5"
+        response._content = b"hello"
+        return response
+
+    monkeypatch.setattr(HTTPAdapter, "send", _send)
+    session = requests.Session()
+    session.mount("http://", RateLimitedAdapter())
+    assert session.get("http://example.org/").text == "hello"
+    disable_metrics()
+    records = [json.loads(line) for line in jsonl_path.read_text().splitlines()]
+    assert {r["name"] for r in records} == {"http.request", "http.request.bytes"}
+    assert registry.counters["http.request.bytes"] == 5
+    prometheus = prometheus_path.read_text()
+    assert 'curategpt_span_count{span="http.request"} 1' in prometheus
+    assert 'curategpt_counter_total{name="http.request.bytes"} 5' in prometheus
@@ -0,0 +1,62 @@
+import time
+
+import llm
+import pytest
+
+from curategpt.utils.llm_cache import (
+    CachedResponse,
+    LLMCache,
+    cached_prompt,
+    disable_llm_cache,
+    enable_llm_cache,
+    get_llm_cache,
+)
+
+
+class _EchoModel(llm.Model):
+    model_id = "echo"
+
+    def __init__(self):
+        self.calls = 0
+
+    def execute(self, prompt, stream, response, conversation):
+        self.calls += 1
+        yield f"{prompt.system}: {prompt.prompt}"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    yield enable_llm_cache(str(tmp_path / "llm_cache.sqlite"))
+    disable_llm_cache()
+
+
+def test_cached_prompt(cache, tmp_path):
+    model = _EchoModel()
+    assert cached_prompt(model, "hi", system="sys").text() == "sys: hi"
+    assert cached_prompt(model, "hi", system="sys").text() == "sys: hi"
+    assert model.calls == 1
+    assert cached_prompt(model, "hi", system="other").text() == "other: hi"
+    assert model.calls == 2
+    assert cache.stats()["hits"] == 1
+    assert isinstance(cached_prompt(model, "hi", system="sys"), CachedResponse)
+    # completions persist across runs
+    cache = enable_llm_cache(str(tmp_path / "llm_cache.sqlite"))
+    assert cached_prompt(model, "hi", system="sys").text() == "sys: hi"
+    assert model.calls == 2
+    disable_llm_cache()
+    assert get_llm_cache() is None
+    assert cached_prompt(model, "hi", system="sys").text() == "sys: hi"
+    assert model.calls == 3
+
+
+def test_eviction():
+    cache = LLMCache(path=":memory:", max_size=2, ttl=60)
+    for i in range(3):
+        cache.put(cache.make_key("m", str(i)), str(i), model="m")
+    assert len(cache) == 2
+    assert cache.get(cache.make_key("m", "0")) is None
+    cache.ttl = 1e-6
+    time.sleep(0.01)
+    assert cache.get(cache.make_key("m", "2")) is None
+    cache.evict()
+    assert len(cache) == 0
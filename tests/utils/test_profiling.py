@@ -0,0 +1,31 @@
+import json
+import pstats
+
+from curategpt.utils.instrumentation import metrics_enabled, span
+from curategpt.utils.profiling import Profiler
+
+
+def _work(n):
+    with span("embed.test") as s:
+        s.count("texts", n)
+        return sum(i * i for i in range(n))
+
+
+def test_cprofile(tmp_path):
+    profiler = Profiler("cprofile")
+    profiler.start()
+    _work(100000)
+    profiler.stop()
+    assert not metrics_enabled()
+    assert "embed.test" in profiler.report()
+    rows = profiler.stage_rows()
+    assert rows[0]["stage"] == "embed"
+    assert rows[0]["counts"] == {"texts": 100000}
+    profiler.write(str(tmp_path / "profile.pstats"))
+    assert pstats.Stats(str(tmp_path / "profile.pstats")).total_calls > 0
+    profiler.write(str(tmp_path / "profile.json"))
+    speedscope = json.loads((tmp_path / "profile.json").read_text())
+    frames = speedscope["shared"]["frames"]
+    profile = speedscope["profiles"][0]
+    assert len(profile["samples"]) == len(profile["weights"])
+    assert "_work" in {frames[i]["name"] for sample in profile["samples"] for i in sample}
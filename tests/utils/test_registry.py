@@ -0,0 +1,42 @@
+import subprocess
+import sys
+
+import pytest
+
+from curategpt.store import STORES, get_store
+from curategpt.utils import registry as registry_module
+from curategpt.utils.registry import Registry
+from curategpt.wrappers import WRAPPERS, get_wrapper
+
+
+@pytest.mark.parametrize("registry", [WRAPPERS, STORES])
+def test_builtins(registry):
+    for name in registry.builtins:
+        assert registry.load(name).name == name
+
+
+def test_plugins(monkeypatch):
+    reference = "curategpt.wrappers.general.json_wrapper:JSONWrapper"
+    monkeypatch.setattr(registry_module, "_entry_points", lambda group: {"plugin_json": reference})
+    registry = Registry("curategpt.test", {"json": reference})
+    assert registry.names() == ["json", "plugin_json"]
+    assert registry.load("plugin_json") is registry.load("json")
+    assert registry.load("unknown") is None
+
+
+def test_unknown():
+    with pytest.raises(ValueError):
+        get_wrapper("no_such_wrapper")
+    with pytest.raises(ValueError):
+        get_store("no_such_store")
+
+
+def test_imports_only_requested():
+    code = (
+        "import sys; from curategpt.wrappers import get_wrapper; get_wrapper('json'); "
+        "print(','.join(m for m in ['oaklib', 'chromadb', 'eutils'] if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == ""
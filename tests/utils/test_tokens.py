@@ -0,0 +1,45 @@
+import llm
+import pytest
+
+from curategpt.extract import AnnotatedObject
+from curategpt.extract.basic_extractor import BasicExtractor
+from curategpt.utils.tokens import estimate_num_tokens, select_within_budget
+
+
+class _EchoModel(llm.Model):
+    model_id = "echo"
+
+    def execute(self, prompt, stream, response, conversation):
+        self.last_prompt = prompt.prompt
+        yield '{"label": "predicted"}'
+
+
+def test_select_within_budget(word_encoding):
+    texts = ["one two three", "four five six seven", "eight"]
+    # 3 + 3 tokens of overhead, 2 of the fixed part, budget 20 - 5 - 1
+    assert select_within_budget("fixed part", texts, max_tokens=20, reserved_tokens=5) == [0]
+    assert select_within_budget(
+        "fixed part", texts, max_tokens=20, reserved_tokens=5, skip_oversized=True
+    ) == [0, 2]
+    assert select_within_budget("fixed part", texts, max_tokens=100, reserved_tokens=0) == [0, 1, 2]
+    with pytest.raises(ValueError):
+        select_within_budget("fixed " * 20, texts, max_tokens=20, reserved_tokens=5)
+    assert estimate_num_tokens(["fixed part"]) == 8
+    # the encoding is looked up once
+    assert word_encoding == ["gpt-4-0613"]
+
+
+def test_extractor_drops_least_relevant_examples(word_encoding):
+    extractor = BasicExtractor()
+    model = _EchoModel()
+    extractor._model = model
+    examples = [
+        AnnotatedObject(object={"label": f"example{i}"}, annotations={"text": "word " * 1000})
+        for i in range(6)
+    ]
+    ao = extractor.extract("some text", target_class="Thing", examples=examples)
+    assert ao.object == {"label": "predicted"}
+    assert "example2" in model.last_prompt
+    assert "example3" not in model.last_prompt
+    with pytest.raises(ValueError):
+        extractor.extract("some text", target_class="Thing", examples=examples, min_examples=4)
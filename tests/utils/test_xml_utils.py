@@ -0,0 +1,43 @@
+import xmltodict
+
+from curategpt.utils.xml_utils import element_to_dict, iter_elements, xml_text
+from tests import INPUT_DIR
+
+BIOSAMPLES = INPUT_DIR / "ncbi-biosample-example.xml"
+
+
+def _recursive_text(element) -> str:
+    text = element.text or ""
+    for subelement in element:
+        text += _recursive_text(subelement)
+        text += subelement.tail or ""
+    return text
+
+
+def test_xml_text():
+    from defusedxml.ElementTree import fromstring
+
+    content = BIOSAMPLES.read_bytes()
+    assert xml_text(content) == _recursive_text(fromstring(content))
+    with open(BIOSAMPLES, "rb") as stream:
+        assert xml_text(stream) == _recursive_text(fromstring(content))
+    assert xml_text("<a>x<b>y</b>z</a>") == "xyz"
+
+
+def test_deep_xml_text():
+    depth = 5000
+    content = "<a>" * depth + "x" + "</a>y" * (depth - 1) + "</a>"
+    assert xml_text(content) == "x" + "y" * (depth - 1)
+
+
+def test_element_to_dict():
+    expected = xmltodict.parse(BIOSAMPLES.read_text())["BioSampleSet"]["BioSample"]
+    with open(BIOSAMPLES, "rb") as stream:
+        records = [element_to_dict(e) for e in iter_elements(stream, "BioSample")]
+    assert records == expected
+    assert element_to_dict(next(iter_elements(b"<a x='1'>t<b>u</b> v <c/><c>k</c></a>", "a"))) == {
+        "@x": "1",
+        "b": "u",
+        "c": [None, "k"],
+        "#text": "t v",
+    }
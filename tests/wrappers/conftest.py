@@ -0,0 +1,66 @@
+import json
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+
+class FakeResponse:
+    """A canned response, with the parts of ``requests.Response`` that wrappers use."""
+
+    def __init__(
+        self,
+        data: Any = None,
+        content: Optional[bytes] = None,
+        headers: Optional[Dict] = None,
+        links: Optional[Dict] = None,
+        status_code: int = 200,
+    ):
+        self.data = data
+        if content is None:
+            content = json.dumps(data).encode("utf-8") if data is not None else b""
+        self.content = content
+        self.headers = headers or {}
+        self.links = links or {}
+        self.status_code = status_code
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8")
+
+    def json(self) -> Any:
+        return self.data
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+
+class FakeSession:
+    """
+    A session that answers requests with a handler, and records them.
+
+    The handler is called with the url and the ``params`` or ``data`` of each request,
+    and returns a :class:`FakeResponse`, or the JSON data of one.
+    """
+
+    def __init__(self, handler: Callable[..., Any]):
+        self.handler = handler
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, headers=None, **kwargs) -> FakeResponse:
+        return self._request(url, params=params)
+
+    def post(self, url, data=None, headers=None, **kwargs) -> FakeResponse:
+        return self._request(url, data=data)
+
+    def _request(self, url, params=None, data=None) -> FakeResponse:
+        with self.lock:
+            self.requests.append((url, params if data is None else data))
+        response = self.handler(url, params=params, data=data)
+        return response if isinstance(response, FakeResponse) else FakeResponse(response)
@@ -0,0 +1,47 @@
+from dataclasses import dataclass
+from typing import ClassVar, Dict, List
+
+import pytest
+
+from curategpt.store import get_store
+from curategpt.wrappers.base_wrapper import BaseWrapper
+
+
+@dataclass
+class _FixedWrapper(BaseWrapper):
+    name: ClassVar[str] = "fixed"
+
+    default_embedding_model = "hashing:64"
+
+    results: List[Dict] = None
+
+    def external_search(self, text: str, expand: bool = True, **kwargs) -> List[Dict]:
+        return [dict(obj) for obj in self.results]
+
+
+@pytest.mark.parametrize("store", ["chromadb", "duckdb"])
+def test_search_skips_cached_objects(store, tmp_path, monkeypatch):
+    db = get_store(store, str(tmp_path / "db"))
+    upserted = []
+    upsert = db.upsert
+
+    def _upsert(objs, **kwargs):
+        upserted.append([obj["id"] for obj in objs])
+        return upsert(objs, **kwargs)
+
+    monkeypatch.setattr(db, "upsert", _upsert)
+    results = [
+        {"id": "PMID:1", "title": "Acinar cells"},
+        {"id": "PMID:2", "title": "Salivary gland"},
+    ]
+    wrapper = _FixedWrapper(local_store=db, results=results)
+    assert len(list(wrapper.search("acinar", collection="cache"))) == 2
+    assert upserted == [["PMID:1", "PMID:2"]]
+    # repeating the search does not embed anything
+    list(wrapper.search("acinar", collection="cache"))
+    assert upserted == [["PMID:1", "PMID:2"]]
+    # only new or changed objects are embedded
+    wrapper.results = [{"id": "PMID:1", "title": "Acinar cells, revised"}, results[1]]
+    wrapper.results.append({"id": "PMID:3", "title": "Parotid gland"})
+    assert len(list(wrapper.search("acinar", collection="cache"))) == 3
+    assert upserted[1:] == [["PMID:1", "PMID:3"]]
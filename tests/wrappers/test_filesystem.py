@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from curategpt.wrappers import get_wrapper
@@ -5,9 +6,50 @@ from curategpt.wrappers import get_wrapper
 THIS = Path(__file__).name
 
 
-def test_filesystem_objects():
+def test_filesystem_objects(tmp_path):
     root = Path(__file__).absolute().parent
-    wrapper = get_wrapper("filesystem", root_directory=root)
+    cache = str(tmp_path / "cache.sqlite")
+    wrapper = get_wrapper("filesystem", root_directory=root, extraction_cache=cache)
     objs = list(wrapper.objects())
     assert len(objs) > 1
-    assert len([obj for obj in objs if obj["name"] == THIS]) == 1
+    # long files are split into chunks, with the file as their parent
+    assert len({obj.get("parent_id", obj["id"]) for obj in objs if obj["name"] == THIS}) == 1
+
+
+def test_filesystem_extraction_cache(tmp_path, monkeypatch):
+    from curategpt.wrappers.general import filesystem_wrapper
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(3):
+        (docs / f"doc{i}.txt").write_text(f"Document {i}.")
+    (docs / "notes.md").write_text("Plain text.")
+    settings = {"root_directory": str(docs), "extraction_cache": str(tmp_path / "cache.sqlite")}
+    serial = list(get_wrapper("filesystem", **settings).objects())
+    parallel = list(get_wrapper("filesystem", max_workers=2, **settings).objects())
+    texts = sorted(obj["text"].strip() for obj in serial)
+    assert texts == [f"Document {i}." for i in range(3)] + ["Plain text."]
+    assert parallel == serial
+    extracted = []
+    extract_text = filesystem_wrapper.extract_text
+    monkeypatch.setattr(
+        filesystem_wrapper, "extract_text", lambda f: extracted.append(f) or extract_text(f)
+    )
+    assert list(get_wrapper("filesystem", **settings).objects()) == serial
+    # plain text files are read again rather than cached
+    assert extracted == [str(docs / "notes.md")]
+    extracted.clear()
+    changed = docs / "doc1.txt"
+    changed.write_text("Changed document.")
+    os.utime(changed, (0, 12345))
+    objs = list(get_wrapper("filesystem", **settings).objects())
+    assert extracted == [str(changed), str(docs / "notes.md")]
+    assert "Changed document." in [obj["text"].strip() for obj in objs]
+
+
+def test_filesystem_extraction_cache_opt_in(monkeypatch, tmp_path):
+    monkeypatch.delenv("CURATEGPT_EXTRACTION_CACHE", raising=False)
+    assert get_wrapper("filesystem").extraction_cache is None
+    cache = str(tmp_path / "cache.sqlite")
+    monkeypatch.setenv("CURATEGPT_EXTRACTION_CACHE", cache)
+    assert get_wrapper("filesystem").extraction_cache == cache
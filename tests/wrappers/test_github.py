@@ -0,0 +1,154 @@
+import time
+
+from curategpt.utils.http_client import rate_limit, set_rate_limit
+from curategpt.wrappers.general import github_wrapper
+from curategpt.wrappers.general.github_wrapper import (
+    GITHUB_HOST,
+    GITHUB_REQUESTS_PER_SECOND,
+    GITHUB_UNAUTHENTICATED_REQUESTS_PER_SECOND,
+    GitHubWrapper,
+)
+from tests.wrappers.conftest import FakeResponse, FakeSession
+
+API = "https://api.github.com/repos/org/repo"
+
+
+def _issue(number: int, updated_at: str) -> dict:
+    return {
+        "url": f"{API}/issues/{number}",
+        "number": number,
+        "title": f"issue {number}",
+        "user": {"login": "someone"},
+        "labels": [],
+        "assignees": [],
+        "state": "open",
+        "created_at": "2024-01-01T00:00:00Z",
+        "updated_at": updated_at,
+        "body": "text",
+    }
+
+
+def _session(remaining: str = "1000", refused: int = 0) -> FakeSession:
+    """
+    Two pages of issues; the second issue of each page has a comment.
+
+    The first ``refused`` requests are refused by a secondary rate limit.
+    """
+
+    def handler(url, params=None, data=None):
+        if len(session.requests) <= refused:
+            return FakeResponse({}, headers={"Retry-After": "3"}, status_code=403)
+        headers = {"X-RateLimit-Remaining": remaining, "X-RateLimit-Reset": time.time()}
+        if url.endswith("/comments"):
+            number = int(url.split("/")[-2])
+            comments = (
+                []
+                if number % 2
+                else [{"url": f"c{number}", "user": {"login": "x"}, "body": "comment"}]
+            )
+            return FakeResponse(comments, headers=headers)
+        if url.endswith("page=2"):
+            issues = [_issue(3, "2024-03-01T00:00:00Z"), _issue(4, "2024-02-01T00:00:00Z")]
+            return FakeResponse(issues, headers=headers)
+        issues = [_issue(1, "2024-01-01T00:00:00Z"), _issue(2, "2024-04-01T00:00:00Z")]
+        return FakeResponse(
+            issues, headers=headers, links={"next": {"url": f"{API}/issues?page=2"}}
+        )
+
+    session = FakeSession(handler)
+    return session
+
+
+def test_objects(monkeypatch):
+    session = _session()
+    monkeypatch.setattr(github_wrapper, "get_session", lambda name=None: session)
+    wrapper = GitHubWrapper(repo="org/repo", since="2023-12-01T00:00:00Z", max_workers=3)
+    objs = list(wrapper.objects())
+    assert [obj["number"] for obj in objs] == [1, 2, 3, 4]
+    assert [len(obj["comments"]) for obj in objs] == [0, 1, 0, 1]
+    assert wrapper.synced_until == "2024-04-01T00:00:00Z"
+    [(_, params)] = [r for r in session.requests if r[0] == f"{API}/issues"]
+    assert params["since"] == "2023-12-01T00:00:00Z"
+
+
+def test_rate_limit_pacing(monkeypatch):
+    session = _session(remaining="1")
+    monkeypatch.setattr(github_wrapper, "get_session", lambda name=None: session)
+    waits = []
+    monkeypatch.setattr(github_wrapper.time, "sleep", waits.append)
+    wrapper = GitHubWrapper(repo="org/repo", max_workers=1)
+    list(wrapper.objects())
+    # one wait after each request, until the quota resets
+    assert len(waits) == len(session.requests)
+    assert all(0 < wait <= 1 for wait in waits)
+
+
+def test_secondary_rate_limit(monkeypatch):
+    session = _session(refused=1)
+    monkeypatch.setattr(github_wrapper, "get_session", lambda name=None: session)
+    waits = []
+    monkeypatch.setattr(github_wrapper.time, "sleep", waits.append)
+    wrapper = GitHubWrapper(repo="org/repo", max_workers=1)
+    assert [obj["number"] for obj in wrapper.objects()] == [1, 2, 3, 4]
+    assert waits == [3.0]
+
+
+def test_unauthenticated_rate_limit(monkeypatch):
+    monkeypatch.setattr(github_wrapper, "get_session", lambda name=None: _session())
+    monkeypatch.delenv("CURATEGPT_GITHUB_TOKEN", raising=False)
+    GitHubWrapper(repo="org/repo")
+    assert rate_limit(GITHUB_HOST) == GITHUB_UNAUTHENTICATED_REQUESTS_PER_SECOND
+    monkeypatch.setenv("CURATEGPT_GITHUB_TOKEN", "token")
+    GitHubWrapper(repo="org/repo")
+    assert rate_limit(GITHUB_HOST) == GITHUB_REQUESTS_PER_SECOND
+    set_rate_limit(GITHUB_HOST, GITHUB_REQUESTS_PER_SECOND)
+
+
+def test_view_index_incremental(monkeypatch, tmp_path):
+    from click.testing import CliRunner
+
+    from curategpt.cli import main
+    from curategpt.store.chromadb_adapter import ChromaDBAdapter
+
+    session = _session()
+    monkeypatch.setattr(github_wrapper, "get_session", lambda name=None: session)
+    path = str(tmp_path / "db")
+    base_args = ["view", "index", "-p", path, "-c", "gh_issues", "-m", "hashing:64"]
+    args = base_args + ["-V", "github", "--init-with", "{repo: org/repo}"]
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code == 0, result.output
+    cm = ChromaDBAdapter(path).collection_metadata("gh_issues")
+    assert cm.synced_until == "2024-04-01T00:00:00Z"
+    session.requests.clear()
+    result = CliRunner().invoke(main, args + ["--incremental"])
+    assert result.exit_code == 0, result.output
+    [(_, params)] = [r for r in session.requests if r[0] == f"{API}/issues"]
+    assert params["since"] == "2024-04-01T00:00:00Z"
+    result = CliRunner().invoke(main, base_args + ["-V", "hpoa", "--incremental"])
+    assert result.exit_code != 0
+
+
+def test_view_index_incremental_batches(monkeypatch, tmp_path):
+    from click.testing import CliRunner
+
+    from curategpt.cli import main
+    from curategpt.store.chromadb_adapter import ChromaDBAdapter
+
+    session = _session()
+    monkeypatch.setattr(github_wrapper, "get_session", lambda name=None: session)
+    batches = []
+    upsert = ChromaDBAdapter.upsert
+
+    def _upsert(self, objs, **kwargs):
+        batches.append(len(objs))
+        return upsert(self, objs, **kwargs)
+
+    monkeypatch.setattr(ChromaDBAdapter, "upsert", _upsert)
+    args = ["view", "index", "-p", str(tmp_path / "db"), "-c", "gh_issues", "-m", "hashing:64"]
+    args += ["-V", "github", "--init-with", "{repo: org/repo}", "--incremental"]
+    result = CliRunner().invoke(main, args + ["--batch-size", "3"])
+    assert result.exit_code == 0, result.output
+    # the first sync is a full one, upserted a batch at a time
+    assert batches == [3, 1]
+    cm = ChromaDBAdapter(str(tmp_path / "db")).collection_metadata("gh_issues")
+    assert cm.synced_until == "2024-04-01T00:00:00Z"
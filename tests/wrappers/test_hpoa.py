@@ -3,7 +3,9 @@ import logging
 import pytest
 import yaml
 
+from curategpt.wrappers.clinical import hpoa_wrapper
 from curategpt.wrappers.clinical.hpoa_wrapper import HPOAWrapper
+from curategpt.wrappers.literature import PubmedWrapper
 from tests import INPUT_DIR, OUTPUT_DIR
 
 TEMP_DB = OUTPUT_DIR / "obj_tmp"
@@ -18,3 +20,24 @@ def test_hpoa(group_by_publication):
     with open(INPUT_DIR / "example-phenotype-hpoa.tsv") as file:
         vars = list(wrapper.objects_from_file(file))
         print(yaml.dump(vars))
+
+
+def test_hpoa_prefetch(monkeypatch):
+    requests = []
+
+    def objects_by_ids(self, object_ids):
+        requests.append(object_ids)
+        return [{"id": pmid, "title": f"Title of {pmid}"} for pmid in object_ids]
+
+    monkeypatch.setattr(PubmedWrapper, "objects_by_ids", objects_by_ids)
+    monkeypatch.setattr(hpoa_wrapper, "term_labels", lambda ids: {id: f"label {id}" for id in ids})
+    monkeypatch.setattr(hpoa_wrapper, "term_label", lambda id: pytest.fail(f"lookup of {id}"))
+    wrapper = HPOAWrapper()
+    with open(INPUT_DIR / "example-phenotype-hpoa.tsv") as file:
+        objs = list(wrapper.objects_from_file(file))
+    assert len(objs) == 81
+    pmids = {pub["id"] for obj in objs for pub in obj.get("publications", [])}
+    # all publications are fetched in a single batch, before the rows are joined
+    assert requests == [sorted(pmids)]
+    for obj in objs:
+        assert obj["phenotype_label"] == f"label {obj['phenotype']}"
@@ -9,6 +9,7 @@ from curategpt.wrappers.investigation.ncbi_biosample_wrapper import NCBIBiosampl
 from tests import OUTPUT_DIR
 from tests.store.conftest import requires_openai_api_key
 from tests.utils.helper import create_db_dir, setup_db
+from tests.wrappers.conftest import FakeResponse, FakeSession
 
 TEMP_BIOSAMPLE_DB = OUTPUT_DIR / "biosample_tmp"
 
@@ -43,3 +44,17 @@ def test_biosample_chat(tmp_path):
     print(response.formatted_body)
     for ref in response.references:
         print(ref)
+
+
+def test_objects_by_ids():
+    import xmltodict
+
+    from tests import INPUT_DIR
+
+    content = (INPUT_DIR / "ncbi-biosample-example.xml").read_bytes()
+
+    session = FakeSession(lambda url, **kwargs: FakeResponse(content=content))
+    wrapper = NCBIBiosampleWrapper(session=session)
+    objs = wrapper.objects_by_ids(["biosample:SAMN36735719", "biosample:SAMN36735720"])
+    assert objs == wrapper.objects_from_dict(xmltodict.parse(content))
+    assert [obj["organism"] for obj in objs] == ["Homo sapiens", "Homo sapiens"]
@@ -87,3 +87,79 @@ def test_oak_search(vstore):
     results = list(vstore.search("nucl"))
     assert len(results) > 0
     assert any("nucleus" in result[0]["label"] for result in results)
+
+
+def test_oak_objects_bulk_and_chunked():
+    """Test that bulk SQL and chunked fetching build the same objects."""
+    adapter = get_adapter(INPUT_DIR / "go-nucleus.db")
+    bulk = list(OntologyWrapper(oak_adapter=adapter).objects())
+    chunked = list(OntologyWrapper(oak_adapter=adapter, bulk_sql=False, chunk_size=7).objects())
+    assert len(bulk) == len(chunked) > 200
+    for obj, chunked_obj in zip(bulk, chunked):
+        # oaklib reports equivalences on both sides when querying by subject
+        for o in [obj, chunked_obj]:
+            o["relationships"] = [
+                r for r in o["relationships"] or [] if r["predicate"] != "owl:equivalentClass"
+            ]
+        assert obj == chunked_obj
+    [nucleus] = [obj for obj in bulk if obj["id"] == "Nucleus"]
+    assert nucleus["original_id"] == "GO:0005634"
+    assert nucleus["definition"]
+
+
+def test_oak_objects_streaming():
+    """Test that objects are yielded before details of later chunks are fetched."""
+    adapter = get_adapter(INPUT_DIR / "go-nucleus.db")
+    wrapper = OntologyWrapper(oak_adapter=adapter, bulk_sql=False, chunk_size=10)
+    calls = []
+    definitions = adapter.definitions
+    adapter.definitions = lambda ids: calls.append(ids) or definitions(ids)
+    objs = wrapper.objects()
+    next(objs)
+    assert len(calls) == 1
+    assert len(list(objs)) > 200
+    assert len(calls) > 20
+
+
+def test_oak_update_collection(tmp_path):
+    """Test that an indexed collection is updated to a new version of the ontology."""
+    import shutil
+    import sqlite3
+
+    from curategpt.store.chromadb_adapter import ChromaDBAdapter
+
+    ont_path = tmp_path / "go-nucleus.db"
+    shutil.copy(INPUT_DIR / "go-nucleus.db", ont_path)
+    db = ChromaDBAdapter(str(tmp_path / "db"))
+    wrapper = OntologyWrapper(oak_adapter=get_adapter(ont_path))
+    db.insert(wrapper.objects(), collection="ont", model="hashing:64")
+    original = {obj["original_id"]: obj for obj, _, _ in db.find(collection="ont", limit=1000)}
+    conn = sqlite3.connect(ont_path)
+    conn.execute(
+        "UPDATE statements SET value = 'changed definition' "
+        "WHERE subject = 'GO:0005634' AND predicate = 'IAO:0000115'"
+    )
+    conn.execute(
+        "UPDATE statements SET value = 'nuclear envelope membrane' "
+        "WHERE subject = 'GO:0031965' AND predicate = 'rdfs:label'"
+    )
+    # a leaf term, so removing it changes no other object
+    targets = {r["target"] for obj in original.values() for r in obj["relationships"] or []}
+    removed = next(id for id, obj in original.items() if obj["id"] not in targets)
+    conn.execute("DELETE FROM statements WHERE subject = ? OR object = ?", [removed, removed])
+    conn.commit()
+    conn.close()
+    wrapper = OntologyWrapper(oak_adapter=get_adapter(ont_path))
+    counts = wrapper.update_collection(db, "ont", model="hashing:64")
+    assert counts["added"] == 0
+    assert counts["removed"] == 1
+    assert counts["changed"] >= 2
+    assert counts["unchanged"] > 200
+    expected = sorted(wrapper.objects(), key=lambda obj: obj["id"])
+    stored = sorted(
+        (obj for obj, _, _ in db.find(collection="ont", limit=1000)), key=lambda obj: obj["id"]
+    )
+    assert stored == expected
+    assert "NuclearEnvelopeMembrane" in wrapper.shorthand_to_id
+    counts = wrapper.update_collection(db, "ont", model="hashing:64")
+    assert counts["changed"] == counts["added"] == counts["removed"] == 0
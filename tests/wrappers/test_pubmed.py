@@ -9,6 +9,7 @@ from curategpt.wrappers.literature import PubmedWrapper
 from tests import OUTPUT_DIR
 from tests.store.conftest import requires_openai_api_key
 from tests.utils.helper import DEBUG_MODE, create_db_dir, setup_db
+from tests.wrappers.conftest import FakeResponse, FakeSession
 
 TEMP_PUBMED_SEARCH = OUTPUT_DIR / "pmid_tmp"
 TEMP_PUBMED_CHAT = OUTPUT_DIR / "pmid_tmp"
@@ -73,3 +74,77 @@ def test_pubmed_chat(wrapper):
     chat = ChatAgent(knowledge_source=wrapper, extractor=wrapper.extractor)
     response = chat.chat("what diseases are associated with acinar cells of the salivary gland")
     print(response)
+
+
+ARTICLE = (
+    b"<article><front><title>Title</title></front>"
+    b"<body><p>Some <italic>full</italic> text.</p></body>"
+    b"<sub-article><body><p>Reply.</p></body></sub-article></article>"
+)
+
+
+def test_full_text_from_archive(monkeypatch, tmp_path):
+    import io
+    import tarfile
+
+    from curategpt.wrappers.literature import pubmed_wrapper
+
+    archive = tmp_path / "PMC1.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        for name, data in [("PMC1/figure.jpg", b"..."), ("PMC1/article.nxml", ARTICLE)]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+    oa = (
+        b'<OA><records><record><link format="tgz" href="ftp://x/PMC1.tar.gz"/>'
+        b"</record></records></OA>"
+    )
+    session = FakeSession(lambda url, **kwargs: FakeResponse(content=oa))
+    monkeypatch.setattr(pubmed_wrapper, "urlopen", lambda url: open(archive, "rb"))
+    wrapper = PubmedWrapper(session=session)
+    assert wrapper.fetch_full_text("PMC:PMC1") == "TitleSome full text.Reply."
+    monkeypatch.setattr(wrapper, "pmc_xml", lambda pmcid: ARTICLE.decode("utf-8"))
+    assert wrapper.pmc_full_text("PMC:PMC1") == "Some full text."
+
+
+def test_ncbi_key(monkeypatch):
+    from curategpt.utils.http_client import rate_limit, set_rate_limit
+    from curategpt.wrappers.literature.eutils_wrapper import (
+        NCBI_HOST,
+        NCBI_REQUESTS_PER_SECOND,
+        NCBI_REQUESTS_PER_SECOND_WITH_KEY,
+    )
+
+    medline = b"PMID- 1\nTI  - A title\n"
+    session = FakeSession(lambda url, **kwargs: FakeResponse(content=medline))
+    wrapper = PubmedWrapper(session=session, ncbi_key="KEY")
+    assert rate_limit(NCBI_HOST) == NCBI_REQUESTS_PER_SECOND_WITH_KEY
+    wrapper.objects_by_ids(["PMID:1"])
+    [(_, params)] = session.requests
+    assert params["api_key"] == "KEY"
+    set_rate_limit(NCBI_HOST, NCBI_REQUESTS_PER_SECOND)
+
+
+def test_full_text_chunks(monkeypatch):
+    from curategpt.wrappers.literature import pubmed_wrapper
+
+    medline = b"PMID- 1\nPMC - PMC1\nTI  - A title\n\n"
+
+    def handler(url, params=None, data=None):
+        if url == pubmed_wrapper.ESEARCH_URL:
+            return {"esearchresult": {"idlist": ["1"]}}
+        return FakeResponse(content=medline)
+
+    wrapper = PubmedWrapper(session=FakeSession(handler), is_fetch_full_text=True)
+    wrapper.max_chunk_tokens = 100
+    wrapper.chunk_overlap_tokens = 10
+    monkeypatch.setattr(pubmed_wrapper, "get_session", lambda: wrapper.session)
+    monkeypatch.setattr(wrapper, "pmc_full_text", lambda pmcid: "Some more words. " * 200)
+    # publications looked up by id are whole, so that they can be joined on their PMID
+    [pub] = wrapper.objects_by_ids(["PMID:1"])
+    assert pub["id"] == "PMID:1"
+    # search results are split, to be embedded
+    objs = wrapper.external_search("words", expand=False)
+    assert len(objs) > 1
+    assert all(obj["parent_id"] == "PMID:1" for obj in objs)
@@ -0,0 +1,30 @@
+from curategpt.wrappers.bio import reactome_wrapper
+from curategpt.wrappers.bio.reactome_wrapper import ReactomeWrapper
+from tests.wrappers.conftest import FakeSession
+
+
+def _events(url, params=None, data=None):
+    # the API does not return events in the order requested, nor unknown ones
+    return [
+        {
+            "stId": id,
+            "displayName": f"event {id}",
+            "speciesName": "Homo sapiens",
+            "summation": [{"text": "summary"}],
+            "schemaClass": "Pathway",
+            "literatureReference": [{"pubMedIdentifier": 1, "title": "A paper"}],
+        }
+        for id in reversed(data.split(","))
+        if id != "R-HSA-0"
+    ]
+
+
+def test_objects_in_batches(monkeypatch):
+    session = FakeSession(_events)
+    monkeypatch.setattr(reactome_wrapper, "get_session", lambda name: session)
+    ids = [f"Reactome:R-HSA-{i}" for i in range(50)]
+    wrapper = ReactomeWrapper(max_workers=3)
+    objs = list(wrapper.objects(object_ids=ids + ids[:5]))
+    assert [obj["id"] for obj in objs] == ids[1:]
+    assert objs[0]["literatureReference"] == [{"id": "PMID:1", "title": "A paper"}]
+    assert sorted(len(batch.split(",")) for _, batch in session.requests) == [10, 20, 20]
@@ -0,0 +1,21 @@
+import pytest
+
+from curategpt.wrappers.bio.uniprot_wrapper import UniprotWrapper
+from tests.wrappers.conftest import FakeSession
+
+
+def _entries(url, params=None, data=None):
+    accessions = params["accessions"].split(",")
+    return {"results": [{"primaryAccession": acc, "id": f"{acc}_HUMAN"} for acc in accessions]}
+
+
+def test_objects_by_ids_in_batches():
+    session = FakeSession(_entries)
+    wrapper = UniprotWrapper(session=session, max_workers=2)
+    ids = [f"P{i:05d}" for i in range(250)]
+    objs = wrapper.objects_by_ids(["UniProtKB:" + ids[0]] + ids[1:])
+    assert [obj["primaryAccession"] for obj in objs] == ids
+    batches = [params["accessions"].split(",") for _, params in session.requests]
+    assert sorted(len(batch) for batch in batches) == [50, 100, 100]
+    with pytest.raises(ValueError):
+        wrapper.objects_by_ids(["GO:0000001"])